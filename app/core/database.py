@@ -1,15 +1,42 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
+from app.core.schema import vector_search_settings
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+def to_async_url(url: str) -> str:
+    # postgresql:// / postgresql+psycopg2:// -> postgresql+asyncpg://
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+# Path async (asyncpg) untuk endpoint async: chat/RAG, retrieval, dan diagnosis
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", "10"))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "10"))
+
 engine = create_engine(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=ASYNC_DB_POOL_SIZE, max_overflow=ASYNC_DB_MAX_OVERFLOW)
+
+def apply_vector_search_settings(dbapi_connection, connection_record):
+    # ef_search/probes index ANN berlaku per sesi, jadi diset setiap kali koneksi baru dibuka
+    cursor = dbapi_connection.cursor()
+    for statement in vector_search_settings():
+        cursor.execute(statement)
+    cursor.close()
+    dbapi_connection.commit()
+
+event.listen(engine, "connect", apply_vector_search_settings)
+event.listen(async_engine.sync_engine, "connect", apply_vector_search_settings)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: atribut tetap bisa dibaca setelah commit tanpa lazy load (tidak didukung AsyncSession)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 def get_db():
@@ -17,4 +44,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
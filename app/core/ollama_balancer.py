@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Request idempoten yang boleh dikirim ganda (hedging) ke node lain
+HEDGE_PATHS = ("/api/embed", "/api/embeddings")
+
+
+class OllamaEndpoint:
+    def __init__(self, index: int, url: str):
+        self.index = index
+        self.url = httpx.URL(url)
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        # Rata-rata bergerak waktu sampai header respons diterima (detik)
+        self.avg_latency: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": str(self.url),
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "avg_latency_ms": round(self.avg_latency * 1000, 1) if self.avg_latency is not None else None,
+        }
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Body respons yang melepas hitungan outstanding endpoint saat stream ditutup (akhir generate)."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, balancer: "OllamaBalancer", endpoint: OllamaEndpoint):
+        self._stream = stream
+        self._balancer = balancer
+        self._endpoint = endpoint
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except httpx.TransportError as e:
+            self._balancer._record_failure(self._endpoint, e)
+            raise
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._endpoint.outstanding -= 1
+
+
+class OllamaBalancer(httpx.AsyncBaseTransport):
+    """
+    Transport httpx yang membagi request Ollama ke beberapa node, dipakai bersama oleh klien LangChain
+    dan klien langsung (embedding, LLM chat, AIDOC) sebagai pengganti transport biasa.
+
+    - Routing least-outstanding: node sehat dengan request berjalan paling sedikit (termasuk stream
+      generate yang belum selesai); seri dipecah bergiliran.
+    - Kegagalan koneksi sebelum request terkirim dicoba ulang di node lain.
+    - Node dikeluarkan setelah `eject_after_failures` kegagalan berturut-turut (error transport atau
+      5xx) dan dimasukkan kembali saat health check aktif (GET /api/tags) berhasil. Bila semua node
+      dikeluarkan, request tetap dikirim ke node dengan beban terkecil.
+    - Hedging embedding: bila `hedge_after` diisi dan respons belum datang setelah sekian detik,
+      request yang sama dikirim ke node lain dan respons pertama yang dipakai.
+    """
+
+    def __init__(self, urls: List[str], transport: httpx.AsyncBaseTransport, eject_after_failures: int,
+                 health_check_interval: float, probe_timeout: float, hedge_after: Optional[float] = None):
+        self.endpoints = [OllamaEndpoint(index, url) for index, url in enumerate(urls)]
+        self._transport = transport
+        self.eject_after_failures = max(1, eject_after_failures)
+        self.health_check_interval = health_check_interval
+        self.probe_timeout = probe_timeout
+        self.hedge_after = hedge_after
+        self._turn = 0
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _pick(self, exclude: Set[OllamaEndpoint]) -> Optional[OllamaEndpoint]:
+        candidates = [e for e in self.endpoints if e not in exclude]
+        candidates = [e for e in candidates if e.healthy] or candidates
+        if not candidates:
+            return None
+        self._turn = (self._turn + 1) % len(self.endpoints)
+        return min(candidates, key=lambda e: (e.outstanding, (e.index - self._turn) % len(self.endpoints)))
+
+    @staticmethod
+    def _route(request: httpx.Request, endpoint: OllamaEndpoint) -> httpx.Request:
+        url = request.url.copy_with(scheme=endpoint.url.scheme, host=endpoint.url.host, port=endpoint.url.port)
+        headers = request.headers.copy()
+        headers["Host"] = url.netloc.decode("ascii")
+        return httpx.Request(request.method, url, headers=headers, content=request.content, extensions=request.extensions)
+
+    def _record_failure(self, endpoint: OllamaEndpoint, error: Any):
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        endpoint.last_error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+        if endpoint.healthy and endpoint.consecutive_failures >= self.eject_after_failures:
+            endpoint.healthy = False
+            logger.warning(f"Ollama endpoint {endpoint.url} ejected after {endpoint.consecutive_failures} failures ({endpoint.last_error})")
+
+    def _record_response(self, endpoint: OllamaEndpoint, status_code: int, latency: float):
+        if status_code >= 500:
+            self._record_failure(endpoint, f"HTTP {status_code}")
+            return
+        endpoint.consecutive_failures = 0
+        endpoint.avg_latency = latency if endpoint.avg_latency is None else 0.8 * endpoint.avg_latency + 0.2 * latency
+
+    async def _send(self, request: httpx.Request, endpoint: OllamaEndpoint, buffer: bool) -> httpx.Response:
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        started = time.monotonic()
+        response = None
+        try:
+            response = await self._transport.handle_async_request(self._route(request, endpoint))
+            if buffer:
+                await response.aread()
+        except BaseException as e:
+            endpoint.outstanding -= 1
+            if response is not None:
+                await response.aclose()
+            if isinstance(e, httpx.TransportError):
+                self._record_failure(endpoint, e)
+            raise
+        self._record_response(endpoint, response.status_code, time.monotonic() - started)
+        if buffer:
+            endpoint.outstanding -= 1
+        else:
+            response.stream = _TrackedStream(response.stream, self, endpoint)
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.hedge_after is not None and request.url.path in HEDGE_PATHS:
+            return await self._send_hedged(request)
+        tried: Set[OllamaEndpoint] = set()
+        while True:
+            endpoint = self._pick(tried)
+            try:
+                return await self._send(request, endpoint, buffer=False)
+            except httpx.ConnectError:
+                tried.add(endpoint)
+                if len(tried) >= len(self.endpoints):
+                    raise
+                self.retries += 1
+
+    async def _send_hedged(self, request: httpx.Request) -> httpx.Response:
+        tried: Set[OllamaEndpoint] = set()
+        tasks: Dict["asyncio.Task[httpx.Response]", OllamaEndpoint] = {}
+        first_error: Optional[BaseException] = None
+
+        def launch() -> Optional["asyncio.Task[httpx.Response]"]:
+            endpoint = self._pick(tried)
+            if endpoint is None:
+                return None
+            tried.add(endpoint)
+            task = asyncio.ensure_future(self._send(request, endpoint, buffer=True))
+            tasks[task] = endpoint
+            return task
+
+        primary = launch()
+        hedge_pending = True
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_after if hedge_pending else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Node pertama lambat: kirim salinan ke node lain, pakai yang lebih dulu selesai
+                    hedge_pending = False
+                    if launch() is not None:
+                        self.hedged += 1
+                    continue
+                for task in done:
+                    tasks.pop(task)
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    first_error = first_error or task.exception()
+                    if isinstance(task.exception(), httpx.ConnectError) and not tasks:
+                        # Request belum terkirim: coba node berikutnya sebagai request utama
+                        primary = launch()
+                        if primary is not None:
+                            self.retries += 1
+            raise first_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _probe(self, endpoint: OllamaEndpoint):
+        request = httpx.Request("GET", endpoint.url.join("/api/tags"),
+                                extensions={"timeout": httpx.Timeout(self.probe_timeout).as_dict()})
+        try:
+            response = await self._transport.handle_async_request(request)
+            await response.aread()
+            error = f"HTTP {response.status_code}" if response.status_code >= 500 else None
+        except httpx.TransportError as e:
+            error = f"{type(e).__name__}: {e}"
+        if error is None:
+            if not endpoint.healthy:
+                logger.info(f"Ollama endpoint {endpoint.url} healthy again")
+            endpoint.healthy = True
+            endpoint.consecutive_failures = 0
+        else:
+            if endpoint.healthy:
+                logger.warning(f"Ollama endpoint {endpoint.url} failed health check ({error})")
+            endpoint.healthy = False
+            endpoint.last_error = error
+
+    async def check_health(self):
+        await asyncio.gather(*(self._probe(endpoint) for endpoint in self.endpoints))
+
+    async def run_health_checks(self):
+        """Loop health check aktif; dijalankan sebagai task di lifespan aplikasi."""
+        if self.health_check_interval <= 0:
+            return
+        while True:
+            await self.check_health()
+            await asyncio.sleep(self.health_check_interval)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "healthy": sum(1 for endpoint in self.endpoints if endpoint.healthy),
+            "retries": self.retries,
+            "hedge_after_ms": self.hedge_after * 1000 if self.hedge_after is not None else None,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+        }
@@ -0,0 +1,154 @@
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import httpx
+from app.core.config import settings
+from app.core.ollama_balancer import OllamaBalancer
+
+# Satu connection pool (transport httpx) untuk semua klien async Ollama: embedding, LLM chat, dan AIDOC.
+# Klien LangChain tetap dibuat per service (timeout berbeda), tetapi koneksi keep-alive dipakai bersama
+# dan jumlahnya dibatasi OLLAMA_HTTP_MAX_CONNECTIONS.
+_pool_transport = httpx.AsyncHTTPTransport(
+    limits=httpx.Limits(
+        max_connections=settings.OLLAMA_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OLLAMA_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.OLLAMA_HTTP_KEEPALIVE_EXPIRY_SECONDS
+    )
+) if settings.OLLAMA_HTTP_SHARED_POOL else None
+
+# Beberapa node di OLLAMA_BASE_URL: semua klien memakai satu balancer (selalu bersama, dengan atau tanpa pool)
+ollama_balancer = OllamaBalancer(
+    urls=settings.ollama_base_urls,
+    transport=_pool_transport or httpx.AsyncHTTPTransport(),
+    eject_after_failures=settings.OLLAMA_EJECT_AFTER_FAILURES,
+    health_check_interval=settings.OLLAMA_HEALTH_CHECK_SECONDS,
+    probe_timeout=settings.OLLAMA_HTTP_CONNECT_TIMEOUT_SECONDS,
+    hedge_after=settings.OLLAMA_EMBED_HEDGE_MS / 1000 if settings.OLLAMA_EMBED_HEDGE_MS > 0 else None
+) if len(settings.ollama_base_urls) > 1 else None
+
+ollama_transport = ollama_balancer or _pool_transport
+
+
+def ollama_timeout(read_timeout: float) -> httpx.Timeout:
+    """Timeout httpx untuk satu jenis panggilan Ollama; `read_timeout` untuk streaming berarti jeda antar chunk."""
+    return httpx.Timeout(
+        connect=settings.OLLAMA_HTTP_CONNECT_TIMEOUT_SECONDS,
+        read=read_timeout,
+        write=settings.OLLAMA_HTTP_CONNECT_TIMEOUT_SECONDS,
+        pool=settings.OLLAMA_HTTP_POOL_TIMEOUT_SECONDS
+    )
+
+
+def ollama_client_kwargs(read_timeout: float) -> Dict[str, Any]:
+    """
+    `async_client_kwargs` untuk OllamaLLM/OllamaEmbeddings: transport bersama dan timeout per jenis panggilan.
+
+    Args:
+        read_timeout (float): Batas waktu menunggu data dari Ollama (untuk streaming: jeda antar chunk).
+    """
+    if ollama_transport is None:
+        return {}
+    return {"transport": ollama_transport, "timeout": ollama_timeout(read_timeout)}
+
+
+class OllamaError(RuntimeError):
+    """Ollama menjawab dengan status error atau baris `{"error": ...}` di tengah stream."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OllamaClient:
+    """
+    Klien HTTP tipis untuk /api/generate (biasa dan streaming) dan /api/embed, dipakai service bila
+    OLLAMA_CLIENT=direct sebagai pengganti runnable LangChain. Memakai transport dan timeout yang sama
+    dengan klien LangChain; chunk terakhir Ollama (berisi prompt_eval_count dan eval_count) diteruskan ke
+    `on_done` agar statistik token prompt tetap tercatat.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        # Dibuat saat pertama dipakai: mode LangChain tidak pernah membuka klien ini
+        if self._http is None:
+            self._http = httpx.AsyncClient(base_url=self.base_url, transport=ollama_transport)
+        return self._http
+
+    @staticmethod
+    def _generate_payload(model: str, prompt: str, options: Optional[Dict[str, Any]], stream: bool) -> Dict[str, Any]:
+        payload = {"model": model, "prompt": prompt, "stream": stream, "keep_alive": settings.ollama_keep_alive}
+        if options:
+            payload["options"] = options
+        return payload
+
+    @staticmethod
+    def _raise_for_error(status_code: int, body: bytes):
+        try:
+            message = json.loads(body).get("error") or body.decode(errors="replace")
+        except ValueError:
+            message = body.decode(errors="replace")
+        raise OllamaError(f"Ollama returned {status_code}: {message}", status_code)
+
+    async def generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                       on_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
+        """Generate tanpa streaming; mengembalikan teks jawaban mentah."""
+        response = await self.http.post(
+            "/api/generate", json=self._generate_payload(model, prompt, options, stream=False),
+            timeout=ollama_timeout(settings.OLLAMA_GENERATE_READ_TIMEOUT_SECONDS)
+        )
+        if response.status_code >= 400:
+            self._raise_for_error(response.status_code, response.content)
+        data = response.json()
+        if on_done is not None:
+            on_done(data)
+        return data.get("response", "")
+
+    async def stream_generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                              on_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> AsyncIterator[str]:
+        """Generate streaming (NDJSON); yield setiap potongan teks yang tidak kosong."""
+        async with self.http.stream(
+            "POST", "/api/generate", json=self._generate_payload(model, prompt, options, stream=True),
+            timeout=ollama_timeout(settings.OLLAMA_GENERATE_READ_TIMEOUT_SECONDS)
+        ) as response:
+            if response.status_code >= 400:
+                self._raise_for_error(response.status_code, await response.aread())
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if "error" in data:
+                    raise OllamaError(data["error"])
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    if on_done is not None:
+                        on_done(data)
+                    break
+
+    async def embed(self, model: str, texts: List[str]) -> List[List[float]]:
+        """Embed banyak teks dalam satu request /api/embed, urutan hasil sama dengan `texts`."""
+        response = await self.http.post(
+            "/api/embed", json={"model": model, "input": texts, "keep_alive": settings.ollama_keep_alive},
+            timeout=ollama_timeout(settings.OLLAMA_EMBED_READ_TIMEOUT_SECONDS)
+        )
+        if response.status_code >= 400:
+            self._raise_for_error(response.status_code, response.content)
+        return response.json()["embeddings"]
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+ollama_client = OllamaClient(settings.ollama_base_urls[0])
+
+
+async def close_ollama_http():
+    """Tutup semua koneksi keep-alive ke Ollama saat shutdown."""
+    await ollama_client.aclose()
+    if ollama_transport is not None:
+        await ollama_transport.aclose()
@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import os
+import platform
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+import onnxruntime
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+EXECUTION_MODES = {
+    "sequential": onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+
+
+class OnnxSessionConfig:
+    """Opsi SessionOptions ONNX Runtime; thread 0 berarti bawaan ONNX Runtime (semua core fisik)."""
+
+    def __init__(self, intra_op_threads: int = 0, inter_op_threads: int = 0, execution_mode: str = "sequential",
+                 graph_optimization: str = "all", memory_arena: bool = True, cache_dir: Optional[str] = None):
+        if graph_optimization not in GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(f"Unknown graph optimization level '{graph_optimization}', expected one of {list(GRAPH_OPTIMIZATION_LEVELS)}")
+        if execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{execution_mode}', expected one of {list(EXECUTION_MODES)}")
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.execution_mode = execution_mode
+        self.graph_optimization = graph_optimization
+        self.memory_arena = memory_arena
+        self.cache_dir = cache_dir or None
+
+    @classmethod
+    def from_settings(cls) -> "OnnxSessionConfig":
+        return cls(
+            intra_op_threads=settings.VISION_ORT_INTRA_OP_THREADS,
+            inter_op_threads=settings.VISION_ORT_INTER_OP_THREADS,
+            execution_mode=settings.VISION_ORT_EXECUTION_MODE,
+            graph_optimization=settings.VISION_ORT_GRAPH_OPTIMIZATION,
+            memory_arena=settings.VISION_ORT_MEMORY_ARENA,
+            cache_dir=settings.VISION_ORT_CACHE_DIR
+        )
+
+    def session_options(self, graph_optimization: Optional[str] = None) -> onnxruntime.SessionOptions:
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.execution_mode = EXECUTION_MODES[self.execution_mode]
+        options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[graph_optimization or self.graph_optimization]
+        options.enable_cpu_mem_arena = self.memory_arena
+        return options
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "execution_mode": self.execution_mode,
+            "graph_optimization": self.graph_optimization,
+            "memory_arena": self.memory_arena,
+            "cache_dir": self.cache_dir,
+        }
+
+
+def _cpu_features() -> Optional[str]:
+    """Flag set instruksi CPU host dari /proc/cpuinfo (x86 `flags`, ARM `Features`); None bila tidak tersedia."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name.strip() in ("flags", "Features"):
+                    return " ".join(sorted(value.split()))
+    except OSError:
+        pass
+    return None
+
+
+_CPU_FEATURES = _cpu_features()
+
+
+def optimized_model_path(model_path: str, config: OnnxSessionConfig) -> Optional[str]:
+    """
+    Path cache graph teroptimasi untuk `model_path`. Kuncinya mencakup ukuran dan mtime model, versi
+    ONNX Runtime, level optimasi dan arsitektur CPU, sehingga model atau runtime yang berubah otomatis
+    memakai file cache baru. Level "all" menambahkan transformasi layout (NCHWc) yang bergantung pada set
+    instruksi CPU (mis. AVX2 vs AVX-512), jadi pada level itu flag CPU host ikut masuk kunci; cache yang
+    dibagikan antar host (volume bersama, image container) hanya dipakai ulang oleh CPU yang sama. Bila
+    flag CPU tidak bisa dibaca, graph level "all" tidak di-cache.
+    """
+    if config.cache_dir is None or config.graph_optimization == "disable":
+        return None
+    key = f"{onnxruntime.__version__}:{config.graph_optimization}:{platform.machine()}"
+    if config.graph_optimization == "all":
+        if _CPU_FEATURES is None:
+            return None
+        key += f":{_CPU_FEATURES}"
+    stat = os.stat(model_path)
+    key = f"{stat.st_size}:{stat.st_mtime_ns}:{key}"
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(config.cache_dir, f"{name}.{hashlib.sha256(key.encode()).hexdigest()[:16]}.optimized.onnx")
+
+
+def create_session(model_path: str, config: OnnxSessionConfig) -> Tuple[onnxruntime.InferenceSession, Dict[str, Any]]:
+    """
+    Buat InferenceSession CPU. Bila cache aktif dan graph teroptimasi sudah ada, file itu dimuat langsung
+    tanpa optimasi ulang; bila belum, graph hasil optimasi disimpan untuk startup berikutnya. Mengembalikan
+    session dan info pemuatan (cache hit, durasi).
+    """
+    started = time.perf_counter()
+    cached_path = optimized_model_path(model_path, config)
+    info: Dict[str, Any] = {"model_path": model_path, "optimized_model_path": cached_path, "cache_hit": False}
+
+    if cached_path is not None and os.path.exists(cached_path):
+        try:
+            session = onnxruntime.InferenceSession(cached_path, config.session_options(graph_optimization="disable"),
+                                                   providers=["CPUExecutionProvider"])
+            info["cache_hit"] = True
+            info["load_seconds"] = round(time.perf_counter() - started, 3)
+            return session, info
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable optimized ONNX model {cached_path}: {e}")
+
+    options = config.session_options()
+    temp_path = None
+    if cached_path is not None:
+        os.makedirs(config.cache_dir, exist_ok=True)
+        # Ditulis ke file sementara lalu di-rename: beberapa proses worker bisa memuat model bersamaan
+        temp_path = f"{cached_path}.{os.getpid()}.tmp"
+        options.optimized_model_filepath = temp_path
+    session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+    if temp_path is not None and os.path.exists(temp_path):
+        os.replace(temp_path, cached_path)
+        logger.info(f"Saved optimized ONNX model to {cached_path}")
+    info["load_seconds"] = round(time.perf_counter() - started, 3)
+    return session, info
+
+
+class IOBindingRunner:
+    """
+    Menjalankan session lewat IO binding dengan buffer input/output yang dialokasikan sekali per thread dan
+    per ukuran batch, sehingga inference berulang tidak mengalokasikan tensor input/output baru. Thread
+    executor berbeda memakai buffer masing-masing.
+    """
+
+    def __init__(self, session: onnxruntime.InferenceSession, input_name: str, output_name: str, output_width: int):
+        self.session = session
+        self.input_name = input_name
+        self.output_name = output_name
+        self.output_width = output_width
+        self._local = threading.local()
+
+    def _binding(self, shape: tuple) -> Tuple[onnxruntime.IOBinding, np.ndarray, np.ndarray]:
+        bindings = self._local.__dict__.setdefault("bindings", {})
+        if shape not in bindings:
+            input_buffer = np.empty(shape, dtype=np.float32)
+            output_buffer = np.empty((shape[0], self.output_width), dtype=np.float32)
+            binding = self.session.io_binding()
+            binding.bind_ortvalue_input(self.input_name, onnxruntime.OrtValue.ortvalue_from_numpy(input_buffer))
+            binding.bind_ortvalue_output(self.output_name, onnxruntime.OrtValue.ortvalue_from_numpy(output_buffer))
+            bindings[shape] = (binding, input_buffer, output_buffer)
+        return bindings[shape]
+
+    def run(self, batch: np.ndarray, run_options: Optional[onnxruntime.RunOptions] = None) -> np.ndarray:
+        """Inference `batch`; hasil adalah salinan logit `[N, output_width]` (buffer output dipakai ulang)."""
+        binding, input_buffer, output_buffer = self._binding(batch.shape)
+        np.copyto(input_buffer, batch)
+        self.session.run_with_iobinding(binding, run_options)
+        return output_buffer.copy()
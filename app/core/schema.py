@@ -0,0 +1,85 @@
+import logging
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# DDL idempotent untuk kolom/index yang ditambahkan setelah tabel dibuat oleh create_all
+SCHEMA_UPGRADES = [
+    "ALTER TABLE poli ADD COLUMN IF NOT EXISTS embedding_model VARCHAR",
+    "ALTER TABLE disease ADD COLUMN IF NOT EXISTS embedding_model VARCHAR",
+    "ALTER TABLE doctors ADD COLUMN IF NOT EXISTS embedding_model VARCHAR",
+    "ALTER TABLE diagnosis ADD COLUMN IF NOT EXISTS generation_profile VARCHAR",
+    "ALTER TABLE diagnosis ADD COLUMN IF NOT EXISTS generation_model VARCHAR",
+]
+
+# Tabel dengan kolom embedding yang dikelola index ANN-nya
+VECTOR_TABLES = ["poli", "disease", "doctors"]
+
+# Operator jarak pgvector dan operator class index yang sesuai
+DISTANCE_OPERATORS = {
+    "l2": ("<->", "vector_l2_ops"),
+    "cosine": ("<=>", "vector_cosine_ops"),
+    "inner_product": ("<#>", "vector_ip_ops"),
+}
+
+def distance_operator(distance: Optional[str] = None) -> str:
+    """Operator SQL untuk metrik jarak yang dikonfigurasi (dipakai RetrievalService)."""
+    return DISTANCE_OPERATORS[distance or settings.VECTOR_DISTANCE][0]
+
+def vector_index_name(table: str, index_type: str, distance: str) -> str:
+    return f"ix_{table}_embedding_{index_type}_{distance}"
+
+def vector_index_ddl(table: str, index_type: Optional[str] = None, distance: Optional[str] = None) -> Optional[str]:
+    index_type = index_type or settings.VECTOR_INDEX_TYPE
+    distance = distance or settings.VECTOR_DISTANCE
+    if index_type == "none":
+        return None
+
+    opclass = DISTANCE_OPERATORS[distance][1]
+    if index_type == "hnsw":
+        options = f"m = {settings.HNSW_M}, ef_construction = {settings.HNSW_EF_CONSTRUCTION}"
+    elif index_type == "ivfflat":
+        options = f"lists = {settings.IVFFLAT_LISTS}"
+    else:
+        raise ValueError(f"Unsupported VECTOR_INDEX_TYPE: {index_type}")
+
+    return (f"CREATE INDEX IF NOT EXISTS {vector_index_name(table, index_type, distance)} "
+            f"ON {table} USING {index_type} (embedding {opclass}) WITH ({options})")
+
+def vector_search_settings() -> List[str]:
+    """Parameter pencarian ANN yang diterapkan pada setiap sesi database baru."""
+    return [
+        f"SET hnsw.ef_search = {int(settings.HNSW_EF_SEARCH)}",
+        f"SET ivfflat.probes = {int(settings.IVFFLAT_PROBES)}",
+    ]
+
+def sync_vector_indexes(conn, index_type: Optional[str] = None, distance: Optional[str] = None):
+    """Buat index ANN yang dikonfigurasi dan hapus index terkelola lain (tipe/metrik lama) pada kolom embedding."""
+    index_type = index_type or settings.VECTOR_INDEX_TYPE
+    distance = distance or settings.VECTOR_DISTANCE
+    for table in VECTOR_TABLES:
+        wanted = vector_index_name(table, index_type, distance) if index_type != "none" else None
+        existing = conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :table AND indexname LIKE :pattern"),
+            {"table": table, "pattern": f"ix_{table}_embedding_%"}
+        ).scalars().all()
+        for index_name in existing:
+            if index_name != wanted:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+                logger.info(f"Dropped vector index {index_name}")
+
+        ddl = vector_index_ddl(table, index_type, distance)
+        if ddl and wanted not in existing:
+            logger.info(f"Building vector index {wanted} (may take a while on large tables)")
+            conn.execute(text(ddl))
+
+def upgrade_schema(engine: Engine):
+    """Jalankan DDL tambahan yang tidak ditangani Base.metadata.create_all pada tabel yang sudah ada."""
+    with engine.begin() as conn:
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
+        sync_vector_indexes(conn)
+    logger.info(f"Schema upgrade applied ({len(SCHEMA_UPGRADES)} statements, vector index: {settings.VECTOR_INDEX_TYPE}/{settings.VECTOR_DISTANCE}).")
\ No newline at end of file
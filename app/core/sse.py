@@ -0,0 +1,23 @@
+import json
+import logging
+from typing import Any, AsyncIterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Header untuk respons text/event-stream: jangan di-cache dan jangan di-buffer oleh reverse proxy (nginx)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def format_sse(event: str, data: Any) -> str:
+    """Format satu event Server-Sent Events; data dikirim sebagai JSON satu baris."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def sse_stream(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[str]:
+    """Ubah event (nama, data) dari service menjadi stream SSE untuk StreamingResponse."""
+    try:
+        async for event, data in events:
+            yield format_sse(event, data)
+    except Exception as e:
+        # Header 200 sudah terkirim, jadi error di tengah stream dilaporkan sebagai event
+        logger.exception("Error during event streaming.")
+        yield format_sse("error", {"detail": str(e)})
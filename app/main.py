@@ -1,16 +1,43 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from app.routers import auth, chat, poli, disease, doctor, medical_image, diagnosis
-from app.core.database import engine, Base
+from app.routers import auth, chat, poli, disease, doctor, medical_image, diagnosis, metrics, health
+from app.core.database import engine, async_engine, Base
+from app.core.schema import upgrade_schema
+from app.core.ollama_http import close_ollama_http, ollama_balancer
+from app.services.warmup_service import warmup_service
+from app.services.vision_executor import vision_executor
+from app.services.retrieval_service import retrieval_service
 import app.models
 
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up berjalan di background: liveness langsung 200, readiness menunggu model selesai dimuat
+    warmup_task = asyncio.create_task(warmup_service.run())
+    # Health check aktif node Ollama bila OLLAMA_BASE_URL berisi lebih dari satu node
+    health_task = asyncio.create_task(ollama_balancer.run_health_checks()) if ollama_balancer is not None else None
+    # Index retrieval di memori (RETRIEVAL_BACKEND=memory) dimuat dan diperbarui di background, bukan di jalur request
+    index_task = asyncio.create_task(retrieval_service.run_memory_refresh()) if retrieval_service.memory_index is not None else None
+    yield
+    warmup_task.cancel()
+    if health_task is not None:
+        health_task.cancel()
+    if index_task is not None:
+        index_task.cancel()
+    await close_ollama_http()
+    await async_engine.dispose()
+    vision_executor.shutdown()
 
 app = FastAPI(
     title="Detak Medis API",
     description="API for Detak Medis application",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -28,6 +55,8 @@ app.include_router(disease.router)
 app.include_router(doctor.router)
 app.include_router(medical_image.router)
 app.include_router(diagnosis.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
 
 @app.get("/")
 def read_root():
@@ -10,9 +10,15 @@ class Diagnosis(Base):
     result = Column(Text, nullable=False)
     disease_id = Column(Integer, ForeignKey("disease.id", onupdate="CASCADE", ondelete="SET NULL"), nullable=False)
     medical_image_id = Column(Integer, ForeignKey("medical_images.id", onupdate="CASCADE", ondelete="SET NULL"), unique=True, nullable=False)
+    # Profil generate dan model Ollama yang menghasilkan `result` (NULL untuk diagnosis lama)
+    generation_profile = Column(String, nullable=True)
+    generation_model = Column(String, nullable=True)
 
     # Relation to Disease
     disease = relationship("Disease", foreign_keys=[disease_id], back_populates="diagnosis")
 
     # Relation to Medical Image
-    medical_image = relationship("MedicalImage", foreign_keys=[medical_image_id], back_populates="diagnosis")
\ No newline at end of file
+    medical_image = relationship("MedicalImage", foreign_keys=[medical_image_id], back_populates="diagnosis")
+
+    # Relation to referred Doctors (persisted at creation, ordered by retrieval rank)
+    doctor_links = relationship("DiagnosisDoctor", back_populates="diagnosis", order_by="DiagnosisDoctor.rank", cascade="all, delete-orphan")
\ No newline at end of file
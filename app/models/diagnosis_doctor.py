@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+class DiagnosisDoctor(Base):
+    __tablename__ = "diagnosis_doctors"
+
+    diagnosis_id = Column(Integer, ForeignKey("diagnosis.id", onupdate="CASCADE", ondelete="CASCADE"), primary_key=True, nullable=False)
+    doctor_id = Column(Integer, ForeignKey("doctors.id", onupdate="CASCADE", ondelete="CASCADE"), primary_key=True, index=True, nullable=False)
+    rank = Column(Integer, nullable=False)
+    distance = Column(Float, nullable=True)
+
+    # Relation to Diagnosis
+    diagnosis = relationship("Diagnosis", foreign_keys=[diagnosis_id], back_populates="doctor_links")
+
+    # Relation to Doctor
+    doctor = relationship("Doctor", foreign_keys=[doctor_id])
@@ -13,6 +13,7 @@ class Disease(Base):
     treatment = Column(Text)
     poli_id = Column(Integer, ForeignKey("poli.id", onupdate="CASCADE", ondelete="SET NULL"), nullable=False)
     embedding = Column(Vector(768), nullable=True)
+    embedding_model = Column(String, nullable=True)
 
     # Relation to Poli
     poli = relationship("Poli", foreign_keys=[poli_id], back_populates="disease")
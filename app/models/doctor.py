@@ -15,6 +15,7 @@ class Doctor(Base):
     practice_schedule = Column(JSON, nullable=True)
     poli_id = Column(Integer, ForeignKey("poli.id", onupdate="CASCADE", ondelete="SET NULL"), nullable=False)
     embedding = Column(Vector(768), nullable=True)
+    embedding_model = Column(String, nullable=True)
 
     # Relation to Poli
     poli = relationship("Poli", foreign_keys=[poli_id], back_populates="doctor")
\ No newline at end of file
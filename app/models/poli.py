@@ -10,6 +10,7 @@ class Poli(Base):
     name = Column(String, index=True, nullable=False)
     description = Column(String)
     embedding = Column(Vector(768), nullable=True)
+    embedding_model = Column(String, nullable=True)
     
     disease = relationship("Disease", foreign_keys="[Disease.poli_id]", back_populates="poli")
     doctor = relationship("Doctor", foreign_keys="[Doctor.poli_id]", back_populates="poli")
@@ -1,20 +1,43 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.services.rag_service import rag_service
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.sse import sse_stream, SSE_HEADERS
+import logging
 
 router = APIRouter(prefix="/chat", tags=["Chatbot"])
 
+logger = logging.getLogger(__name__)
+
 @router.post("/", response_model=ChatResponse)
-async def handle_chat(request: ChatRequest, db: Session = Depends(get_db)):
+async def handle_chat(request: ChatRequest, db: AsyncSession = Depends(get_async_db)):
     if not request.query:
         raise HTTPException(status_code=400, detail="Query tidak boleh kosong.")
     
     try:
         response = await rag_service.process_chat(db, request)
         return response
+    except HTTPException:
+        # Termasuk 429/503 dari penjadwal LLM (beserta header Retry-After)
+        raise
+    except Exception as e:
+        logger.exception("Failed to process chat.")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/stream")
+async def handle_chat_stream(request: ChatRequest, db: AsyncSession = Depends(get_async_db)):
+    """Chat via Server-Sent Events: event `contexts` dulu, lalu `token` per potongan jawaban, dan `done`."""
+    if not request.query:
+        raise HTTPException(status_code=400, detail="Query tidak boleh kosong.")
+
+    try:
+        events = await rag_service.stream_chat(db, request)
+    except HTTPException:
+        raise
     except Exception as e:
-        # Log the exception
-        print(f"Error during chat processing: {e}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
+        logger.exception("Failed to prepare chat stream.")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    return StreamingResponse(sse_stream(events), media_type="text/event-stream", headers=SSE_HEADERS)
\ No newline at end of file
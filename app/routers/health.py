@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.warmup_service import warmup_service
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+@router.get("/live")
+def liveness():
+    """Proses berjalan; tidak memeriksa model."""
+    return {"status": "ok"}
+
+@router.get("/ready")
+def readiness():
+    """Siap menerima trafik setelah warm-up model selesai; 503 selama warm-up berjalan atau gagal."""
+    return JSONResponse(status_code=200 if warmup_service.ready else 503, content=warmup_service.stats())
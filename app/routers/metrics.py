@@ -0,0 +1,102 @@
+from fastapi import APIRouter
+from app.core.config import settings
+from app.core.ollama_http import ollama_balancer
+from app.services.embedding_service import embedding_service
+from app.services.llm_service import llm_service
+from app.services.aidoc_service import aidoc_service
+from app.services.retrieval_service import retrieval_service
+from app.services.rag_service import rag_service
+from app.services.diagnosis_service import diagnosis_service
+from app.services.llm_scheduler import llm_scheduler
+from app.services.generation_profiles import generation_profiles
+from app.services.vision_model_service import vision_model_service
+from app.services.vision_executor import vision_executor
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/embedding-cache")
+def get_embedding_cache_metrics():
+    if embedding_service.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **embedding_service.cache.stats()}
+
+@router.get("/embedding-batcher")
+def get_embedding_batcher_metrics():
+    if embedding_service.batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **embedding_service.batcher.stats()}
+
+@router.get("/vision-batcher")
+def get_vision_batcher_metrics():
+    if vision_model_service.batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **vision_model_service.batcher.stats()}
+
+@router.get("/vision-model")
+def get_vision_model_metrics():
+    if vision_model_service.session is None:
+        return {"loaded": False, "backend": settings.VISION_BACKEND, "variant": settings.VISION_MODEL_VARIANT}
+    return {
+        "loaded": True,
+        "backend": settings.VISION_BACKEND,
+        "variant": settings.VISION_MODEL_VARIANT,
+        "io_binding": vision_model_service.io_binding is not None,
+        "session": vision_model_service.session_config.stats(),
+        **vision_model_service.load_info,
+    }
+
+@router.get("/vision-executor")
+def get_vision_executor_metrics():
+    return vision_executor.stats()
+
+@router.get("/vision-workers")
+def get_vision_worker_metrics():
+    if vision_model_service.worker_client is None:
+        return {"enabled": False}
+    return {"enabled": True, **vision_model_service.worker_client.stats()}
+
+@router.get("/single-flight")
+def get_single_flight_metrics():
+    return [
+        embedding_service.single_flight.stats(),
+        llm_service.single_flight.stats(),
+        aidoc_service.single_flight.stats(),
+    ]
+
+@router.get("/retrieval-cache")
+def get_retrieval_cache_metrics():
+    if retrieval_service.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "catalog_version": retrieval_service.catalog_version, **retrieval_service.cache.stats()}
+
+@router.get("/answer-cache")
+def get_answer_cache_metrics():
+    return {
+        name: {"enabled": False} if cache is None else {"enabled": True, **cache.stats()}
+        for name, cache in (("chat", rag_service.answer_cache), ("diagnosis", diagnosis_service.answer_cache))
+    }
+
+
+@router.get("/prompt-tokens")
+def get_prompt_token_metrics():
+    return {
+        "context": {"chat": rag_service.context_builder.stats(), "diagnosis": diagnosis_service.context_builder.stats()},
+        "prompt": [llm_service.prompt_usage.stats(), aidoc_service.prompt_usage.stats()],
+    }
+
+
+@router.get("/llm-scheduler")
+def get_llm_scheduler_metrics():
+    return llm_scheduler.stats()
+
+
+@router.get("/generation-profiles")
+def get_generation_profile_metrics():
+    return generation_profiles.stats()
+
+
+@router.get("/ollama-backends")
+def get_ollama_backend_metrics():
+    if ollama_balancer is None:
+        return {"enabled": False, "endpoints": [{"url": url} for url in settings.ollama_base_urls]}
+    return ollama_balancer.stats()
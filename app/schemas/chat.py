@@ -11,4 +11,8 @@ class ContextDocument(BaseModel):
 
 class ChatResponse(BaseModel):
     answer: str
-    retrieved_contexts: List[ContextDocument]
\ No newline at end of file
+    retrieved_contexts: List[ContextDocument]
+    cached: bool = False
+    # Profil generate yang menghasilkan jawaban ("chat" atau "degraded") dan model Ollama-nya
+    profile: Optional[str] = None
+    model: Optional[str] = None
\ No newline at end of file
@@ -11,11 +11,26 @@ class DiagnosisCreate(DiagnosisBase, MedicalImageBase):
 class DiagnosisUpdate(BaseModel):
     query: Optional[str] = None
 
+class RelatedDoctor(BaseModel):
+    id: int
+    name: str
+    speciality: Optional[str] = None
+    location: Optional[str] = None
+    practice_schedule: Optional[Dict[str, Any]] = None
+    rank: int
+    distance: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
 class Diagnosis(DiagnosisBase):
     id: int
     path: str
     result: str
-    related_doctors: List[Dict[str, Any]]
+    related_doctors: List[RelatedDoctor]
+    cached: bool = False
+    profile: Optional[str] = None
+    model: Optional[str] = None
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -0,0 +1,129 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+from app.schemas.chat import ContextDocument
+
+
+@dataclass(frozen=True)
+class AnswerCacheKey:
+    scope: Tuple[Hashable, ...]   # ID dokumen hasil retrieval (+ label vision untuk diagnosis)
+    embedding: np.ndarray         # embedding query float32, dinormalisasi
+    catalog_version: int
+
+
+@dataclass(frozen=True)
+class _AnswerEntry:
+    scope: Tuple[Hashable, ...]
+    embedding: np.ndarray
+    answer: str
+    size: int
+    expires_at: float
+
+
+def answer_cache_key(query_embedding: Sequence[float], retrieved_docs: List[ContextDocument],
+                     catalog_version: int, *extra: Hashable) -> AnswerCacheKey:
+    """Bentuk key cache jawaban dari embedding query dan himpunan dokumen konteks yang dipakai prompt."""
+    embedding = np.asarray(query_embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(embedding))
+    if norm > 0:
+        embedding = embedding / norm
+    doc_ids = tuple(sorted((doc.source, (doc.metadata or {}).get("id")) for doc in retrieved_docs))
+    return AnswerCacheKey(scope=tuple(extra) + (doc_ids,), embedding=embedding, catalog_version=catalog_version)
+
+
+class SemanticAnswerCache:
+    """
+    Cache jawaban LLM berdasarkan kemiripan makna query.
+
+    Jawaban hanya dipakai ulang bila himpunan dokumen hasil retrieval (dan label vision untuk diagnosis)
+    sama persis dan cosine similarity embedding query >= `similarity_threshold`. Ukuran dibatasi jumlah
+    entri dan total byte (LRU); entri dibuang saat versi katalog naik atau TTL habis.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, similarity_threshold: float, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, _AnswerEntry]" = OrderedDict()
+        self._scopes: Dict[Tuple[Hashable, ...], Dict[int, None]] = {}
+        self._ids = itertools.count()
+        self._bytes = 0
+        self._catalog_version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: AnswerCacheKey) -> Optional[str]:
+        with self._lock:
+            best_id, best_similarity = None, self.similarity_threshold
+            if self._sync_catalog_version(key.catalog_version):
+                now = time.monotonic()
+                for entry_id in list(self._scopes.get(key.scope, ())):
+                    entry = self._entries[entry_id]
+                    if entry.expires_at < now:
+                        self._remove(entry_id)
+                        continue
+                    similarity = float(np.dot(entry.embedding, key.embedding))
+                    if similarity >= best_similarity:
+                        best_id, best_similarity = entry_id, similarity
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id].answer
+
+    def put(self, key: AnswerCacheKey, answer: str):
+        size = len(answer.encode("utf-8")) + key.embedding.nbytes
+        with self._lock:
+            # Jawaban dari katalog versi lama (katalog berubah selama generate) tidak disimpan
+            if not answer or size > self.max_bytes or not self._sync_catalog_version(key.catalog_version):
+                return
+            entry_id = next(self._ids)
+            self._entries[entry_id] = _AnswerEntry(key.scope, key.embedding, answer, size, time.monotonic() + self.ttl_seconds)
+            self._scopes.setdefault(key.scope, {})[entry_id] = None
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _sync_catalog_version(self, catalog_version: int) -> bool:
+        if catalog_version > self._catalog_version:
+            self._entries.clear()
+            self._scopes.clear()
+            self._bytes = 0
+            self._catalog_version = catalog_version
+            self.invalidations += 1
+        return catalog_version == self._catalog_version
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        self._bytes -= entry.size
+        scope_ids = self._scopes[entry.scope]
+        del scope_ids[entry_id]
+        if not scope_ids:
+            del self._scopes[entry.scope]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "similarity_threshold": self.similarity_threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "catalog_version": self._catalog_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
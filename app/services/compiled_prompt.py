@@ -0,0 +1,27 @@
+from string import Formatter
+from typing import List, Tuple
+
+
+class CompiledPrompt:
+    """
+    Template prompt dengan sintaks `{variabel}` yang sama dengan PromptTemplate LangChain, tetapi
+    di-parse sekali saat service dibuat. format() hanya menyambung potongan teks dan nilai variabel,
+    hasilnya identik dengan `template.format(**values)`.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        # (True, nama variabel) atau (False, teks literal)
+        self._parts: List[Tuple[bool, str]] = []
+        for literal, field, format_spec, conversion in Formatter().parse(template):
+            if literal:
+                self._parts.append((False, literal))
+            if field is None:
+                continue
+            if not field.isidentifier() or format_spec or conversion:
+                raise ValueError(f"Unsupported prompt placeholder: {{{field}}}")
+            self._parts.append((True, field))
+        self.input_variables = sorted({text for is_field, text in self._parts if is_field})
+
+    def format(self, **values: str) -> str:
+        return "".join(str(values[text]) if is_field else text for is_field, text in self._parts)
@@ -0,0 +1,149 @@
+import math
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from app.schemas.chat import ContextDocument
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+# Awal field hasil render_content, misalnya "Deskripsi: ..." atau "Jam Kerja: ..."
+_FIELD_START = re.compile(r"^([A-Z][\w ]{0,30}):\s?(.*)$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Perkiraan jumlah token tanpa tokenizer model: tiap kata ~4 karakter per token, tiap tanda baca 1 token."""
+    return sum((len(piece) + 3) // 4 for piece in _TOKEN_PIECES.findall(text))
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _truncate(value: str, max_chars: int) -> str:
+    value = " ".join(value.split())
+    if max_chars <= 0 or len(value) <= max_chars:
+        return value
+    cut = value.rfind(" ", 0, max_chars)
+    return value[:cut if cut > max_chars // 2 else max_chars].rstrip(" ,;.") + "…"
+
+
+def _split_fields(content: str) -> List[Tuple[Optional[str], str]]:
+    """Pecah konten dokumen menjadi (label, nilai); baris tanpa label adalah lanjutan field sebelumnya."""
+    fields: List[Tuple[Optional[str], str]] = []
+    for line in content.splitlines():
+        match = _FIELD_START.match(line)
+        if match:
+            fields.append((match.group(1), match.group(2)))
+        elif fields:
+            fields[-1] = (fields[-1][0], fields[-1][1] + "\n" + line)
+        else:
+            fields.append((None, line))
+    return fields
+
+
+@dataclass(frozen=True)
+class BuiltContext:
+    text: str
+    documents: List[ContextDocument]   # dokumen yang masuk prompt, urut dari yang paling relevan
+    tokens: int                        # perkiraan token konteks yang dipakai
+    raw_tokens: int                    # perkiraan token bila semua dokumen digabung utuh
+    dropped: int                       # dokumen dibuang: di luar cutoff relevansi, duplikat, atau melebihi budget
+
+
+class ContextBuilder:
+    """
+    Penyusun konteks prompt RAG dengan batas token.
+
+    Dokumen diurutkan berdasarkan jarak (paling mirip dulu) dan yang jaraknya melewati `max_distance`
+    dibuang. Setiap field dipotong menjadi paling banyak `field_max_chars` karakter, field panjang yang
+    isinya sudah muncul di dokumen sebelumnya dilewati, lalu dokumen ditambahkan selama perkiraan
+    tokennya masih muat dalam `token_budget` (dokumen teratas selalu disertakan).
+    """
+
+    def __init__(self, token_budget: int, max_distance: Optional[float], field_max_chars: int, dedup_min_chars: int = 40):
+        self.token_budget = token_budget
+        self.max_distance = max_distance
+        self.field_max_chars = field_max_chars
+        self.dedup_min_chars = dedup_min_chars
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.raw_tokens = 0
+        self.tokens = 0
+        self.documents = 0
+        self.dropped = 0
+
+    def build(self, docs: List[ContextDocument], template: str, empty_text: str) -> BuiltContext:
+        """
+        Args:
+            docs (List[ContextDocument]): Dokumen hasil retrieval.
+            template (str): Format satu dokumen dengan placeholder {source} dan {content}.
+            empty_text (str): Konteks pengganti bila tidak ada dokumen yang tersisa.
+        """
+        raw_tokens = estimate_tokens("\n\n".join(template.format(source=doc.source, content=doc.content) for doc in docs))
+        ranked = sorted(docs, key=lambda doc: self._distance(doc))
+
+        seen_values = set()
+        seen_documents = set()
+        pieces: List[str] = []
+        selected: List[ContextDocument] = []
+        used = 0
+        for doc in ranked:
+            if self.max_distance is not None and self._distance(doc) > self.max_distance:
+                continue
+            # Dokumen yang sama (ID sama atau isi identik) cukup sekali
+            keys = {(doc.source, (doc.metadata or {}).get("id")), _normalize(doc.content)} - {(doc.source, None)}
+            if keys & seen_documents:
+                continue
+            content = self._compact(doc.content, seen_values)
+            piece = template.format(source=doc.source, content=content)
+            # +1 untuk pemisah antar dokumen
+            cost = estimate_tokens(piece) + 1
+            if selected and self.token_budget > 0 and used + cost > self.token_budget:
+                continue
+            seen_documents |= keys
+            pieces.append(piece)
+            selected.append(doc.model_copy(update={"content": content}))
+            used += cost
+            self._remember(content, seen_values)
+
+        text = "\n\n".join(pieces) if pieces else empty_text
+        built = BuiltContext(text=text, documents=selected, tokens=estimate_tokens(text), raw_tokens=raw_tokens,
+                             dropped=len(docs) - len(selected))
+        with self._lock:
+            self.requests += 1
+            self.raw_tokens += built.raw_tokens
+            self.tokens += built.tokens
+            self.documents += len(built.documents)
+            self.dropped += built.dropped
+        return built
+
+    def _distance(self, doc: ContextDocument) -> float:
+        distance = (doc.metadata or {}).get("distance")
+        return math.inf if distance is None else float(distance)
+
+    def _compact(self, content: str, seen_values: set) -> str:
+        lines = []
+        for label, value in _split_fields(content):
+            value = _truncate(value, self.field_max_chars)
+            if len(value) >= self.dedup_min_chars and _normalize(value) in seen_values:
+                continue
+            lines.append(f"{label}: {value}" if label is not None else value)
+        return "\n".join(lines)
+
+    def _remember(self, content: str, seen_values: set):
+        for _, value in _split_fields(content):
+            if len(value) >= self.dedup_min_chars:
+                seen_values.add(_normalize(value))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "token_budget": self.token_budget,
+            "max_distance": self.max_distance,
+            "field_max_chars": self.field_max_chars,
+            "requests": self.requests,
+            "avg_raw_tokens": round(self.raw_tokens / self.requests, 1) if self.requests else 0.0,
+            "avg_tokens": round(self.tokens / self.requests, 1) if self.requests else 0.0,
+            "avg_documents": round(self.documents / self.requests, 2) if self.requests else 0.0,
+            "dropped_documents": self.dropped,
+            "saved_token_ratio": round(1 - self.tokens / self.raw_tokens, 4) if self.raw_tokens else 0.0,
+        }
@@ -1,30 +1,109 @@
 # app/services/diagnosis_service.py
 from fastapi import UploadFile, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload, selectinload, load_only
 from app.models.diagnosis import Diagnosis
+from app.models.diagnosis_doctor import DiagnosisDoctor
+from app.models.medical_image import MedicalImage
+from app.models.doctor import Doctor
 from app.services.embedding_service import embedding_service
 from app.services.aidoc_service import aidoc_service
 from app.services.retrieval_service import retrieval_service
+from app.services.answer_cache import SemanticAnswerCache, AnswerCacheKey, answer_cache_key
+from app.services.context_builder import ContextBuilder
+from app.services.generation_profiles import GenerationProfile, generation_profiles
+from app.core.config import settings
 from app.schemas.chat import ChatRequest, ChatResponse, ContextDocument
 from app.schemas.medical_image import MedicalImageCreate, MedicalImageUpdate
 from app.schemas.diagnosis import DiagnosisCreate, DiagnosisUpdate
 from app.services.vision_model_service import vision_model_service
 from app.services.medical_image_service import medical_image_service
 import logging
-from typing import List, Optional
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
 
 logger = logging.getLogger(__name__)
 
 class DiagnosisService:
-    async def create_diagnosis(self, db: Session, image_file: UploadFile, diagnosis_data: DiagnosisCreate):
-        medical_image_data = MedicalImageCreate(
-            patient_id=diagnosis_data.patient_id,
+    def __init__(self):
+        self.answer_cache = SemanticAnswerCache(
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            max_bytes=settings.ANSWER_CACHE_MAX_BYTES,
+            similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+        ) if settings.ANSWER_CACHE_ENABLED else None
+        self.context_builder = ContextBuilder(
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            max_distance=settings.CONTEXT_MAX_DISTANCE,
+            field_max_chars=settings.CONTEXT_FIELD_MAX_CHARS
         )
 
-        medical_image = await medical_image_service.create_medical_image_with_file(db, medical_image_data, image_file)
+    def _build_doctor_links(self, retrieved_docs: List[ContextDocument]) -> List[DiagnosisDoctor]:
+        """Simpan dokter hasil retrieval sebagai rujukan diagnosis, berurutan sesuai peringkat kemiripan."""
+        doctor_links: List[DiagnosisDoctor] = []
+        for doc in retrieved_docs:
+            if doc.source == "doctor" and doc.metadata and doc.metadata.get("id") is not None:
+                doctor_links.append(DiagnosisDoctor(
+                    doctor_id=doc.metadata["id"],
+                    rank=len(doctor_links) + 1,
+                    distance=doc.metadata.get("distance")
+                ))
+        return doctor_links
+
+    def _replace_doctor_links(self, diagnosis: Diagnosis, doctor_links: List[DiagnosisDoctor]) -> None:
+        """Ganti rujukan dokter; baris lama untuk dokter yang sama diperbarui agar primary key tidak bentrok saat flush."""
+        existing_links = {link.doctor_id: link for link in diagnosis.doctor_links}
+        merged_links: List[DiagnosisDoctor] = []
+        for link in doctor_links:
+            current = existing_links.get(link.doctor_id)
+            if current is not None:
+                current.rank = link.rank
+                current.distance = link.distance
+                merged_links.append(current)
+            else:
+                merged_links.append(link)
+        diagnosis.doctor_links = merged_links
+
+    def _related_doctors(self, doctor_links: List[DiagnosisDoctor]) -> List[Dict[str, Any]]:
+        related_doctors = []
+        for link in doctor_links:
+            if link.doctor is None:
+                continue
+            related_doctors.append({
+                "id": link.doctor.id,
+                "name": link.doctor.name,
+                "speciality": link.doctor.speciality,
+                "location": link.doctor.location,
+                "practice_schedule": link.doctor.practice_schedule,
+                "rank": link.rank,
+                "distance": link.distance
+            })
+        return related_doctors
+
+    def _to_response(self, diagnosis: Diagnosis, path: Optional[str] = None, cached: bool = False) -> Dict[str, Any]:
+        """Bentuk respons diagnosis dari baris yang sudah dimuat beserta dokter rujukannya."""
+        if path is None:
+            path = diagnosis.medical_image.path if diagnosis.medical_image else ""
+
+        return {
+            "id": diagnosis.id,
+            "path": path,
+            "query": diagnosis.query,
+            "result": diagnosis.result,
+            "related_doctors": self._related_doctors(diagnosis.doctor_links),
+            "cached": cached,
+            "profile": diagnosis.generation_profile,
+            "model": diagnosis.generation_model
+        }
 
-        query_embedding = await embedding_service.get_embedding(diagnosis_data.query)
+    async def _prepare_context(self, db: AsyncSession, query: str, medical_image: MedicalImage
+                               ) -> Tuple[Optional[int], List[DiagnosisDoctor], str, Optional[AnswerCacheKey]]:
+        """Retrieval katalog untuk keluhan pasien: disease teratas, dokter rujukan, konteks prompt AIDOC, dan key cache jawaban."""
+        catalog_version = retrieval_service.catalog_version
+        query_embedding = await embedding_service.get_embedding(query)
         retrieved_docs_from_db = await retrieval_service.retrieve_documents(db, query_embedding)
+        # Akhiri transaksi baca agar koneksi kembali ke pool selama menunggu LLM
+        await db.commit()
 
         retrieved_docs_pydantic: List[ContextDocument] = []
         if retrieved_docs_from_db:
@@ -39,20 +118,15 @@ class DiagnosisService:
                 disease_id = doc.metadata["id"]
                 break
 
-        related_doctors = []
-        for doc in retrieved_docs_pydantic:
-            if doc.source == "doctor":
-                related_doctors.append({
-                    "id": doc.metadata.get("id"),
-                    "name": doc.metadata.get("name"),
-                    "speciality": doc.content.split("\n")[1].replace("Spesialis: ", ""),
-                    "location": doc.content.split("\n")[2].replace("Lokasi: ", ""),
-                    "practice_schedule": doc.content.split("\n")[3].replace("Jam Kerja: ", "")
-                })
-
-        retrieved_docs_context_str = "\n\n".join([f"Sumber Dokumen: {doc.source}\nKonten Dokumen: {doc.content}" for doc in retrieved_docs_pydantic])
-        if not retrieved_docs_pydantic:
-            retrieved_docs_context_str = "tidak ada informasi dokumen relevan yang ditemukan di database."
+        doctor_links = self._build_doctor_links(retrieved_docs_pydantic)
+
+        # Rujukan dokter tetap dari seluruh hasil retrieval; prompt hanya memuat dokumen yang lolos budget token
+        built = self.context_builder.build(retrieved_docs_pydantic,
+                                           template="Sumber Dokumen: {source}\nKonten Dokumen: {content}",
+                                           empty_text="tidak ada informasi dokumen relevan yang ditemukan di database.")
+        retrieved_docs_context_str = built.text
+        logger.info(f"Diagnosis context: {len(built.documents)}/{len(retrieved_docs_pydantic)} documents, "
+                    f"~{built.tokens} tokens (unbudgeted ~{built.raw_tokens})")
 
         final_context_parts = []
         if medical_image:
@@ -62,180 +136,222 @@ class DiagnosisService:
 
         context_str = "\n\n---\n\n".join(final_context_parts)
 
-        answer = await aidoc_service.generate_response(question=diagnosis_data.query, context=context_str)
+        cache_key = None
+        if self.answer_cache is not None:
+            cache_key = answer_cache_key(query_embedding, built.documents, catalog_version,
+                                         medical_image.label if medical_image else None)
+
+        return disease_id, doctor_links, context_str, cache_key
+
+    async def _generate_answer(self, query: str, context_str: str, cache_key: Optional[AnswerCacheKey]
+                               ) -> Tuple[str, bool, GenerationProfile]:
+        """Jawaban AIDOC untuk konteks diagnosis; mengembalikan (jawaban, True bila diambil dari cache, profil generate)."""
+        if cache_key is not None:
+            cached_answer = self.answer_cache.get(cache_key)
+            if cached_answer is not None:
+                # Jawaban degraded tidak pernah di-cache, jadi jawaban cache berasal dari profil diagnosis
+                return cached_answer, True, generation_profiles.profiles[aidoc_service.lane]
+
+        profile = aidoc_service.select_profile()
+        answer = await aidoc_service.generate_response(question=query, context=context_str, profile=profile)
+        if cache_key is not None and not profile.degraded:
+            self.answer_cache.put(cache_key, answer)
+        return answer, False, profile
+
+    async def create_diagnosis(self, db: AsyncSession, image_file: UploadFile, diagnosis_data: DiagnosisCreate):
+        # Antrean LLM penuh ditolak (429) sebelum upload disimpan dan inference vision dijalankan
+        aidoc_service.ensure_capacity()
+
+        medical_image_data = MedicalImageCreate(
+            patient_id=diagnosis_data.patient_id,
+        )
+
+        medical_image = await medical_image_service.create_medical_image_with_file_async(db, medical_image_data, image_file)
+
+        disease_id, doctor_links, context_str, cache_key = await self._prepare_context(db, diagnosis_data.query, medical_image)
+
+        try:
+            answer, cached, profile = await self._generate_answer(diagnosis_data.query, context_str, cache_key)
+        except HTTPException:
+            # Slot LLM tetap hilang (429/503) atau generate timeout (504): jangan tinggalkan gambar tanpa diagnosis
+            await medical_image_service.discard_medical_image_async(db, medical_image)
+            raise
 
         db_diagnosis = Diagnosis(
             query=diagnosis_data.query,
             result=answer,
             disease_id=disease_id,
-            medical_image_id=medical_image.id
+            medical_image_id=medical_image.id,
+            doctor_links=doctor_links,
+            generation_profile=profile.name,
+            generation_model=profile.model
         )
 
         db.add(db_diagnosis)
-        db.commit()
-        db.refresh(db_diagnosis)
+        await db.commit()
 
-        return {
-            "id": db_diagnosis.id,
-            "path": medical_image.path,
-            "query": diagnosis_data.query,
-            "result": answer,
-            "related_doctors": related_doctors
-        }
+        return self._to_response(await self._get_loaded_diagnosis(db, db_diagnosis.id), path=medical_image.path, cached=cached)
     
-    async def get_all_diagnosis(self, db: Session, skip: int = 0, limit: int = 100):
+    async def stream_diagnosis(self, db: AsyncSession, image_file: UploadFile, diagnosis_data: DiagnosisCreate) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Versi streaming create_diagnosis. Upload, label vision, dan retrieval diproses sebelum fungsi ini
+        kembali (error pada tahap ini tetap menjadi respons HTTP biasa).
+
+        Returns:
+            AsyncIterator[Tuple[str, Any]]: Event (nama, data) berurutan: "image" (label vision),
+            "doctors" (dokter rujukan), "paragraph" per paragraf jawaban yang sudah dibersihkan, lalu
+            "done" berisi diagnosis yang sudah disimpan. Jawaban dari cache dikirim langsung per paragraf.
+        """
+        # Antrean LLM penuh ditolak (429) sebelum upload disimpan dan inference vision dijalankan
+        aidoc_service.ensure_capacity()
+
+        medical_image_data = MedicalImageCreate(
+            patient_id=diagnosis_data.patient_id,
+        )
+
+        medical_image = await medical_image_service.create_medical_image_with_file_async(db, medical_image_data, image_file)
+
+        disease_id, doctor_links, context_str, cache_key = await self._prepare_context(db, diagnosis_data.query, medical_image)
+
+        if doctor_links:
+            result = await db.execute(select(Doctor)
+                                      .filter(Doctor.id.in_([link.doctor_id for link in doctor_links]))
+                                      .options(load_only(Doctor.id, Doctor.name, Doctor.speciality, Doctor.location, Doctor.practice_schedule)))
+            doctors = {doctor.id: doctor for doctor in result.scalars()}
+            for link in doctor_links:
+                link.doctor = doctors.get(link.doctor_id)
+            await db.commit()
+
+        cached_answer = self.answer_cache.get(cache_key) if cache_key is not None else None
+        if cached_answer is None:
+            # Periksa ulang sebelum header respons streaming terkirim; antrean bisa penuh selama upload dan retrieval
+            try:
+                aidoc_service.ensure_capacity()
+            except HTTPException:
+                await medical_image_service.discard_medical_image_async(db, medical_image)
+                raise
+            profile = aidoc_service.select_profile()
+        else:
+            profile = generation_profiles.profiles[aidoc_service.lane]
+
+        return self._stream_events(db, diagnosis_data.query, medical_image, disease_id, doctor_links, context_str,
+                                   cache_key, cached_answer, profile)
+
+    async def _stream_events(self, db: AsyncSession, query: str, medical_image: MedicalImage, disease_id: Optional[int],
+                             doctor_links: List[DiagnosisDoctor], context_str: str,
+                             cache_key: Optional[AnswerCacheKey], cached_answer: Optional[str],
+                             profile: GenerationProfile) -> AsyncIterator[Tuple[str, Any]]:
+        try:
+            yield "image", {"medical_image_id": medical_image.id, "path": medical_image.path, "label": medical_image.label}
+            yield "doctors", self._related_doctors(doctor_links)
+
+            paragraphs: List[str] = []
+            if cached_answer is not None:
+                for paragraph in cached_answer.split("\n\n"):
+                    paragraphs.append(paragraph)
+                    yield "paragraph", {"index": len(paragraphs) - 1, "text": paragraph}
+            else:
+                try:
+                    async for paragraph in aidoc_service.stream_paragraphs(question=query, context=context_str, profile=profile):
+                        paragraphs.append(paragraph)
+                        yield "paragraph", {"index": len(paragraphs) - 1, "text": paragraph}
+                except HTTPException:
+                    # Slot LLM hilang (503) atau generate timeout (504) setelah stream dimulai
+                    await medical_image_service.discard_medical_image_async(db, medical_image)
+                    raise
+                if cache_key is not None and not profile.degraded:
+                    self.answer_cache.put(cache_key, "\n\n".join(paragraphs))
+
+            # Diagnosis hanya disimpan bila stream selesai; jika klien memutus koneksi, generator dibatalkan di atas
+            db_diagnosis = Diagnosis(
+                query=query,
+                result="\n\n".join(paragraphs),
+                disease_id=disease_id,
+                medical_image_id=medical_image.id,
+                doctor_links=doctor_links,
+                generation_profile=profile.name,
+                generation_model=profile.model
+            )
+            db.add(db_diagnosis)
+            await db.commit()
+
+            yield "done", self._to_response(await self._get_loaded_diagnosis(db, db_diagnosis.id), path=medical_image.path,
+                                            cached=cached_answer is not None)
+        finally:
+            await db.close()
+
+    def _diagnosis_query(self):
+        """Query dasar diagnosis: medical image dan dokter rujukan dimuat dalam satu query join."""
+        return (select(Diagnosis)
+                .join(MedicalImage, Diagnosis.medical_image_id == MedicalImage.id)
+                .options(contains_eager(Diagnosis.medical_image),
+                         joinedload(Diagnosis.doctor_links).joinedload(DiagnosisDoctor.doctor)
+                         .load_only(Doctor.id, Doctor.name, Doctor.speciality, Doctor.location, Doctor.practice_schedule)))
+
+    async def _get_loaded_diagnosis(self, db: AsyncSession, diagnosis_id: int) -> Optional[Diagnosis]:
+        # populate_existing: muat ulang relasi objek yang sudah ada di session (AsyncSession tidak bisa lazy load)
+        result = await db.execute(self._diagnosis_query()
+                                  .filter(Diagnosis.id == diagnosis_id)
+                                  .execution_options(populate_existing=True))
+        return result.unique().scalars().first()
+
+    async def get_all_diagnosis(self, db: AsyncSession, skip: int = 0, limit: int = 100):
         """Get all diagnoses with complete information"""
         try:
-            from app.models.medical_image import MedicalImage
-            
-            diagnoses = (db.query(Diagnosis)
-                        .join(MedicalImage, Diagnosis.medical_image_id == MedicalImage.id)
-                        .offset(skip)
-                        .limit(limit)
-                        .all())
-            
-            result = []
-            for diagnosis in diagnoses:
-                # Get related doctors
-                query_embedding = await embedding_service.get_embedding(diagnosis.query)
-                retrieved_docs_from_db = await retrieval_service.retrieve_documents(db, query_embedding)
-
-                related_doctors = []
-                if retrieved_docs_from_db:
-                    for doc_db in retrieved_docs_from_db:
-                        if getattr(doc_db, 'source', '') == "doctor":
-                            content = getattr(doc_db, 'content', '')
-                            metadata = getattr(doc_db, 'metadata', {})
-                            
-                            # Parse content to extract doctor info
-                            content_lines = content.split("\n")
-                            related_doctors.append({
-                                "id": metadata.get("id"),
-                                "name": metadata.get("name"),
-                                "speciality": content_lines[1].replace("Spesialis: ", "") if len(content_lines) > 1 else "",
-                                "location": content_lines[2].replace("Lokasi: ", "") if len(content_lines) > 2 else "",
-                                "practice_schedule": content_lines[3].replace("Jam Kerja: ", "") if len(content_lines) > 3 else ""
-                            })
-                
-                result.append({
-                    "id": diagnosis.id,
-                    "path": diagnosis.medical_image.path if diagnosis.medical_image else "",
-                    "query": diagnosis.query,
-                    "result": diagnosis.result,
-                    "related_doctors": related_doctors
-                })
-            
-            return result
+            result = await db.execute(self._diagnosis_query()
+                                      .order_by(Diagnosis.id)
+                                      .offset(skip)
+                                      .limit(limit))
+            diagnoses = result.unique().scalars().all()
+
+            return [self._to_response(diagnosis) for diagnosis in diagnoses]
         except Exception as e:
             logger.error(f"Error getting all diagnoses: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to get diagnoses: {str(e)}")
     
-    async def get_all_diagnosis_by_patient_id(self, db: Session, patient_id: int, skip: int = 0, limit: int = 100):
+    async def get_all_diagnosis_by_patient_id(self, db: AsyncSession, patient_id: int, skip: int = 0, limit: int = 100):
         """Get all diagnoses by patient_id with complete information"""
         try:
-            from app.models.medical_image import MedicalImage
-            
-            diagnoses = (db.query(Diagnosis)
-                        .join(MedicalImage, Diagnosis.medical_image_id == MedicalImage.id)
-                        .filter(MedicalImage.patient_id == patient_id)
-                        .offset(skip)
-                        .limit(limit)
-                        .all())
-            
-            result = []
-            for diagnosis in diagnoses:
-                # Get related doctors
-                query_embedding = await embedding_service.get_embedding(diagnosis.query)
-                retrieved_docs_from_db = await retrieval_service.retrieve_documents(db, query_embedding)
-
-                related_doctors = []
-                if retrieved_docs_from_db:
-                    for doc_db in retrieved_docs_from_db:
-                        if getattr(doc_db, 'source', '') == "doctor":
-                            content = getattr(doc_db, 'content', '')
-                            metadata = getattr(doc_db, 'metadata', {})
-                            
-                            # Parse content to extract doctor info
-                            content_lines = content.split("\n")
-                            related_doctors.append({
-                                "id": metadata.get("id"),
-                                "name": metadata.get("name"),
-                                "speciality": content_lines[1].replace("Spesialis: ", "") if len(content_lines) > 1 else "",
-                                "location": content_lines[2].replace("Lokasi: ", "") if len(content_lines) > 2 else "",
-                                "practice_schedule": content_lines[3].replace("Jam Kerja: ", "") if len(content_lines) > 3 else ""
-                            })
-                
-                result.append({
-                    "id": diagnosis.id,
-                    "path": diagnosis.medical_image.path if diagnosis.medical_image else "",
-                    "query": diagnosis.query,
-                    "result": diagnosis.result,
-                    "related_doctors": related_doctors
-                })
-            
-            return result
+            result = await db.execute(self._diagnosis_query()
+                                      .filter(MedicalImage.patient_id == patient_id)
+                                      .order_by(Diagnosis.id)
+                                      .offset(skip)
+                                      .limit(limit))
+            diagnoses = result.unique().scalars().all()
+
+            return [self._to_response(diagnosis) for diagnosis in diagnoses]
         except Exception as e:
             logger.error(f"Error getting diagnoses for patient {patient_id}: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to get patient diagnoses: {str(e)}")
     
-    async def get_diagnosis_by_id(self, db: Session, diagnosis_id: int):
+    async def get_diagnosis_by_id(self, db: AsyncSession, diagnosis_id: int):
         """Get diagnosis by ID with complete information"""
         try:
-            from app.models.medical_image import MedicalImage
-            
-            diagnosis = (db.query(Diagnosis)
-                        .join(MedicalImage, Diagnosis.medical_image_id == MedicalImage.id)
-                        .filter(Diagnosis.id == diagnosis_id)
-                        .first())
+            diagnosis = await self._get_loaded_diagnosis(db, diagnosis_id)
             
             if not diagnosis:
                 raise HTTPException(status_code=404, detail="Diagnosis not found")
-            
-            # Get related doctors
-            query_embedding = await embedding_service.get_embedding(diagnosis.query)
-            retrieved_docs_from_db = await retrieval_service.retrieve_documents(db, query_embedding)
-
-            related_doctors = []
-            if retrieved_docs_from_db:
-                for doc_db in retrieved_docs_from_db:
-                    if getattr(doc_db, 'source', '') == "doctor":
-                        content = getattr(doc_db, 'content', '')
-                        metadata = getattr(doc_db, 'metadata', {})
-                        
-                        # Parse content to extract doctor info
-                        content_lines = content.split("\n")
-                        related_doctors.append({
-                            "id": metadata.get("id"),
-                            "name": metadata.get("name"),
-                            "speciality": content_lines[1].replace("Spesialis: ", "") if len(content_lines) > 1 else "",
-                            "location": content_lines[2].replace("Lokasi: ", "") if len(content_lines) > 2 else "",
-                            "practice_schedule": content_lines[3].replace("Jam Kerja: ", "") if len(content_lines) > 3 else ""
-                        })
-            
-            return {
-                "id": diagnosis.id,
-                "path": diagnosis.medical_image.path if diagnosis.medical_image else "",
-                "query": diagnosis.query,
-                "result": diagnosis.result,
-                "related_doctors": related_doctors
-            }
+
+            return self._to_response(diagnosis)
         except HTTPException:
             raise
         except Exception as e:
             logger.error(f"Error getting diagnosis {diagnosis_id}: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to get diagnosis: {str(e)}")
     
-    async def update_diagnosis(self, db: Session, diagnosis_id: int, image_file: Optional[UploadFile], diagnosis_update: DiagnosisUpdate):
+    async def update_diagnosis(self, db: AsyncSession, diagnosis_id: int, image_file: Optional[UploadFile], diagnosis_update: DiagnosisUpdate):
         """Update diagnosis with optional new image - similar to create process"""
         try:
-            # Get existing diagnosis
-            diagnosis = db.query(Diagnosis).filter(Diagnosis.id == diagnosis_id).first()
+            # Get existing diagnosis with its medical image and doctor links
+            result = await db.execute(select(Diagnosis)
+                                      .filter(Diagnosis.id == diagnosis_id)
+                                      .options(joinedload(Diagnosis.medical_image), selectinload(Diagnosis.doctor_links)))
+            diagnosis = result.scalars().first()
             if not diagnosis:
                 raise HTTPException(status_code=404, detail="Diagnosis not found")
             
             # Get current medical image
-            from app.models.medical_image import MedicalImage
-            current_medical_image = db.query(MedicalImage).filter(MedicalImage.id == diagnosis.medical_image_id).first()
+            current_medical_image = diagnosis.medical_image
             
             if not current_medical_image:
                 raise HTTPException(status_code=404, detail="Associated medical image not found")
@@ -247,129 +363,56 @@ class DiagnosisService:
                 medical_image_data = MedicalImageCreate(
                     patient_id=current_medical_image.patient_id,
                 )
-                medical_image = await medical_image_service.create_medical_image_with_file(db, medical_image_data, image_file)
+                medical_image = await medical_image_service.create_medical_image_with_file_async(db, medical_image_data, image_file)
             
             # Use updated query or keep existing
             query = diagnosis_update.query if diagnosis_update.query is not None else diagnosis.query
             
             # Re-process the diagnosis with new/existing image and query
-            query_embedding = await embedding_service.get_embedding(query)
-            retrieved_docs_from_db = await retrieval_service.retrieve_documents(db, query_embedding)
-
-            retrieved_docs_pydantic: List[ContextDocument] = []
-            if retrieved_docs_from_db:
-                for doc_db in retrieved_docs_from_db:
-                    retrieved_docs_pydantic.append(ContextDocument(source=getattr(doc_db, 'source', 'Unknown'),
-                                            content=getattr(doc_db, 'content', ''),
-                                            metadata=getattr(doc_db, 'metadata', {})))
-
-            disease_id = None
-            for doc in retrieved_docs_pydantic:
-                if doc.source == "disease" and "id" in doc.metadata:
-                    disease_id = doc.metadata["id"]
-                    break
-
-            related_doctors = []
-            for doc in retrieved_docs_pydantic:
-                if doc.source == "doctor":
-                    related_doctors.append({
-                        "id": doc.metadata.get("id"),
-                        "name": doc.metadata.get("name"),
-                        "speciality": doc.content.split("\n")[1].replace("Spesialis: ", ""),
-                        "location": doc.content.split("\n")[2].replace("Lokasi: ", ""),
-                        "practice_schedule": doc.content.split("\n")[3].replace("Jam Kerja: ", "")
-                    })
-
-            retrieved_docs_context_str = "\n\n".join([f"Sumber Dokumen: {doc.source}\nKonten Dokumen: {doc.content}" for doc in retrieved_docs_pydantic])
-            if not retrieved_docs_pydantic:
-                retrieved_docs_context_str = "tidak ada informasi dokumen relevan yang ditemukan di database."
-
-            final_context_parts = []
-            if medical_image:
-                final_context_parts.append(medical_image.label)
-
-            final_context_parts.append("INFORMASI DOKUMEN TEKSTUAL TENTANG KELUHAN PENGGUNA (dari database):\n" + retrieved_docs_context_str)
-
-            context_str = "\n\n---\n\n".join(final_context_parts)
-
-            answer = await aidoc_service.generate_response(question=query, context=context_str)
+            disease_id, doctor_links, context_str, cache_key = await self._prepare_context(db, query, medical_image)
+
+            answer, cached, profile = await self._generate_answer(query, context_str, cache_key)
             
             # Update diagnosis fields
             diagnosis.query = query
             diagnosis.result = answer
+            diagnosis.generation_profile = profile.name
+            diagnosis.generation_model = profile.model
             diagnosis.disease_id = disease_id
             diagnosis.medical_image_id = medical_image.id
+            self._replace_doctor_links(diagnosis, doctor_links)
             
-            db.commit()
-            db.refresh(diagnosis)
+            await db.commit()
             
-            return {
-                "id": diagnosis.id,
-                "path": medical_image.path,
-                "query": diagnosis.query,
-                "result": diagnosis.result,
-                "related_doctors": related_doctors
-            }
+            return self._to_response(await self._get_loaded_diagnosis(db, diagnosis_id), path=medical_image.path, cached=cached)
             
         except HTTPException:
             raise
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Error updating diagnosis {diagnosis_id}: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to update diagnosis: {str(e)}")
     
-    async def delete_diagnosis(self, db: Session, diagnosis_id: int):
+    async def delete_diagnosis(self, db: AsyncSession, diagnosis_id: int):
         """Delete diagnosis and return the same format as other methods"""
         try:
-            from app.models.medical_image import MedicalImage
-            
-            diagnosis = (db.query(Diagnosis)
-                        .join(MedicalImage, Diagnosis.medical_image_id == MedicalImage.id)
-                        .filter(Diagnosis.id == diagnosis_id)
-                        .first())
+            diagnosis = await self._get_loaded_diagnosis(db, diagnosis_id)
             
             if not diagnosis:
                 raise HTTPException(status_code=404, detail="Diagnosis not found")
             
-            # Get related doctors
-            query_embedding = await embedding_service.get_embedding(diagnosis.query)
-            retrieved_docs_from_db = await retrieval_service.retrieve_documents(db, query_embedding)
-
-            related_doctors = []
-            if retrieved_docs_from_db:
-                for doc_db in retrieved_docs_from_db:
-                    if getattr(doc_db, 'source', '') == "doctor":
-                        content = getattr(doc_db, 'content', '')
-                        metadata = getattr(doc_db, 'metadata', {})
-                        
-                        # Parse content to extract doctor info
-                        content_lines = content.split("\n")
-                        related_doctors.append({
-                            "id": metadata.get("id"),
-                            "name": metadata.get("name"),
-                            "speciality": content_lines[1].replace("Spesialis: ", "") if len(content_lines) > 1 else "",
-                            "location": content_lines[2].replace("Lokasi: ", "") if len(content_lines) > 2 else "",
-                            "practice_schedule": content_lines[3].replace("Jam Kerja: ", "") if len(content_lines) > 3 else ""
-                        })
-            
             # Store data before deletion
-            result_data = {
-                "id": diagnosis.id,
-                "path": diagnosis.medical_image.path if diagnosis.medical_image else "",
-                "query": diagnosis.query,
-                "result": diagnosis.result,
-                "related_doctors": related_doctors,
-                "message": "Diagnosis successfully deleted"
-            }
+            result_data = self._to_response(diagnosis)
+            result_data["message"] = "Diagnosis successfully deleted"
             
-            db.delete(diagnosis)
-            db.commit()
+            await db.delete(diagnosis)
+            await db.commit()
             
             return result_data
         except HTTPException:
             raise
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Error deleting diagnosis {diagnosis_id}: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to delete diagnosis: {str(e)}")
 
@@ -4,6 +4,11 @@ from typing import List, Optional
 from app.models.disease import Disease
 from app.schemas.disease import DiseaseCreate, DiseaseUpdate, DiseaseResponse
 from app.services.embedding_service import embedding_service
+from app.services.retrieval_service import retrieval_service
+from app.core.config import settings
+
+def build_embedding_text(name: str, description: Optional[str]) -> str:
+    return f"{name}: {description}" if description else name
 
 def get_disease(db: Session, disease_id: int) -> Optional[DiseaseResponse]:
     return db.query(Disease).filter(Disease.id == disease_id).first()
@@ -12,7 +17,7 @@ def get_diseases(db: Session) -> List[DiseaseResponse]:
     return db.query(Disease).all()
 
 async def create_disease(db: Session, disease_data: DiseaseCreate) -> DiseaseResponse:
-    combined_text = f"{disease_data.name}: {disease_data.description}" if disease_data.description else disease_data.name
+    combined_text = build_embedding_text(disease_data.name, disease_data.description)
     embedding = await embedding_service.get_embedding(combined_text)
     db_disease = Disease(
         name=disease_data.name,
@@ -20,11 +25,13 @@ async def create_disease(db: Session, disease_data: DiseaseCreate) -> DiseaseRes
         symptoms=disease_data.symptoms,
         treatment=disease_data.treatment,
         poli_id=disease_data.poli_id,
-        embedding=embedding
+        embedding=embedding,
+        embedding_model=settings.EMBEDDING_MODEL_NAME
     )
     db.add(db_disease)
     db.commit()
     db.refresh(db_disease)
+    retrieval_service.catalog_updated("disease", db_disease)
     return db_disease
 
 async def update_disease(db: Session, disease_id: int, disease_update: DiseaseUpdate) -> Optional[DiseaseResponse]:
@@ -38,15 +45,17 @@ async def update_disease(db: Session, disease_id: int, disease_update: DiseaseUp
     if should_update_embedding:
         new_name = update_data.get("name", db_disease.name)
         new_description = update_data.get("description", db_disease.description)
-        combined_text = f"{new_name}: {new_description}"
+        combined_text = build_embedding_text(new_name, new_description)
         embedding = await embedding_service.get_embedding(combined_text)
         update_data["embedding"] = embedding
+        update_data["embedding_model"] = settings.EMBEDDING_MODEL_NAME
 
     for field, value in update_data.items():
         setattr(db_disease,field, value)
     
     db.commit()
     db.refresh(db_disease)
+    retrieval_service.catalog_updated("disease", db_disease)
     return db_disease
 
 def delete_disease(db: Session, disease_id: int) -> bool:
@@ -56,4 +65,5 @@ def delete_disease(db: Session, disease_id: int) -> bool:
     
     db.delete(db_disease)
     db.commit()
+    retrieval_service.catalog_deleted("disease", disease_id)
     return True
\ No newline at end of file
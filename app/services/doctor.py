@@ -4,6 +4,11 @@ from typing import List, Optional
 from app.models.doctor import Doctor
 from app.schemas.doctor import DoctorCreate, DoctorUpdate, DoctorResponse
 from app.services.embedding_service import embedding_service
+from app.services.retrieval_service import retrieval_service
+from app.core.config import settings
+
+def build_embedding_text(name: str, speciality: Optional[str], profile: Optional[str]) -> str:
+    return f"{name} {speciality or ''} {profile or ''}".strip()
 
 def get_doctor(db: Session, doctor_id: int) -> Optional[DoctorResponse]:
     return db.query(Doctor).filter(Doctor.id == doctor_id).first()
@@ -18,7 +23,7 @@ def get_doctors_by_poli_id(db: Session, poli_id: int) -> List[DoctorResponse]:
     return db.query(Doctor).filter(Doctor.poli_id == poli_id).all()
 
 async def create_doctor(db: Session, doctor_data: DoctorCreate) -> DoctorResponse:
-    combined_text = f"{doctor_data.name} {doctor_data.speciality or ''} {doctor_data.profile or ''}".strip()
+    combined_text = build_embedding_text(doctor_data.name, doctor_data.speciality, doctor_data.profile)
     embedding = await embedding_service.get_embedding(combined_text)
     db_doctor = Doctor(
         name=doctor_data.name,
@@ -28,11 +33,13 @@ async def create_doctor(db: Session, doctor_data: DoctorCreate) -> DoctorRespons
         location=doctor_data.location,
         practice_schedule=doctor_data.practice_schedule,
         poli_id=doctor_data.poli_id,
-        embedding=embedding
+        embedding=embedding,
+        embedding_model=settings.EMBEDDING_MODEL_NAME
     )
     db.add(db_doctor)
     db.commit()
     db.refresh(db_doctor)
+    retrieval_service.catalog_updated("doctor", db_doctor)
     return db_doctor
 
 async def update_doctor(db: Session, doctor_id: int, doctor_update: DoctorUpdate) -> Optional[DoctorResponse]:
@@ -47,19 +54,21 @@ async def update_doctor(db: Session, doctor_id: int, doctor_update: DoctorUpdate
     )
 
     if should_regenerate:
-        combined_text = (
-            f"{update_data.get('name', db_doctor.name)} "
-            f"{update_data.get('speciality', db_doctor.speciality) or ''} "
-            f"{update_data.get('profile', db_doctor.profile) or ''}"
-        ).strip()
+        combined_text = build_embedding_text(
+            update_data.get('name', db_doctor.name),
+            update_data.get('speciality', db_doctor.speciality),
+            update_data.get('profile', db_doctor.profile)
+        )
         embedding = await embedding_service.get_embedding(combined_text)
         update_data["embedding"] = embedding
+        update_data["embedding_model"] = settings.EMBEDDING_MODEL_NAME
         
     for field, value in update_data.items():
         setattr(db_doctor, field, value)
 
     db.commit()
     db.refresh(db_doctor)
+    retrieval_service.catalog_updated("doctor", db_doctor)
     return db_doctor
 
 def delete_doctor(db: Session, doctor_id: int) -> bool:
@@ -69,4 +78,5 @@ def delete_doctor(db: Session, doctor_id: int) -> bool:
     
     db.delete(db_doctor)
     db.commit()
+    retrieval_service.catalog_deleted("doctor", doctor_id)
     return True
\ No newline at end of file
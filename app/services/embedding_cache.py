@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Baris disk yang kedaluwarsa/berlebih dibersihkan saat cache dibuka dan setiap sekian penulisan
+_PRUNE_EVERY_WRITES = 1000
+
+
+def normalize_text(text: str) -> str:
+    """Normalisasi teks sebelum di-embed: Unicode NFKC dan whitespace diringkas menjadi satu spasi."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class EmbeddingCache:
+    """
+    Cache embedding dua tingkat yang dialamatkan berdasarkan isi (model + hash teks ternormalisasi).
+
+    Tingkat 1 adalah LRU di memori proses dengan batas ukuran dan TTL. Tingkat 2 (opsional) adalah
+    file SQLite yang bertahan setelah restart dan dibagi antar worker uvicorn; TTL yang sama berlaku
+    di sana (dihitung dari `created_at`) dan jumlah barisnya dibatasi `disk_max_size` (0 = tanpa batas,
+    baris tertua dihapus lebih dulu). Nama model ikut di-hash ke dalam key, sehingga mengganti
+    EMBEDDING_MODEL_NAME otomatis membuat entri lama tidak terpakai; entri model lama di disk
+    tersingkir lewat TTL dan batas ukuran yang sama.
+    """
+
+    def __init__(self, model_name: str, max_size: int, ttl_seconds: float, db_path: Optional[str] = None,
+                 disk_max_size: int = 0):
+        self.model_name = model_name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path or None
+        self.disk_max_size = disk_max_size
+        self._memory: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_pruned = 0
+        self._writes_since_prune = 0
+        if self.db_path:
+            self._open_disk_tier()
+
+    def _open_disk_tier(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, "
+                "vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embedding_cache_created_at ON embedding_cache (created_at)")
+            self._conn = conn
+            self._disk_prune()
+        except sqlite3.Error as e:
+            logger.error(f"Embedding cache: disk tier at {self.db_path} disabled: {e}")
+            self._conn = None
+
+    def make_key(self, normalized_text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{normalized_text}".encode("utf-8")).hexdigest()
+
+    def _memory_get(self, key: str) -> Optional[List[float]]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, vector = entry
+        if expires_at < time.monotonic():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return vector
+
+    def _memory_put(self, key: str, vector: List[float], ttl_seconds: Optional[float] = None):
+        self._memory[key] = (time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds), vector)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, List[float]]]:
+        """Embedding dari disk beserta sisa TTL-nya (detik); baris yang sudah kedaluwarsa dianggap tidak ada."""
+        now = time.time()
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM embedding_cache WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[1] + self.ttl_seconds - now, array("f", row[0]).tolist()
+
+    def _disk_put(self, key: str, vector: List[float]):
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embedding_cache (key, model, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, self.model_name, len(vector), array("f", vector).tobytes(), time.time())
+            )
+            self._writes_since_prune += 1
+            if self._writes_since_prune < _PRUNE_EVERY_WRITES:
+                return
+        self._disk_prune()
+
+    def _disk_prune(self):
+        """Hapus baris yang melewati TTL, lalu baris tertua yang melebihi `disk_max_size`."""
+        with self._db_lock:
+            self._writes_since_prune = 0
+            pruned = self._conn.execute(
+                "DELETE FROM embedding_cache WHERE created_at <= ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            if self.disk_max_size > 0:
+                pruned += self._conn.execute(
+                    "DELETE FROM embedding_cache WHERE key IN "
+                    "(SELECT key FROM embedding_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_size,)
+                ).rowcount
+        if pruned:
+            self.disk_pruned += pruned
+            logger.info(f"Embedding cache: pruned {pruned} expired/excess entries from disk.")
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        vector = self._memory_get(key)
+        if vector is not None:
+            self.memory_hits += 1
+            return vector
+
+        if self._conn is not None:
+            try:
+                entry = await asyncio.to_thread(self._disk_get, key)
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache: disk read failed: {e}")
+                entry = None
+            if entry is not None:
+                remaining_ttl, vector = entry
+                self.disk_hits += 1
+                # Di memori berlaku sisa TTL baris disk, bukan TTL penuh yang baru
+                self._memory_put(key, vector, ttl_seconds=remaining_ttl)
+                return vector
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, vector: List[float]):
+        self._memory_put(key, vector)
+        if self._conn is not None:
+            try:
+                await asyncio.to_thread(self._disk_put, key, vector)
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache: disk write failed: {e}")
+
+    def clear(self):
+        self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "model": self.model_name,
+            "memory_size": len(self._memory),
+            "memory_max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_enabled": self._conn is not None,
+            "disk_max_size": self.disk_max_size,
+            "disk_pruned": self.disk_pruned,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
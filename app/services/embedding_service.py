@@ -1,14 +1,104 @@
-from langchain_ollama import OllamaEmbeddings
+from functools import partial
+from typing import Dict, List, Optional
 from app.core.config import settings
+from app.core.ollama_http import ollama_client, ollama_client_kwargs
+from app.services.embedding_cache import EmbeddingCache, normalize_text
+from app.services.micro_batcher import MicroBatcher
+from app.services.single_flight import SingleFlight
+
+def _embeddings_per_text(texts: List[str], embeddings: List[List[float]]) -> List[List[float]]:
+    """Bagikan embedding teks unik (urutan kemunculan pertama) kembali ke setiap teks dalam batch."""
+    unique_texts = list(dict.fromkeys(texts))
+    if len(embeddings) != len(unique_texts):
+        raise ValueError(f"Expected {len(unique_texts)} embeddings from batch call, got {len(embeddings)}")
+    by_text = dict(zip(unique_texts, embeddings))
+    return [by_text[text] for text in texts]
+
 
 class EmbeddingService:
     def __init__(self):
-        self.embedding_model = OllamaEmbeddings(
-            model=settings.EMBEDDING_MODEL_NAME,
-            base_url=settings.OLLAMA_BASE_URL
-        )
+        if settings.OLLAMA_CLIENT == "direct":
+            self.embedding_model = None
+            self.embed_documents = partial(ollama_client.embed, settings.EMBEDDING_MODEL_NAME)
+        else:
+            # Import ditunda agar mode direct tidak menanggung waktu import LangChain saat startup
+            from langchain_ollama import OllamaEmbeddings
+
+            self.embedding_model = OllamaEmbeddings(
+                model=settings.EMBEDDING_MODEL_NAME,
+                base_url=settings.ollama_base_urls[0],
+                keep_alive=settings.ollama_keep_alive,
+                async_client_kwargs=ollama_client_kwargs(read_timeout=settings.OLLAMA_EMBED_READ_TIMEOUT_SECONDS)
+            )
+            self.embed_documents = self.embedding_model.aembed_documents
+        self.cache = EmbeddingCache(
+            model_name=settings.EMBEDDING_MODEL_NAME,
+            max_size=settings.EMBEDDING_CACHE_MAX_SIZE,
+            ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+            db_path=settings.EMBEDDING_CACHE_DB_PATH,
+            disk_max_size=settings.EMBEDDING_CACHE_DISK_MAX_SIZE
+        ) if settings.EMBEDDING_CACHE_ENABLED else None
+        self.batcher = MicroBatcher(
+            "embedding",
+            self._embed_batch,
+            _embeddings_per_text,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS
+        ) if settings.EMBEDDING_BATCH_ENABLED else None
+        self.single_flight = SingleFlight("embedding")
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        # Teks identik dalam satu batch cukup di-embed sekali
+        return await self.embed_documents(list(dict.fromkeys(texts)))
+
+    async def _embed_one(self, text: str) -> List[float]:
+        if self.batcher is not None:
+            return await self.batcher.submit(text)
+        return (await self.embed_documents([text]))[0]
+
+    async def _embed_many(self, texts: List[str]) -> List[List[float]]:
+        batch_size = settings.EMBEDDING_BATCH_MAX_SIZE
+        embeddings: List[List[float]] = []
+        for start in range(0, len(texts), batch_size):
+            embeddings.extend(await self.embed_documents(texts[start:start + batch_size]))
+        return embeddings
+    
+    async def _embed_and_cache(self, text: str, key: str) -> List[float]:
+        embedding = await self._embed_one(text)
+        await self.cache.put(key, embedding)
+        return embedding
     
     async def get_embedding(self, text: str) -> list[float]:
-        return await self.embedding_model.aembed_query(text)
+        text = normalize_text(text)
+        if self.cache is None:
+            return await self.single_flight.do(text, lambda: self._embed_one(text))
+
+        key = self.cache.make_key(text)
+        embedding = await self.cache.get(key)
+        if embedding is None:
+            embedding = await self.single_flight.do(key, lambda: self._embed_and_cache(text, key))
+        return embedding
+
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed banyak teks sekaligus; hanya teks unik yang belum ada di cache yang dikirim ke Ollama."""
+        normalized = [normalize_text(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        missing: List[str] = []
+        for text in dict.fromkeys(normalized):
+            embedding: Optional[List[float]] = None
+            if self.cache is not None:
+                embedding = await self.cache.get(self.cache.make_key(text))
+            if embedding is None:
+                missing.append(text)
+            else:
+                found[text] = embedding
+
+        if missing:
+            for text, embedding in zip(missing, await self._embed_many(missing)):
+                found[text] = embedding
+                if self.cache is not None:
+                    await self.cache.put(self.cache.make_key(text), embedding)
+
+        return [found[text] for text in normalized]
 
 embedding_service = EmbeddingService()
\ No newline at end of file
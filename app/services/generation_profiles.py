@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from fastapi import HTTPException
+from app.core.config import settings
+from app.services.llm_scheduler import LLMScheduler, llm_scheduler
+
+
+class GenerationTimeoutError(HTTPException):
+    """Generate melebihi batas waktu profil (504)."""
+
+    def __init__(self, profile: "GenerationProfile"):
+        super().__init__(
+            status_code=504,
+            detail=f"Layanan AI tidak selesai menjawab dalam {profile.timeout:g} detik. Silakan coba lagi."
+        )
+        self.profile = profile.name
+
+
+class GenerationProfile:
+    """
+    Parameter generate untuk satu kasus pemakaian: model, opsi Ollama (`num_predict`, `num_ctx`,
+    `temperature`; nilai kosong memakai bawaan model) dan batas waktu generate dalam detik (0 = tanpa batas).
+    """
+
+    def __init__(self, name: str, model: str, num_predict: int, num_ctx: int, temperature: Optional[float],
+                 timeout: float, degraded: bool = False):
+        self.name = name
+        self.model = model
+        self.timeout = timeout
+        self.degraded = degraded
+        self.options: Dict[str, Any] = {}
+        if num_predict > 0:
+            self.options["num_predict"] = num_predict
+        if num_ctx > 0:
+            self.options["num_ctx"] = num_ctx
+        if temperature is not None:
+            self.options["temperature"] = temperature
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model": self.model, "options": self.options, "timeout_seconds": self.timeout, "degraded": self.degraded}
+
+
+async def stream_within_timeout(stream: AsyncIterator[str], profile: GenerationProfile) -> AsyncIterator[str]:
+    """
+    Teruskan potongan `stream` dengan batas waktu total profil. Setiap penantian potongan berikutnya dibatasi
+    sisa waktu, sehingga stream Ollama yang macet juga berhenti (GenerationTimeoutError) alih-alih menunggu
+    read timeout HTTP.
+    """
+    if profile.timeout <= 0:
+        async for chunk in stream:
+            yield chunk
+        return
+    deadline = time.monotonic() + profile.timeout
+    iterator = stream.__aiter__()
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(iterator.__anext__(), deadline - time.monotonic())
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise GenerationTimeoutError(profile) from None
+            yield chunk
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def _profile_from_settings(name: str, degraded: bool = False) -> GenerationProfile:
+    prefix = f"LLM_{name.upper()}_"
+    return GenerationProfile(
+        name=name,
+        model=getattr(settings, prefix + "MODEL") or settings.LLM_MODEL_NAME,
+        num_predict=getattr(settings, prefix + "NUM_PREDICT"),
+        num_ctx=getattr(settings, prefix + "NUM_CTX"),
+        temperature=getattr(settings, prefix + "TEMPERATURE"),
+        timeout=getattr(settings, prefix + "TIMEOUT_SECONDS"),
+        degraded=degraded
+    )
+
+
+class GenerationProfiles:
+    """
+    Memilih profil generate per lane penjadwal ("chat", "diagnosis"). Bila profil degraded dikonfigurasi
+    dan antrean di depan request sudah `queue_depth` generate atau perkiraan waktu tunggunya mencapai
+    `wait_seconds`, request memakai profil degraded (model lebih kecil/cepat, jawaban lebih pendek).
+    Pemilihan dilakukan saat request datang, sebelum mengantre.
+    """
+
+    def __init__(self, profiles: Dict[str, GenerationProfile], degraded: Optional[GenerationProfile],
+                 queue_depth: int, wait_seconds: float, scheduler: LLMScheduler):
+        self.profiles = profiles
+        self.degraded = degraded
+        self.queue_depth = queue_depth
+        self.wait_seconds = wait_seconds
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self.selected: Dict[str, Dict[str, int]] = {lane: {} for lane in profiles}
+
+    def for_lane(self, lane: str) -> List[GenerationProfile]:
+        """Semua profil yang mungkin dipakai lane: profil utama lalu profil degraded (bila ada)."""
+        return [self.profiles[lane]] + ([self.degraded] if self.degraded is not None else [])
+
+    def _overloaded(self, lane: str) -> bool:
+        if self.queue_depth > 0 and self._scheduler.queued_ahead(lane) >= self.queue_depth:
+            return True
+        return self.wait_seconds > 0 and self._scheduler.estimated_wait(lane) >= self.wait_seconds
+
+    def select(self, lane: str) -> GenerationProfile:
+        profile = self.profiles[lane]
+        if self.degraded is not None and self._overloaded(lane):
+            profile = self.degraded
+        with self._lock:
+            self.selected[lane][profile.name] = self.selected[lane].get(profile.name, 0) + 1
+        return profile
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "profiles": {profile.name: profile.stats() for profile in [*self.profiles.values(), self.degraded] if profile is not None},
+            "degrade_queue_depth": self.queue_depth,
+            "degrade_wait_seconds": self.wait_seconds,
+            "selected": self.selected,
+        }
+
+
+generation_profiles = GenerationProfiles(
+    profiles={"chat": _profile_from_settings("chat"), "diagnosis": _profile_from_settings("diagnosis")},
+    degraded=_profile_from_settings("degraded", degraded=True) if settings.LLM_DEGRADED_MODEL else None,
+    queue_depth=settings.LLM_DEGRADE_QUEUE_DEPTH,
+    wait_seconds=settings.LLM_DEGRADE_WAIT_SECONDS,
+    scheduler=llm_scheduler
+)
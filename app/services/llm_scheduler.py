@@ -0,0 +1,183 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict
+from fastapi import HTTPException
+from app.core.config import settings
+
+
+class LLMBusyError(HTTPException):
+    """Antrean generate LLM penuh (429) atau terlalu lama menunggu slot (503); klien diminta mencoba lagi."""
+
+    def __init__(self, status_code: int, lane: str, retry_after: int):
+        super().__init__(
+            status_code=status_code,
+            detail=f"Layanan AI sedang sibuk (antrean {lane}). Silakan coba lagi dalam {retry_after} detik.",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class _LaneStats:
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self.granted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=1000)
+
+
+class LLMScheduler:
+    """
+    Penjadwal generate LLM bersama untuk LLMService (lane "chat") dan AIDOCService (lane "diagnosis").
+
+    Paling banyak `max_concurrency` generate berjalan bersamaan ke Ollama; sisanya menunggu di antrean
+    per lane. Saat slot kosong, lane yang didaftarkan lebih dulu (prioritas lebih tinggi) dilayani
+    lebih dulu, FIFO di dalam lane. Antrean yang penuh langsung ditolak dengan 429, menunggu lebih
+    dari `queue_timeout` dibatalkan dengan 503; keduanya menyertakan Retry-After dari perkiraan
+    durasi generate. max_concurrency <= 0 menonaktifkan pembatasan.
+    """
+
+    def __init__(self, max_concurrency: int, lanes: "OrderedDict[str, int]", queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict((lane, deque()) for lane in lanes)
+        self._lanes = {lane: _LaneStats(max_queue) for lane, max_queue in lanes.items()}
+        self._lock = threading.Lock()
+        self.active = 0
+        # Rata-rata bergerak durasi satu generate (detik), untuk Retry-After
+        self._avg_service_seconds = 5.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def queued_ahead(self, lane: str) -> int:
+        """Jumlah generate yang akan dilayani sebelum request baru di `lane` (lane berprioritas sama atau lebih tinggi)."""
+        ahead = 0
+        for name, queue in self._queues.items():
+            ahead += len(queue)
+            if name == lane:
+                break
+        return ahead
+
+    def estimated_wait(self, lane: str) -> float:
+        """Perkiraan waktu menunggu slot (detik) untuk request baru di `lane`, dari rata-rata durasi generate."""
+        if not self.enabled or self.active < self.max_concurrency and not self.queued():
+            return 0.0
+        return self._avg_service_seconds * (self.queued_ahead(lane) + 1) / self.max_concurrency
+
+    def retry_after(self) -> int:
+        slots = max(1, self.max_concurrency)
+        return max(1, math.ceil(self._avg_service_seconds * (self.queued() + slots) / slots))
+
+    def ensure_capacity(self, lane: str):
+        """Tolak lebih awal (sebelum respons streaming dimulai) bila antrean lane sudah penuh."""
+        if self.enabled and self.active >= self.max_concurrency and len(self._queues[lane]) >= self._lanes[lane].max_queue:
+            self._lanes[lane].rejected += 1
+            raise LLMBusyError(429, lane, self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self, lane: str) -> AsyncIterator[None]:
+        """Tahan satu slot generate selama blok `async with` berjalan."""
+        if not self.enabled:
+            yield
+            return
+        await self._acquire(lane)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._observe_service(time.monotonic() - started)
+            self._release()
+
+    async def _acquire(self, lane: str):
+        stats = self._lanes[lane]
+        enqueued = time.monotonic()
+        if self.active < self.max_concurrency and not self.queued():
+            self.active += 1
+            self._record_wait(stats, 0.0)
+            return
+
+        queue = self._queues[lane]
+        if len(queue) >= stats.max_queue:
+            stats.rejected += 1
+            raise LLMBusyError(429, lane, self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout if self.queue_timeout > 0 else None)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Slot sudah diberikan tepat sebelum pemanggil batal: kembalikan ke antrean berikutnya
+                self._release()
+            elif waiter in queue:
+                queue.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                stats.timeouts += 1
+                raise LLMBusyError(503, lane, self.retry_after()) from None
+            raise
+        self._record_wait(stats, time.monotonic() - enqueued)
+
+    def _release(self):
+        self.active -= 1
+        for queue in self._queues.values():
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    self.active += 1
+                    waiter.set_result(None)
+                    return
+
+    def _record_wait(self, stats: _LaneStats, wait: float):
+        with self._lock:
+            stats.granted += 1
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+            stats.recent_waits.append(wait)
+
+    def _observe_service(self, seconds: float):
+        self._avg_service_seconds = 0.8 * self._avg_service_seconds + 0.2 * seconds
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        for lane, stats in self._lanes.items():
+            waits = sorted(stats.recent_waits)
+            lanes[lane] = {
+                "queued": len(self._queues[lane]),
+                "max_queue": stats.max_queue,
+                "granted": stats.granted,
+                "rejected": stats.rejected,
+                "timeouts": stats.timeouts,
+                "avg_wait_ms": round(stats.total_wait / stats.granted * 1000, 1) if stats.granted else 0.0,
+                "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+                "max_wait_ms": round(stats.max_wait * 1000, 1),
+            }
+        return {
+            "enabled": self.enabled,
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "queued": self.queued(),
+            "queue_timeout_seconds": self.queue_timeout,
+            "avg_generation_ms": round(self._avg_service_seconds * 1000, 1),
+            "retry_after_seconds": self.retry_after(),
+            "lanes": lanes,
+        }
+
+
+# Urutan lane = prioritas: chat interaktif dilayani sebelum diagnosis
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    lanes=OrderedDict([("chat", settings.LLM_QUEUE_MAX_CHAT), ("diagnosis", settings.LLM_QUEUE_MAX_DIAGNOSIS)]),
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS
+)
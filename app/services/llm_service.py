@@ -1,16 +1,19 @@
+import asyncio
 import re 
-from langchain_ollama import OllamaLLM
-from langchain.prompts import PromptTemplate
-from langchain.schema.output_parser import StrOutputParser
 from app.core.config import settings
+from app.core.ollama_http import ollama_client, ollama_client_kwargs
+from app.services.compiled_prompt import CompiledPrompt
+from app.services.single_flight import SingleFlight, hash_key
+from app.services.prompt_usage import PromptUsage
+from app.services.llm_scheduler import llm_scheduler
+from app.services.generation_profiles import (GenerationProfile, GenerationTimeoutError, generation_profiles,
+                                              stream_within_timeout)
+from app.services.stream_sanitizer import StreamSanitizer
+from typing import AsyncIterator, Optional
 
 class LLMService:
     def __init__(self):
-        self.llm = OllamaLLM(
-            model=settings.LLM_MODEL_NAME,
-            base_url=settings.OLLAMA_BASE_URL
-        )
-        self.prompt_template = PromptTemplate.from_template(
+        template = (
             """Anda adalah 'Asisten DetakMedis', sebuah asisten AI kesehatan yang ramah dan membantu untuk platform DetakMedis.
 
             PERAN UTAMA ANDA:
@@ -29,7 +32,36 @@ class LLMService:
 
             Jawaban Asisten DetakMedis:"""
         )
-        self.chain = self.prompt_template | self.llm | StrOutputParser()
+        self.single_flight = SingleFlight("llm")
+        # Lane penjadwal LLM: chat interaktif mendapat prioritas di atas diagnosis
+        self.lane = "chat"
+        # Jumlah token prompt per generate (prompt_eval_count Ollama) dicatat dari respons terakhir Ollama
+        self.prompt_usage = PromptUsage("llm")
+        if settings.OLLAMA_CLIENT == "direct":
+            # Klien HTTP tipis: template di-parse sekali dan LangChain tidak di-import sama sekali
+            self.llm = None
+            self.chains = None
+            self.prompt_template = CompiledPrompt(template)
+        else:
+            # Import ditunda agar mode direct tidak menanggung waktu import LangChain saat startup
+            from langchain_ollama import OllamaLLM
+            from langchain_core.prompts import PromptTemplate
+            from langchain_core.output_parsers import StrOutputParser
+
+            self.llm = OllamaLLM(
+                model=settings.LLM_MODEL_NAME,
+                base_url=settings.ollama_base_urls[0],
+                keep_alive=settings.ollama_keep_alive,
+                async_client_kwargs=ollama_client_kwargs(read_timeout=settings.OLLAMA_GENERATE_READ_TIMEOUT_SECONDS)
+            )
+            self.prompt_template = PromptTemplate.from_template(template)
+            # Satu chain per profil generate lane ini (model dan opsi Ollama diikat ke LLM)
+            callback = self.prompt_usage.callback()
+            self.chains = {
+                profile.name: (self.prompt_template | self.llm.bind(model=profile.model, options=profile.options) | StrOutputParser())
+                .with_config(callbacks=[callback])
+                for profile in generation_profiles.for_lane(self.lane)
+            }
 
     def _clean_llm_output(self, raw_answer: str) -> str:
         """Membersihkan output LLM dari tag <think> dan whitespace berlebih."""
@@ -39,9 +71,52 @@ class LLMService:
         cleaned_answer = re.sub(r"^Jawaban Asisten DetakMedis:\s*", "", cleaned_answer, flags=re.IGNORECASE)
         return cleaned_answer.strip() # Menghapus whitespace di awal/akhir
 
-    async def generate_response(self, question: str, context: str) -> str:
-        raw_answer = await self.chain.ainvoke({"question": question, "context": context})
-        cleaned_answer = self._clean_llm_output(raw_answer)
-        return cleaned_answer
+    def select_profile(self) -> GenerationProfile:
+        """Profil generate untuk request baru: profil lane ini, atau degraded bila antrean/latensi melewati ambang."""
+        return generation_profiles.select(self.lane)
+
+    async def _complete(self, question: str, context: str, profile: GenerationProfile) -> str:
+        if self.chains is None:
+            return await ollama_client.generate(profile.model, self.prompt_template.format(question=question, context=context),
+                                                options=profile.options, on_done=self.prompt_usage.record)
+        return await self.chains[profile.name].ainvoke({"question": question, "context": context})
+
+    def _astream(self, question: str, context: str, profile: GenerationProfile) -> AsyncIterator[str]:
+        if self.chains is None:
+            return ollama_client.stream_generate(profile.model, self.prompt_template.format(question=question, context=context),
+                                                 options=profile.options, on_done=self.prompt_usage.record)
+        return self.chains[profile.name].astream({"question": question, "context": context})
+
+    async def _generate(self, question: str, context: str, profile: GenerationProfile) -> str:
+        async with llm_scheduler.slot(self.lane):
+            try:
+                raw_answer = await asyncio.wait_for(self._complete(question, context, profile), timeout=profile.timeout or None)
+            except asyncio.TimeoutError:
+                raise GenerationTimeoutError(profile) from None
+        return self._clean_llm_output(raw_answer)
+
+    async def generate_response(self, question: str, context: str, profile: Optional[GenerationProfile] = None) -> str:
+        # Permintaan identik yang sedang berjalan (prompt hasil render sama) cukup digenerate sekali
+        profile = profile or self.select_profile()
+        prompt = self.prompt_template.format(question=question, context=context)
+        return await self.single_flight.do(hash_key(profile.name, profile.model, prompt),
+                                           lambda: self._generate(question, context, profile))
+
+    def ensure_capacity(self):
+        """Lempar LLMBusyError (429) bila antrean lane penuh; dipanggil sebelum respons streaming dimulai."""
+        llm_scheduler.ensure_capacity(self.lane)
+
+    async def stream_response(self, question: str, context: str, profile: Optional[GenerationProfile] = None) -> AsyncIterator[str]:
+        """Stream jawaban per potongan token; <think> dan awalan jawaban dibersihkan secara inkremental."""
+        sanitizer = StreamSanitizer()
+        profile = profile or self.select_profile()
+        async with llm_scheduler.slot(self.lane):
+            async for chunk in stream_within_timeout(self._astream(question, context, profile), profile):
+                text = sanitizer.feed(chunk)
+                if text:
+                    yield text
+        text = sanitizer.flush()
+        if text:
+            yield text
 
 llm_service = LLMService()
\ No newline at end of file
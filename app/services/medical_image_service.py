@@ -1,9 +1,10 @@
 # app/services/medical_image_service.py
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import UploadFile, HTTPException, status
 import shutil
 import os
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 import uuid
 import logging
 from app.models.medical_image import MedicalImage as MedicalImageModel
@@ -23,12 +24,8 @@ class MedicalImageService:
     def get_all_medical_images(self, db: Session, skip: int = 0, limit: int = 100) -> List[MedicalImageModel]:
         return db.query(MedicalImageModel).offset(skip).limit(limit).all()
 
-    async def create_medical_image_with_file(
-        self,
-        db: Session,
-        medical_image_data: MedicalImageCreate,
-        image_file: UploadFile
-    ) -> MedicalImageModel:
+    async def _store_and_label(self, image_file: UploadFile) -> Tuple[str, str]:
+        """Simpan file upload lalu tentukan labelnya lewat model vision. Mengembalikan (path file, label)."""
         upload_dir = settings.UPLOAD_IMAGE_DIR
         os.makedirs(upload_dir, exist_ok=True)
 
@@ -69,6 +66,11 @@ class MedicalImageService:
                     logger.info(f"Prediction failed or no clear result for {unique_filename}. Using user-provided label: {final_label_for_db}")
                 else:
                     logger.warning(f"Prediction failed/ambiguous for {unique_filename}, and no user label was provided.")
+        except HTTPException:
+            # Pool vision penuh (503) atau timeout (504): teruskan ke klien beserta Retry-After
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
         except Exception as e:
             logger.error(f"Error during prediction for {unique_filename}: {e}. Will use user label if available.")
         
@@ -85,6 +87,16 @@ class MedicalImageService:
                 detail="Image label is required but could not be determined or provided."
             )
 
+        return file_path, final_label_for_db
+
+    async def create_medical_image_with_file(
+        self,
+        db: Session,
+        medical_image_data: MedicalImageCreate,
+        image_file: UploadFile
+    ) -> MedicalImageModel:
+        file_path, final_label_for_db = await self._store_and_label(image_file)
+
         db_image = MedicalImageModel(
             patient_id=medical_image_data.patient_id,
             poli_id=(1 if final_label_for_db == 'Cardiomegaly' else 2), 
@@ -105,9 +117,56 @@ class MedicalImageService:
                     os.remove(file_path)
                 except Exception as e_rm:
                     logger.error(f"Failed to clean up image {file_path} after DB error: {e_rm}")
-            logger.error(f"DB error for medical image {unique_filename}: {e}")
+            logger.error(f"DB error for medical image {os.path.basename(file_path)}: {e}")
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not save medical image metadata to database.")
 
+    async def create_medical_image_with_file_async(
+        self,
+        db: AsyncSession,
+        medical_image_data: MedicalImageCreate,
+        image_file: UploadFile
+    ) -> MedicalImageModel:
+        """Sama dengan create_medical_image_with_file, tetapi memakai AsyncSession (dipakai diagnosis service)."""
+        file_path, final_label_for_db = await self._store_and_label(image_file)
+
+        db_image = MedicalImageModel(
+            patient_id=medical_image_data.patient_id,
+            poli_id=(1 if final_label_for_db == 'Cardiomegaly' else 2), 
+            path=file_path, 
+            label=final_label_for_db
+        )
+        
+        try:
+            db.add(db_image)
+            await db.commit()
+            await db.refresh(db_image)
+            logger.info(f"Medical image record created: ID {db_image.id}, Label '{db_image.label}', Path '{db_image.path}'")
+            return db_image
+        except Exception as e:
+            await db.rollback()
+            if os.path.exists(file_path):
+                try:
+                    os.remove(file_path)
+                except Exception as e_rm:
+                    logger.error(f"Failed to clean up image {file_path} after DB error: {e_rm}")
+            logger.error(f"DB error for medical image {os.path.basename(file_path)}: {e}")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not save medical image metadata to database.")
+
+    async def discard_medical_image_async(self, db: AsyncSession, db_image: MedicalImageModel) -> None:
+        """Hapus baris dan file gambar yang sudah tersimpan ketika request gagal sebelum diagnosis dibuat."""
+        try:
+            await db.delete(db_image)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to delete orphaned medical image record {db_image.id}: {e}")
+        if os.path.exists(db_image.path):
+            try:
+                os.remove(db_image.path)
+                logger.info(f"Cleaned up orphaned image {db_image.path}")
+            except OSError as e_rm:
+                logger.error(f"Failed to clean up image {db_image.path}: {e_rm}")
+
     async def run_prediction_on_image(self, image_id: int, db: Session) -> Optional[Dict[str, float]]:
         db_image = self.get_medical_image(db=db, image_id=image_id)
         if not db_image:
@@ -122,6 +181,8 @@ class MedicalImageService:
                 image_bytes = f.read()
             predictions = await vision_model_service.predict_disease_probabilities(image_data=image_bytes)
             return predictions
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error running prediction for image_id {image_id}: {e}")
             raise HTTPException(status_code=500, detail=f"Could not run prediction: {e}")
@@ -185,6 +246,11 @@ class MedicalImageService:
                 else:
                     logger.warning(f"Prediction failed/ambiguous for updated image {unique_filename}. Keeping existing label.")
                     final_label_for_db = db_image.label  
+        except HTTPException:
+            # Label lama milik gambar lama; saat pool vision penuh/timeout lebih baik gagal (503/504) daripada menyimpannya
+            if os.path.exists(new_file_path):
+                os.remove(new_file_path)
+            raise
         except Exception as e:
             logger.error(f"Error during prediction for updated image {unique_filename}: {e}. Will keep existing label.")
             final_label_for_db = db_image.label  # Gunakan label yang ada jika prediksi error
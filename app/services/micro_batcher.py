@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ProcessBatchFn = Callable[[List[Any]], Awaitable[Any]]
+SplitResultsFn = Callable[[List[Any], Any], Sequence[Any]]
+
+
+def _results_as_is(items: List[Any], output: Any) -> Sequence[Any]:
+    return output
+
+
+class MicroBatcher:
+    """
+    Micro-batcher untuk permintaan satu-item yang datang bersamaan (embedding teks, inference gambar).
+
+    Item dikumpulkan selama `max_wait_ms` (atau sampai `max_batch_size` item terkumpul), lalu diproses
+    dengan satu panggilan `process_batch(items)`. `split_results(items, output)` memetakan output batch
+    menjadi satu hasil per item sesuai urutan (bawaan: output sudah berupa daftar hasil per item), dan
+    hasilnya dibagikan kembali ke future masing-masing pemanggil. Pemanggil yang sudah membatalkan
+    request tidak ikut diproses.
+    """
+
+    def __init__(self, name: str, process_batch: ProcessBatchFn, split_results: SplitResultsFn = _results_as_is,
+                 max_batch_size: int = 8, max_wait_ms: float = 5.0):
+        self.name = name
+        self.process_batch = process_batch
+        self.split_results = split_results
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Referensi kuat ke task batch yang sedang berjalan; event loop hanya menyimpan weak reference
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches_run = 0
+        self.items_run = 0
+        self.max_batch_seen = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush(loop, immediate=True)
+        elif self._flush_handle is None:
+            self._schedule_flush(loop)
+
+        return await future
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop, immediate: bool = False):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if immediate:
+            self._start_batch(loop)
+        else:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush_pending, loop)
+
+    def _flush_pending(self, loop: asyncio.AbstractEventLoop):
+        self._flush_handle = None
+        if self._pending:
+            self._start_batch(loop)
+
+    def _start_batch(self, loop: asyncio.AbstractEventLoop):
+        batch, self._pending = self._pending, []
+        task = loop.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+        items = [item for item, _ in batch]
+
+        try:
+            results = self.split_results(items, await self.process_batch(items))
+            if len(results) != len(batch):
+                raise ValueError(f"Expected {len(batch)} results from {self.name} batch, got {len(results)}")
+        except Exception as e:
+            logger.error(f"{self.name.capitalize()} batch of {len(batch)} items failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.items_run += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "pending": len(self._pending),
+            "in_flight_batches": len(self._tasks),
+            "batches_run": self.batches_run,
+            "items_run": self.items_run,
+            "max_batch_seen": self.max_batch_seen,
+            "avg_batch_size": round(self.items_run / self.batches_run, 2) if self.batches_run else 0.0,
+        }
@@ -4,6 +4,11 @@ from typing import List, Optional
 from app.models.poli import Poli
 from app.schemas.poli import PoliCreate, PoliUpdate, PoliResponse
 from app.services.embedding_service import embedding_service
+from app.services.retrieval_service import retrieval_service
+from app.core.config import settings
+
+def build_embedding_text(name: str, description: Optional[str]) -> str:
+    return f"{name}: {description}" if description else name
 
 def get_poli(db: Session, poli_id: int) -> Optional[PoliResponse]:
     return db.query(Poli).filter(Poli.id == poli_id).first()
@@ -12,16 +17,18 @@ def get_polis(db: Session) -> List[PoliResponse]:
     return db.query(Poli).all()
 
 async def create_poli(db: Session, poli_data: PoliCreate) -> PoliResponse:
-    combined_text = f"{poli_data.name}: {poli_data.description}" if poli_data.description else poli_data.name
+    combined_text = build_embedding_text(poli_data.name, poli_data.description)
     embedding = await embedding_service.get_embedding(combined_text)
     db_poli = Poli(
         name=poli_data.name,
         description=poli_data.description,
-        embedding=embedding
+        embedding=embedding,
+        embedding_model=settings.EMBEDDING_MODEL_NAME
     )
     db.add(db_poli)
     db.commit()
     db.refresh(db_poli)
+    retrieval_service.catalog_updated("poli", db_poli)
     return db_poli
 
 async def update_poli(db: Session, poli_id: int, poli_update: PoliUpdate) -> Optional[PoliResponse]:
@@ -35,15 +42,17 @@ async def update_poli(db: Session, poli_id: int, poli_update: PoliUpdate) -> Opt
     if should_update_embedding:
         new_name = update_data.get("name", db_poli.name)
         new_description = update_data.get("description", db_poli.description)
-        combined_text = f"{new_name}: {new_description}"
+        combined_text = build_embedding_text(new_name, new_description)
         embedding = await embedding_service.get_embedding(combined_text)
         update_data["embedding"] = embedding
+        update_data["embedding_model"] = settings.EMBEDDING_MODEL_NAME
         
     for field, value in update_data.items():
         setattr(db_poli, field, value)
 
     db.commit()
     db.refresh(db_poli)
+    retrieval_service.catalog_updated("poli", db_poli)
     return db_poli
 
 def delete_poli(db: Session, poli_id: int) -> bool:
@@ -53,4 +62,5 @@ def delete_poli(db: Session, poli_id: int) -> bool:
     
     db.delete(db_poli)
     db.commit()
+    retrieval_service.catalog_deleted("poli", poli_id)
     return True
\ No newline at end of file
@@ -0,0 +1,59 @@
+import logging
+import threading
+from typing import Any, Dict, Mapping
+
+logger = logging.getLogger(__name__)
+
+
+class PromptUsage:
+    """
+    Mencatat jumlah token prompt/jawaban per generate dari respons terakhir Ollama (`prompt_eval_count`,
+    `eval_count`, `prompt_eval_duration`). Jalur LangChain memasang `callback()` sekali di config chain;
+    klien Ollama langsung memanggil `record()` dengan chunk terakhir.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.generations = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.prompt_eval_ms = 0.0
+        self.last_prompt_tokens = None
+
+    def record(self, info: Mapping[str, Any]) -> None:
+        prompt_tokens = info.get("prompt_eval_count")
+        if prompt_tokens is None:
+            return
+        completion_tokens = info.get("eval_count") or 0
+        prompt_eval_ms = (info.get("prompt_eval_duration") or 0) / 1e6
+        with self._lock:
+            self.generations += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.prompt_eval_ms += prompt_eval_ms
+            self.last_prompt_tokens = prompt_tokens
+        logger.info(f"{self.name}: prompt_tokens={prompt_tokens} completion_tokens={completion_tokens} prompt_eval_ms={prompt_eval_ms:.0f}")
+
+    def callback(self):
+        """Callback LangChain yang meneruskan generation_info ke record(); langchain_core baru di-import di sini."""
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        usage = self
+
+        class _PromptUsageCallback(BaseCallbackHandler):
+            def on_llm_end(self, response, **kwargs: Any) -> None:
+                info = (response.generations[0][0].generation_info or {}) if response.generations and response.generations[0] else {}
+                usage.record(info)
+
+        return _PromptUsageCallback()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "generations": self.generations,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.generations, 1) if self.generations else 0.0,
+            "avg_completion_tokens": round(self.completion_tokens / self.generations, 1) if self.generations else 0.0,
+            "avg_prompt_eval_ms": round(self.prompt_eval_ms / self.generations, 1) if self.generations else 0.0,
+        }
@@ -1,9 +1,14 @@
-from sqlalchemy.orm import Session  
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.embedding_service import embedding_service  
 from app.services.llm_service import llm_service  
 from app.services.retrieval_service import retrieval_service  
+from app.services.answer_cache import SemanticAnswerCache, AnswerCacheKey, answer_cache_key
+from app.services.context_builder import ContextBuilder
+from app.services.llm_scheduler import LLMBusyError
+from app.services.generation_profiles import GenerationProfile, GenerationTimeoutError, generation_profiles
 from app.schemas.chat import ChatRequest, ChatResponse, ContextDocument  
-from typing import List  
+from app.core.config import settings
+from typing import List, Tuple, Any, AsyncIterator, Optional
 import logging  
 
 # Konfigurasi dasar logging
@@ -15,28 +20,28 @@ class RAGService:
     Kelas utama yang mengelola proses chat menggunakan pendekatan Retrieval-Augmented Generation (RAG).
     """
 
-    async def process_chat(self, db: Session, chat_request: ChatRequest) -> ChatResponse:
-        """
-        Memproses permintaan chat dari pengguna dengan alur:
-        1. Menghasilkan embedding dari query
-        2. Mencari dokumen relevan
-        3. Menyusun konteks dari dokumen
-        4. Menghasilkan jawaban dengan LLM
-        
-        Args:
-            db (Session): Sesi database SQLAlchemy.
-            chat_request (ChatRequest): Permintaan chat dari pengguna.
+    def __init__(self):
+        self.answer_cache = SemanticAnswerCache(
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            max_bytes=settings.ANSWER_CACHE_MAX_BYTES,
+            similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+        ) if settings.ANSWER_CACHE_ENABLED else None
+        self.context_builder = ContextBuilder(
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            max_distance=settings.CONTEXT_MAX_DISTANCE,
+            field_max_chars=settings.CONTEXT_FIELD_MAX_CHARS
+        )
 
-        Returns:
-            ChatResponse: Jawaban dari sistem beserta konteks dokumen yang digunakan.
-        """
-        logger.info(f"--- RAGService.process_chat START ---")
-        logger.info(f"Query: {chat_request.query}")
+    async def _retrieve_context(self, db: AsyncSession, query: str) -> Tuple[List[ContextDocument], str, Optional[AnswerCacheKey]]:
+        """Langkah 1-3 RAG: embedding query, retrieval dokumen, dan penyusunan string konteks (+ key cache jawaban)."""
+        # Versi diambil sebelum retrieval agar jawaban dari katalog yang berubah di tengah jalan tidak di-cache
+        catalog_version = retrieval_service.catalog_version
 
         # 1. Menghasilkan embedding dari query pengguna
         logger.info("Step 1: Calling embedding_service.get_embedding...")
         try:
-            query_embedding = await embedding_service.get_embedding(chat_request.query)
+            query_embedding = await embedding_service.get_embedding(query)
             logger.info(f"Type of query_embedding AFTER await: {type(query_embedding)}")
             if isinstance(query_embedding, str):
                 logger.error("!!! ERROR: embedding_service.get_embedding returned a str AFTER await!")
@@ -57,20 +62,68 @@ class RAGService:
             logger.exception("Exception during retrieval_service.retrieve_documents")
             raise
 
+        # Akhiri transaksi baca agar koneksi kembali ke pool selama menunggu LLM
+        await db.commit()
+
         # 3. Menyusun konteks dari dokumen yang ditemukan
         logger.info("Step 3: Formatting context...")
-        context_str = "\n\n".join([f"Sumber: {doc.source}\nKonten: {doc.content}" for doc in retrieved_docs])
-        if not retrieved_docs:
-            context_str = "Tidak ada informasi relevan yang ditemukan di database."
+        # Dokumen diurutkan per jarak, dipangkas, dan dibatasi CONTEXT_TOKEN_BUDGET
+        built = self.context_builder.build(retrieved_docs,
+                                           template="Sumber: {source}\nKonten: {content}",
+                                           empty_text="Tidak ada informasi relevan yang ditemukan di database.")
+        context_str = built.text
+        logger.info(f"Context: {len(built.documents)}/{len(retrieved_docs)} documents, ~{built.tokens} tokens (unbudgeted ~{built.raw_tokens})")
         logger.info(f"Context string (first 100 chars): {context_str[:100]}")
 
+        cache_key = None
+        if self.answer_cache is not None:
+            cache_key = answer_cache_key(query_embedding, built.documents, catalog_version)
+
+        return retrieved_docs, context_str, cache_key
+
+    async def process_chat(self, db: AsyncSession, chat_request: ChatRequest) -> ChatResponse:
+        """
+        Memproses permintaan chat dari pengguna dengan alur:
+        1. Menghasilkan embedding dari query
+        2. Mencari dokumen relevan
+        3. Menyusun konteks dari dokumen
+        4. Menghasilkan jawaban dengan LLM
+        
+        Args:
+            db (AsyncSession): Sesi database async SQLAlchemy.
+            chat_request (ChatRequest): Permintaan chat dari pengguna.
+
+        Returns:
+            ChatResponse: Jawaban dari sistem beserta konteks dokumen yang digunakan.
+        """
+        logger.info(f"--- RAGService.process_chat START ---")
+        logger.info(f"Query: {chat_request.query}")
+
+        retrieved_docs, context_str, cache_key = await self._retrieve_context(db, chat_request.query)
+
+        if cache_key is not None:
+            cached_answer = self.answer_cache.get(cache_key)
+            if cached_answer is not None:
+                logger.info("Step 4: Answer served from semantic answer cache.")
+                # Jawaban degraded tidak pernah di-cache, jadi jawaban cache berasal dari profil chat
+                profile = generation_profiles.profiles[llm_service.lane]
+                return ChatResponse(answer=cached_answer, retrieved_contexts=retrieved_docs, cached=True,
+                                    profile=profile.name, model=profile.model)
+
         # 4. Menghasilkan jawaban menggunakan layanan LLM
-        logger.info("Step 4: Calling llm_service.generate_response...")
+        profile = llm_service.select_profile()
+        logger.info(f"Step 4: Calling llm_service.generate_response (profile {profile.name}, model {profile.model})...")
         try:
-            answer = await llm_service.generate_response(question=chat_request.query, context=context_str)
+            answer = await llm_service.generate_response(question=chat_request.query, context=context_str, profile=profile)
             logger.info(f"Type of answer AFTER await: {type(answer)}")
             if not isinstance(answer, str):
                 logger.warning(f"LLM response (answer) is not a string, it's: {type(answer)}")
+        except LLMBusyError as e:
+            logger.warning(f"LLM scheduler rejected chat generation: {e.detail}")
+            raise
+        except GenerationTimeoutError as e:
+            logger.warning(f"Chat generation timed out: {e.detail}")
+            raise
         except Exception as e:
             logger.exception("Exception during llm_service.generate_response")
             raise
@@ -78,7 +131,50 @@ class RAGService:
         logger.info(f"{answer}")
         logger.info(f"--- RAGService.process_chat END ---")
 
+        # Jawaban profil degraded tidak di-cache agar tidak terus disajikan setelah beban turun
+        if cache_key is not None and not profile.degraded:
+            self.answer_cache.put(cache_key, str(answer))
+
         # Mengembalikan respons chat sebagai objek ChatResponse
-        return ChatResponse(answer=str(answer), retrieved_contexts=retrieved_docs)
+        return ChatResponse(answer=str(answer), retrieved_contexts=retrieved_docs, profile=profile.name, model=profile.model)
+
+    async def stream_chat(self, db: AsyncSession, chat_request: ChatRequest) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Versi streaming process_chat. Retrieval dijalankan sebelum fungsi ini kembali, sehingga session
+        database tidak lagi dipakai selama streaming.
+
+        Returns:
+            AsyncIterator[Tuple[str, Any]]: Event (nama, data) berurutan: "contexts" (dokumen konteks),
+            "token" (potongan jawaban yang sudah dibersihkan), lalu "done" (jawaban lengkap beserta profil
+            generate yang dipakai). Jawaban dari cache dikirim sebagai satu event "token".
+        """
+        retrieved_docs, context_str, cache_key = await self._retrieve_context(db, chat_request.query)
+        cached_answer = self.answer_cache.get(cache_key) if cache_key is not None else None
+        if cached_answer is None:
+            # Antrean LLM penuh ditolak di sini (429) sebelum header respons streaming terkirim
+            llm_service.ensure_capacity()
+            profile = llm_service.select_profile()
+        else:
+            profile = generation_profiles.profiles[llm_service.lane]
+        return self._stream_events(chat_request.query, retrieved_docs, context_str, cache_key, cached_answer, profile)
+
+    async def _stream_events(self, query: str, retrieved_docs: List[ContextDocument], context_str: str,
+                             cache_key: Optional[AnswerCacheKey], cached_answer: Optional[str],
+                             profile: GenerationProfile) -> AsyncIterator[Tuple[str, Any]]:
+        yield "contexts", [doc.model_dump() for doc in retrieved_docs]
+
+        if cached_answer is not None:
+            yield "token", {"text": cached_answer}
+            yield "done", {"answer": cached_answer, "cached": True, "profile": profile.name, "model": profile.model}
+            return
+
+        answer_parts = []
+        async for text in llm_service.stream_response(question=query, context=context_str, profile=profile):
+            answer_parts.append(text)
+            yield "token", {"text": text}
+        answer = "".join(answer_parts)
+        if cache_key is not None and not profile.degraded:
+            self.answer_cache.put(cache_key, answer)
+        yield "done", {"answer": answer, "cached": False, "profile": profile.name, "model": profile.model}
 
 rag_service = RAGService()
\ No newline at end of file
@@ -0,0 +1,87 @@
+import logging
+import time
+from typing import Callable, Dict, List, Tuple
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.poli import Poli
+from app.models.disease import Disease
+from app.models.doctor import Doctor
+from app.services import poli, disease, doctor
+from app.services.embedding_service import embedding_service
+
+logger = logging.getLogger(__name__)
+
+# Per sumber katalog: model, kolom yang dibutuhkan untuk teks embedding, dan pembentuk teksnya
+# (harus sama dengan yang dipakai service CRUD saat create/update)
+CATALOG_SOURCES: Dict[str, Tuple[type, List, Callable]] = {
+    "poli": (Poli, [Poli.name, Poli.description],
+             lambda row: poli.build_embedding_text(row.name, row.description)),
+    "disease": (Disease, [Disease.name, Disease.description],
+                lambda row: disease.build_embedding_text(row.name, row.description)),
+    "doctor": (Doctor, [Doctor.name, Doctor.speciality, Doctor.profile],
+               lambda row: doctor.build_embedding_text(row.name, row.speciality, row.profile)),
+}
+
+class ReembedService:
+    """
+    Job re-embedding massal untuk tabel katalog (poli, disease, doctor).
+
+    Baris yang diproses adalah yang embedding-nya NULL atau dibuat dengan model lain dari
+    EMBEDDING_MODEL_NAME. Setiap batch di-commit bersama kolom embedding_model, sehingga job yang
+    terhenti cukup dijalankan ulang dan akan melanjutkan dari baris yang belum diperbarui.
+    """
+
+    def _stale_filter(self, model, only_missing: bool):
+        if only_missing:
+            return model.embedding.is_(None)
+        return or_(
+            model.embedding.is_(None),
+            model.embedding_model.is_(None),
+            model.embedding_model != settings.EMBEDDING_MODEL_NAME
+        )
+
+    def count_stale(self, db: Session, source: str, only_missing: bool = False) -> int:
+        model, _, _ = CATALOG_SOURCES[source]
+        return db.query(model).filter(self._stale_filter(model, only_missing)).count()
+
+    async def reembed_table(self, db: Session, source: str, batch_size: int = 64, only_missing: bool = False) -> Dict[str, float]:
+        model, columns, build_text = CATALOG_SOURCES[source]
+        stale = self._stale_filter(model, only_missing)
+        total = db.query(model).filter(stale).count()
+        logger.info(f"[{source}] {total} rows need embedding with model {settings.EMBEDDING_MODEL_NAME}")
+
+        processed = 0
+        last_id = 0
+        started = time.perf_counter()
+        while True:
+            rows = (db.query(model.id, *columns)
+                    .filter(stale, model.id > last_id)
+                    .order_by(model.id)
+                    .limit(batch_size)
+                    .all())
+            if not rows:
+                break
+
+            embeddings = await embedding_service.get_embeddings([build_text(row) for row in rows])
+            db.execute(update(model), [
+                {"id": row.id, "embedding": embedding, "embedding_model": settings.EMBEDDING_MODEL_NAME}
+                for row, embedding in zip(rows, embeddings)
+            ])
+            db.commit()
+
+            processed += len(rows)
+            last_id = rows[-1].id
+            elapsed = time.perf_counter() - started
+            logger.info(f"[{source}] {processed}/{total} rows ({processed / elapsed:.1f} rows/sec)")
+
+        elapsed = time.perf_counter() - started
+        return {
+            "source": source,
+            "total": total,
+            "processed": processed,
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": round(processed / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+reembed_service = ReembedService()
\ No newline at end of file
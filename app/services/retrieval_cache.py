@@ -0,0 +1,67 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+from app.schemas.chat import ContextDocument
+
+
+def embedding_digest(query_embedding: Sequence[float]) -> str:
+    """Hash embedding query (float32) sebagai bagian key cache."""
+    return hashlib.blake2b(np.asarray(query_embedding, dtype=np.float32).tobytes(), digest_size=16).hexdigest()
+
+
+class RetrievalCache:
+    """
+    Cache hasil retrieval berukuran terbatas (LRU + TTL).
+
+    Key berisi versi katalog, sehingga setiap perubahan katalog (create/update/delete poli, disease,
+    doctor) otomatis membuat entri lama tidak terpakai; entri tersebut juga langsung dibuang saat
+    versi naik. TTL membatasi umur entri untuk perubahan yang dilakukan worker lain.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, List[ContextDocument]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[List[ContextDocument]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, documents: List[ContextDocument]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, list(documents))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
@@ -1,53 +1,225 @@
 from sqlalchemy.orm import Session
-from sqlalchemy.sql import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.schema import distance_operator
 from app.models.poli import Poli
 from app.models.disease import Disease
 from app.models.doctor import Doctor
 from app.schemas.chat import ContextDocument
-from typing import List, Dict, Any
+from app.services.vector_index import InMemoryVectorIndex
+from app.services.retrieval_cache import RetrievalCache, embedding_digest
+from app.services.single_flight import SingleFlight
+from typing import List, Dict, Any, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Jeda sebelum mencoba lagi memuat index memori setelah reload gagal (database belum siap)
+MEMORY_RELOAD_RETRY_SECONDS = 5.0
+
+# Urutan sumber pada hasil retrieval (sama dengan urutan query lama: poli, disease, doctor)
+SOURCE_ORDER = {"poli": 0, "disease": 1, "doctor": 2}
+
+# Model dan kolom teks per sumber katalog (dipakai backend retrieval di memori)
+SOURCE_MODELS = {"poli": Poli, "disease": Disease, "doctor": Doctor}
+SOURCE_FIELDS = {
+    "poli": ["name", "description"],
+    "disease": ["name", "description", "symptoms", "treatment"],
+    "doctor": ["name", "speciality", "profile", "location", "practice_schedule"],
+}
+
+# Satu statement untuk ketiga tabel katalog: UNION ALL dari subquery top-k per tabel.
+# Top-k dihitung dulu hanya dari (id, distance), baru di-join untuk mengambil kolom teks,
+# sehingga json_build_object tidak dievaluasi untuk setiap baris yang di-scan.
+# Parameter: $1 = embedding query, $2/$3/$4 = k untuk poli/disease/doctor. asyncpg mem-prepare
+# statement ini sekali per koneksi dan menyimpannya di statement cache-nya.
+RETRIEVAL_SQL_TEMPLATE = """
+(SELECT 'poli' AS source, p.id, top.distance,
+        json_build_object('name', p.name, 'description', p.description) AS fields
+   FROM (SELECT id, embedding {op} $1 AS distance FROM poli WHERE embedding IS NOT NULL
+          ORDER BY embedding {op} $1 LIMIT $2) AS top
+   JOIN poli p ON p.id = top.id)
+UNION ALL
+(SELECT 'disease' AS source, d.id, top.distance,
+        json_build_object('name', d.name, 'description', d.description, 'symptoms', d.symptoms, 'treatment', d.treatment) AS fields
+   FROM (SELECT id, embedding {op} $1 AS distance FROM disease WHERE embedding IS NOT NULL
+          ORDER BY embedding {op} $1 LIMIT $3) AS top
+   JOIN disease d ON d.id = top.id)
+UNION ALL
+(SELECT 'doctor' AS source, dr.id, top.distance,
+        json_build_object('name', dr.name, 'speciality', dr.speciality, 'profile', dr.profile,
+                          'location', dr.location, 'practice_schedule', dr.practice_schedule) AS fields
+   FROM (SELECT id, embedding {op} $1 AS distance FROM doctors WHERE embedding IS NOT NULL
+          ORDER BY embedding {op} $1 LIMIT $4) AS top
+   JOIN doctors dr ON dr.id = top.id)
+"""
+
+def retrieval_sql(distance: Optional[str] = None) -> str:
+    # Operator jarak harus sama dengan operator class index ANN agar index terpakai
+    return RETRIEVAL_SQL_TEMPLATE.format(op=distance_operator(distance))
+
+def format_schedule(schedule: Any) -> str:
+    """Jadwal praktik (JSON) sebagai teks ringkas, misalnya {"days": ["Senin", "Rabu"], "time": "08:00-12:00"} -> "Senin, Rabu 08:00-12:00"."""
+    if isinstance(schedule, list):
+        return ", ".join(format_schedule(value) for value in schedule)
+    if isinstance(schedule, dict):
+        if schedule and set(schedule) <= {"days", "time"}:
+            return " ".join(format_schedule(schedule[key]) for key in ("days", "time") if key in schedule)
+        return "; ".join(f"{key} {format_schedule(value)}" for key, value in schedule.items())
+    return str(schedule)
+
+def render_content(source: str, fields: Dict[str, Any]) -> str:
+    """Bentuk teks konteks untuk satu dokumen katalog."""
+    if source == "poli":
+        return f"Nama Poli: {fields['name']}\nDeskripsi: {fields['description']}"
+    if source == "disease":
+        return f"Penyakit: {fields['name']}\nDeskripsi: {fields['description']}\nGejala: {fields['symptoms']}\nPengobatan: {fields['treatment']}"
+    return f"Dokter: {fields['name']}\nSpesialis: {fields['speciality']}\nProfil: {fields['profile']}\nLokasi: {fields['location']}\nJam Kerja: {format_schedule(fields['practice_schedule'])}"
+
+def to_vector_literal(embedding: List[float]) -> str:
+    return "[" + ",".join(str(float(value)) for value in embedding) + "]"
 
 class RetrievalService:
-    async def retrieve_documents(self, db: Session, query_embedding: List[float], top_k: int = settings.SIMILARITY_TOP_K) -> List[ContextDocument]:
-        # Retrieves relevant documents from poli, disease, and doctor tables using vector similarity search.
-        contexts: List[ContextDocument] = []
-
-        # Retrieve from Poli
-        poli_results = db.query(Poli.name, Poli.description, Poli.embedding.l2_distance(query_embedding).label("distance")) \
-            .order_by(Poli.embedding.l2_distance(query_embedding)).limit(1).all() 
-
-        for poli in poli_results:
-            contexts.append(ContextDocument(
-                source="poli",
-                content=f"Nama Poli: {poli.name}\nDeskripsi: {poli.description}",
-                metadata={"id": poli.id if hasattr(poli, 'id') else None, "name": poli.name, "distance": float(poli.distance)}
-            ))
-        
-        disease_results = db.query(Disease.id, Disease.name, Disease.description, Disease.symptoms, Disease.treatment, Disease.embedding.l2_distance(query_embedding).label("distance")) \
-            .order_by(Disease.embedding.l2_distance(query_embedding)).limit(1).all()
-        
-        for disease in disease_results:
-            content =f"Penyakit: {disease.name}\nDeskripsi: {disease.description}\nGejala: {disease.symptoms}\nPengobatan: {disease.treatment}"
-            contexts.append(ContextDocument(
-                source="disease",
-                content=content,
-                metadata={"id": disease.id, "name": disease.name, "distance": float(disease.distance)}
-            ))
-        
-        # Retrieve from Doctor
-        doctor_results = db.query(
-            Doctor.id, Doctor.name, Doctor.speciality, Doctor.profile, Doctor.location,
-            Doctor.practice_schedule, Doctor.embedding.l2_distance(query_embedding).label("distance")
-        ).order_by(Doctor.embedding.l2_distance(query_embedding)).limit(top_k).all()
-
-        for doctor in doctor_results:
-            content = f"Dokter: {doctor.name}\nSpesialis: {doctor.speciality}\nProfil: {doctor.profile}\nLokasi: {doctor.location}\nJam Kerja: {doctor.practice_schedule}"
-            contexts.append(ContextDocument(
-                source="doctor",
-                content=content,
-                metadata={"id": doctor.id, "name": doctor.name, "distance": float(doctor.distance)}
-            ))
-
-        return contexts
+    def __init__(self):
+        # Backend opsional (RETRIEVAL_BACKEND=memory): katalog disimpan sebagai matriks NumPy di memori
+        self.memory_index = InMemoryVectorIndex(distance=settings.VECTOR_DISTANCE) if settings.RETRIEVAL_BACKEND == "memory" else None
+        self.cache = RetrievalCache(
+            max_size=settings.RETRIEVAL_CACHE_MAX_SIZE,
+            ttl_seconds=settings.RETRIEVAL_CACHE_TTL_SECONDS
+        ) if settings.RETRIEVAL_CACHE_ENABLED else None
+        # Dinaikkan setiap kali katalog berubah; ikut menjadi bagian key cache hasil retrieval
+        self.catalog_version = 0
+        # Reload index memori yang bersamaan digabung menjadi satu
+        self._reload_flight = SingleFlight("memory-index")
+
+    def load_memory_index(self, db: Session):
+        """
+        Muat ulang seluruh katalog ke index memori (satu query per tabel). Index lama tetap melayani pencarian
+        sampai snapshot baru siap; perubahan katalog selama reload diterapkan ulang di atas snapshot itu.
+        """
+        started = time.perf_counter()
+        self.memory_index.begin_reload()
+        try:
+            snapshot = {}
+            for source, model in SOURCE_MODELS.items():
+                columns = [getattr(model, field) for field in SOURCE_FIELDS[source]]
+                rows = db.query(model.id, model.embedding, *columns).filter(model.embedding.isnot(None)).all()
+                snapshot[source] = (
+                    [row.id for row in rows],
+                    [row.embedding for row in rows],
+                    [row.name for row in rows],
+                    [render_content(source, row._mapping) for row in rows],
+                )
+        except Exception:
+            self.memory_index.abort_reload()
+            raise
+        self.memory_index.finish_reload(snapshot, dim=settings.EMBEDDING_DIM)
+        logger.info(f"In-memory retrieval index loaded in {(time.perf_counter() - started) * 1000:.1f} ms "
+                    f"({', '.join(f'{source}: {self.memory_index.size(source)}' for source in SOURCE_MODELS)})")
+
+    def _load_memory_index_with_session(self):
+        with SessionLocal() as db:
+            self.load_memory_index(db)
+
+    async def refresh_memory_index(self):
+        """Muat ulang index memori di thread terpisah; pemanggil bersamaan ikut menunggu reload yang sedang berjalan."""
+        await self._reload_flight.do("reload", lambda: asyncio.to_thread(self._load_memory_index_with_session))
+
+    async def run_memory_refresh(self):
+        """
+        Task background (lifespan): muat index memori saat startup, lalu muat ulang setiap
+        RETRIEVAL_MEMORY_REFRESH_SECONDS (0 = hanya sekali). Request tidak pernah memuat index sendiri.
+        """
+        while True:
+            try:
+                await self.refresh_memory_index()
+            except Exception as e:
+                logger.warning(f"In-memory retrieval index reload failed ({type(e).__name__}: {e}); "
+                               f"retrying in {MEMORY_RELOAD_RETRY_SECONDS:g}s")
+                await asyncio.sleep(MEMORY_RELOAD_RETRY_SECONDS)
+                continue
+            if settings.RETRIEVAL_MEMORY_REFRESH_SECONDS <= 0:
+                return
+            await asyncio.sleep(settings.RETRIEVAL_MEMORY_REFRESH_SECONDS)
+
+    def _bump_catalog_version(self):
+        self.catalog_version += 1
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def catalog_updated(self, source: str, obj) -> None:
+        """Dipanggil service CRUD setelah baris katalog dibuat/diubah: invalidasi cache dan sinkronkan index memori."""
+        self._bump_catalog_version()
+        if self.memory_index is None:
+            return
+        # Diterapkan juga sebelum/selama reload pertama: index mencatatnya dan menerapkannya ulang di atas snapshot
+        if obj.embedding is None:
+            self.memory_index.remove(source, obj.id)
+            return
+        fields = {field: getattr(obj, field) for field in SOURCE_FIELDS[source]}
+        self.memory_index.upsert(source, obj.id, obj.embedding, fields["name"], render_content(source, fields))
+
+    def catalog_deleted(self, source: str, doc_id: int) -> None:
+        """Dipanggil service CRUD setelah baris katalog dihapus."""
+        self._bump_catalog_version()
+        if self.memory_index is not None:
+            self.memory_index.remove(source, int(doc_id))
+
+    def source_limits(self, top_k: int = settings.SIMILARITY_TOP_K, k_per_source: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        limits = {
+            "poli": settings.RETRIEVAL_TOP_K_POLI,
+            "disease": settings.RETRIEVAL_TOP_K_DISEASE,
+            "doctor": top_k,
+        }
+        if k_per_source:
+            limits.update(k_per_source)
+        return limits
+
+    async def _execute_query(self, db: AsyncSession, query_embedding: List[float], limits: Dict[str, int]):
+        conn = await db.connection()
+        result = await conn.exec_driver_sql(
+            retrieval_sql(),
+            (to_vector_literal(query_embedding), limits["poli"], limits["disease"], limits["doctor"])
+        )
+        return result.all()
+
+    async def retrieve_documents(self, db: AsyncSession, query_embedding: List[float], top_k: int = settings.SIMILARITY_TOP_K,
+                                 k_per_source: Optional[Dict[str, int]] = None) -> List[ContextDocument]:
+        # Retrieves relevant documents from poli, disease, and doctor tables in a single round-trip.
+        limits = self.source_limits(top_k, k_per_source)
+        cache_key = None
+        if self.cache is not None:
+            cache_key = (self.catalog_version, embedding_digest(query_embedding), tuple(sorted(limits.items())))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        documents = await self._search(db, query_embedding, limits)
+        if cache_key is not None:
+            self.cache.put(cache_key, documents)
+        return documents
+
+    async def _search(self, db: AsyncSession, query_embedding: List[float], limits: Dict[str, int]) -> List[ContextDocument]:
+        # Sebelum index memori selesai dimuat pertama kali (task background), pakai query database
+        if self.memory_index is not None and self.memory_index.loaded:
+            return [
+                ContextDocument(source=source, content=content, metadata={"id": doc_id, "name": name, "distance": distance})
+                for source, doc_id, name, content, distance in self.memory_index.search(query_embedding, limits)
+            ]
+
+        rows = await self._execute_query(db, query_embedding, limits)
+        rows = sorted(rows, key=lambda row: (SOURCE_ORDER[row.source], row.distance))
+
+        return [
+            ContextDocument(
+                source=row.source,
+                content=render_content(row.source, row.fields),
+                metadata={"id": row.id, "name": row.fields["name"], "distance": float(row.distance)}
+            )
+            for row in rows
+        ]
 
 retrieval_service = RetrievalService()
\ No newline at end of file
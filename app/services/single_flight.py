@@ -0,0 +1,50 @@
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+def hash_key(*parts: str) -> str:
+    """Key ringkas untuk input panjang (misalnya prompt yang sudah dirender)."""
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Deduplikasi panggilan identik yang sedang berjalan (single-flight).
+
+    Pemanggil pertama untuk sebuah key membuat satu task bersama; pemanggil lain dengan key yang
+    sama selama task itu belum selesai ikut menunggu hasil task tersebut. Task dibungkus
+    `asyncio.shield`, sehingga pembatalan satu pemanggil tidak menghentikan pekerjaan bersama.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda finished, key=key: self._forget(key, finished))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, finished: asyncio.Task):
+        if self._inflight.get(key) is finished:
+            del self._inflight[key]
+        # Tandai exception sudah diambil bila semua pemanggil sudah batal menunggu
+        if not finished.cancelled():
+            finished.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "inflight": len(self._inflight),
+            "calls": self.calls,
+            "shared": self.shared,
+        }
@@ -0,0 +1,232 @@
+import re
+from typing import List, Optional, Tuple
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+ANSWER_PREFIX = "jawaban asisten detakmedis:"
+AIDOC_ANSWER_PREFIXES = (ANSWER_PREFIX, "jawaban dokter virtual detakmedis:")
+
+
+def _partial_suffix(text: str, token: str) -> int:
+    """Panjang akhiran `text` yang merupakan awalan `token` (kemungkinan tag yang terpotong antar chunk)."""
+    lowered = text.lower()
+    for size in range(min(len(token) - 1, len(lowered)), 0, -1):
+        if lowered.endswith(token[:size]):
+            return size
+    return 0
+
+
+class StreamSanitizer:
+    """
+    Versi inkremental dari LLMService._clean_llm_output untuk output streaming.
+
+    Chunk dimasukkan lewat feed() dan hanya teks yang sudah pasti final yang dikembalikan; sisa buffer
+    dikeluarkan oleh flush(). Hasil gabungannya sama dengan _clean_llm_output pada teks utuh:
+    1. blok <think>...</think> beserta whitespace sesudahnya dibuang (blok yang tidak ditutup dibiarkan),
+    2. awalan "Jawaban Asisten DetakMedis:" di awal teks dibuang,
+    3. whitespace di awal dan akhir dibuang (strip_edges=True).
+    """
+
+    def __init__(self, prefixes: Tuple[str, ...] = (ANSWER_PREFIX,), strip_edges: bool = True):
+        self._prefixes = tuple(prefix.lower() for prefix in prefixes)
+        self._strip_edges_enabled = strip_edges
+        self._buffer = ""
+        self._in_think = False
+        self._skip_whitespace = False
+        self._prefix_buffer: Optional[str] = ""
+        self._skip_prefix_whitespace = False
+        self._started = False
+        self._trailing_whitespace = ""
+
+    def feed(self, chunk: str) -> str:
+        return self._strip_edges(self._strip_prefix(self._strip_think(chunk), final=False))
+
+    def flush(self) -> str:
+        # Sisa buffer: tag parsial atau blok <think> yang tidak pernah ditutup dikeluarkan apa adanya
+        remaining, self._buffer = self._buffer, ""
+        return self._strip_edges(self._strip_prefix(remaining, final=True))
+
+    def _strip_think(self, chunk: str) -> str:
+        self._buffer += chunk
+        output = []
+        while self._buffer:
+            if self._in_think:
+                close_at = self._buffer.lower().find(THINK_CLOSE)
+                if close_at < 0:
+                    break
+                self._buffer = self._buffer[close_at + len(THINK_CLOSE):]
+                self._in_think = False
+                self._skip_whitespace = True
+                continue
+
+            if self._skip_whitespace:
+                self._buffer = self._buffer.lstrip()
+                if not self._buffer:
+                    break
+                self._skip_whitespace = False
+
+            open_at = self._buffer.lower().find(THINK_OPEN)
+            if open_at >= 0:
+                # Tag pembuka tetap disimpan agar blok yang tidak ditutup bisa dikeluarkan utuh saat flush
+                output.append(self._buffer[:open_at])
+                self._buffer = self._buffer[open_at:]
+                self._in_think = True
+                continue
+
+            keep = _partial_suffix(self._buffer, THINK_OPEN)
+            output.append(self._buffer[:len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+        return "".join(output)
+
+    def _strip_prefix(self, text: str, final: bool) -> str:
+        if self._skip_prefix_whitespace:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._skip_prefix_whitespace = False
+        if self._prefix_buffer is None:
+            return text
+
+        # Awalan hanya dicocokkan di awal teks (setelah blok <think> dibuang), sama seperti regex ^...
+        self._prefix_buffer += text
+        lowered = self._prefix_buffer.lower()
+        for prefix in self._prefixes:
+            if lowered.startswith(prefix):
+                rest = self._prefix_buffer[len(prefix):]
+                self._prefix_buffer = None
+                self._skip_prefix_whitespace = True
+                return self._strip_prefix(rest, final)
+        if not final and any(prefix.startswith(lowered) for prefix in self._prefixes):
+            return ""
+        text, self._prefix_buffer = self._prefix_buffer, None
+        return text
+
+    def _strip_edges(self, text: str) -> str:
+        if not self._strip_edges_enabled:
+            return text
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        # Whitespace di ujung ditahan sampai ada teks lain sesudahnya; kalau stream selesai, dibuang
+        text = self._trailing_whitespace + text
+        stripped = text.rstrip()
+        self._trailing_whitespace = text[len(stripped):]
+        return stripped
+
+
+# Padanan langkah-langkah AIDOCService._clean_llm_output yang bekerja per baris
+_BOLD = re.compile(r"\*\*(.*?)\*\*")
+_ITALIC = re.compile(r"\*(.*?)\*")
+_XRAY_LINE = re.compile(r"[Ff]oto [Rr]ontgen|[Xx]-[Rr]ay|[Pp]emeriksaan [Rr]adiologi|[Rr]ontgen [Dd]ada")
+_PUNCTUATION = frozenset(",.!?;:")
+
+
+class ParagraphStreamCleaner:
+    """
+    Versi inkremental satu-lintasan dari AIDOCService._format_output(_clean_llm_output(...)).
+
+    feed() mengembalikan paragraf yang sudah final; flush() mengembalikan sisanya. Urutan kerjanya:
+    1. <think> dan awalan jawaban dibuang oleh StreamSanitizer, lalu "\\n" literal menjadi newline.
+    2. Setiap baris utuh diproses sekali: hapus **bold**/*italic*, strip, dan buang baris yang
+       menyebut foto rontgen/X-ray/radiologi/rontgen dada.
+    3. Baris "* ..." menjadi "• ..."; baris "*" saja digabung dengan baris berikutnya.
+    4. Rangkaian whitespace di antara teks dinormalisasi: dihapus bila diikuti tanda baca, menjadi
+       satu spasi bila didahului tanda baca, menjadi batas paragraf bila melewati baris kosong, dan
+       satu spasi selain itu.
+
+    Paragraf baru dianggap final setelah baris pertama paragraf berikutnya lengkap, karena baris itu
+    masih bisa dibuang atau diawali tanda baca yang menyambung kedua paragraf.
+    """
+
+    def __init__(self):
+        self._sanitizer = StreamSanitizer(prefixes=AIDOC_ANSWER_PREFIXES, strip_edges=False)
+        self._escape_pending = False
+        self._line = ""
+        self._has_line = False
+        self._gap_has_empty = False
+        self._bullet_pending = False
+        self._run = ""
+        self._previous = ""
+        self._paragraph: List[str] = []
+        self._paragraphs: List[str] = []
+
+    def feed(self, chunk: str) -> List[str]:
+        self._consume(self._sanitizer.feed(chunk), final=False)
+        return self._take()
+
+    def flush(self) -> List[str]:
+        self._consume(self._sanitizer.flush(), final=True)
+        self._process_line(self._line)
+        self._line = ""
+        if self._bullet_pending:
+            # "*" di baris terakhir tidak diikuti whitespace, jadi tidak menjadi bullet
+            self._emit("*")
+            self._bullet_pending = False
+        self._close_paragraph()
+        return self._take()
+
+    def _take(self) -> List[str]:
+        paragraphs, self._paragraphs = self._paragraphs, []
+        return paragraphs
+
+    def _consume(self, text: str, final: bool):
+        if self._escape_pending:
+            text = "\\" + text
+            self._escape_pending = False
+        if not final and text.endswith("\\"):
+            # Backslash di ujung chunk bisa jadi awal "\\n" literal
+            text = text[:-1]
+            self._escape_pending = True
+        lines = (self._line + text.replace("\\n", "\n")).split("\n")
+        self._line = lines.pop()
+        for line in lines:
+            self._process_line(line)
+
+    def _process_line(self, raw_line: str):
+        line = _ITALIC.sub(r"\1", _BOLD.sub(r"\1", raw_line)).strip()
+        if _XRAY_LINE.search(line):
+            return
+        if not line:
+            self._gap_has_empty = True
+            return
+
+        if self._bullet_pending:
+            self._emit("• ")
+            self._bullet_pending = False
+        elif self._has_line:
+            self._emit("\n\n" if self._gap_has_empty else "\n")
+        self._has_line = True
+        self._gap_has_empty = False
+
+        if line == "*":
+            self._bullet_pending = True
+        elif line[0] == "*" and line[1].isspace():
+            self._emit("• " + line[1:].lstrip())
+        else:
+            self._emit(line)
+
+    def _emit(self, text: str):
+        for char in text:
+            if char.isspace():
+                self._run += char
+                continue
+            if self._run and self._previous:
+                if char in _PUNCTUATION:
+                    pass
+                elif self._previous in _PUNCTUATION:
+                    self._paragraph.append(" ")
+                elif "\n\n" in self._run:
+                    self._close_paragraph()
+                else:
+                    self._paragraph.append(" ")
+            self._run = ""
+            self._paragraph.append(char)
+            self._previous = char
+
+    def _close_paragraph(self):
+        if self._paragraph:
+            self._paragraphs.append("".join(self._paragraph))
+            self._paragraph = []
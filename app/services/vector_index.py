@@ -0,0 +1,170 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+@dataclass(frozen=True)
+class _SourceIndex:
+    ids: np.ndarray          # int64 [n]
+    matrix: np.ndarray       # float32 [n, dim], C-contiguous (dinormalisasi untuk metrik cosine)
+    sq_norms: np.ndarray     # float32 [n], ||x||^2 untuk metrik l2
+    names: Tuple[str, ...]
+    contents: Tuple[str, ...]
+    positions: Dict[int, int]
+
+
+class InMemoryVectorIndex:
+    """
+    Index vektor di memori proses untuk katalog kecil (poli, disease, doctor).
+
+    Setiap sumber disimpan sebagai matriks float32 kontigu beserta teks konteks yang sudah dirender.
+    Pencarian top-k memakai satu perkalian matriks-vektor dan `argpartition`. Perubahan dilakukan
+    copy-on-write: pembaca selalu melihat snapshot utuh tanpa perlu lock.
+
+    Reload penuh dilakukan dengan `begin_reload()` sebelum katalog dibaca dari database lalu
+    `finish_reload()`: selama itu index lama tetap dipakai, dan upsert/remove yang masuk di antaranya
+    dicatat lalu diterapkan ulang di atas snapshot baru agar tidak tertimpa data yang lebih lama.
+    """
+
+    def __init__(self, distance: str = "l2"):
+        self.distance = distance
+        self._sources: Dict[str, _SourceIndex] = {}
+        self._write_lock = threading.Lock()
+        # Perubahan (fungsi, argumen) yang masuk selama reload; None bila tidak ada reload berjalan
+        self._journal: Optional[List[Tuple[Callable[..., None], Tuple[Any, ...]]]] = None
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def size(self, source: str) -> int:
+        index = self._sources.get(source)
+        return 0 if index is None else len(index.ids)
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.distance == "cosine" and len(matrix):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.maximum(norms, 1e-12)
+        return matrix
+
+    def _build(self, ids: Sequence[int], matrix: np.ndarray, names: Sequence[str], contents: Sequence[str]) -> _SourceIndex:
+        ids = np.asarray(ids, dtype=np.int64)
+        return _SourceIndex(
+            ids=ids,
+            matrix=matrix,
+            sq_norms=np.einsum("ij,ij->i", matrix, matrix) if len(matrix) else np.zeros(0, dtype=np.float32),
+            names=tuple(names),
+            contents=tuple(contents),
+            positions={int(doc_id): position for position, doc_id in enumerate(ids)},
+        )
+
+    def begin_reload(self):
+        """Mulai mencatat upsert/remove; dipanggil sebelum snapshot katalog dibaca dari database."""
+        with self._write_lock:
+            self._journal = []
+
+    def finish_reload(self, sources: Dict[str, Tuple[Sequence[int], Sequence[Sequence[float]], Sequence[str], Sequence[str]]],
+                      dim: int):
+        """
+        Ganti semua sumber dengan snapshot `sources` ({source: (ids, vectors, names, contents)}) sekaligus,
+        setelah menerapkan ulang perubahan yang dicatat sejak `begin_reload()`.
+        """
+        prepared = {
+            source: (ids, self._prepare(np.asarray(vectors, dtype=np.float32).reshape(len(ids), dim)), names, contents)
+            for source, (ids, vectors, names, contents) in sources.items()
+        }
+        with self._write_lock:
+            reloaded = {source: self._build(*snapshot) for source, snapshot in prepared.items()}
+            for apply, args in self._journal or []:
+                apply(reloaded, *args)
+            self._sources = reloaded
+            self._journal = None
+            self.loaded_at = time.monotonic()
+
+    def abort_reload(self):
+        """Hentikan pencatatan perubahan setelah reload gagal; index lama tetap dipakai."""
+        with self._write_lock:
+            self._journal = None
+
+    def _record(self, apply: Callable[..., None], *args):
+        apply(self._sources, *args)
+        if self._journal is not None:
+            self._journal.append((apply, args))
+
+    def _upsert_into(self, sources: Dict[str, _SourceIndex], source: str, doc_id: int, row: np.ndarray, name: str, content: str):
+        current = sources.get(source)
+        if current is None:
+            sources[source] = self._build([doc_id], row, [name], [content])
+            return
+
+        names, contents = list(current.names), list(current.contents)
+        position = current.positions.get(int(doc_id))
+        if position is None:
+            ids = np.append(current.ids, doc_id)
+            matrix = np.vstack([current.matrix, row])
+            names.append(name)
+            contents.append(content)
+        else:
+            ids = current.ids
+            matrix = current.matrix.copy()
+            matrix[position] = row[0]
+            names[position] = name
+            contents[position] = content
+        sources[source] = self._build(ids, matrix, names, contents)
+
+    def _remove_from(self, sources: Dict[str, _SourceIndex], source: str, doc_id: int):
+        current = sources.get(source)
+        if current is None or int(doc_id) not in current.positions:
+            return
+        keep = current.ids != doc_id
+        sources[source] = self._build(
+            current.ids[keep],
+            np.ascontiguousarray(current.matrix[keep]),
+            [name for name, kept in zip(current.names, keep) if kept],
+            [content for content, kept in zip(current.contents, keep) if kept],
+        )
+
+    def upsert(self, source: str, doc_id: int, vector: Sequence[float], name: str, content: str):
+        row = self._prepare(np.asarray(vector, dtype=np.float32).reshape(1, -1))
+        with self._write_lock:
+            self._record(self._upsert_into, source, doc_id, row, name, content)
+
+    def remove(self, source: str, doc_id: int):
+        with self._write_lock:
+            self._record(self._remove_from, source, doc_id)
+
+    def _distances(self, index: _SourceIndex, query: np.ndarray) -> np.ndarray:
+        scores = index.matrix @ query
+        if self.distance == "cosine":
+            return 1.0 - scores
+        if self.distance == "inner_product":
+            return -scores
+        return np.sqrt(np.maximum(index.sq_norms - 2.0 * scores + float(query @ query), 0.0))
+
+    def search(self, query_embedding: Sequence[float], limits: Dict[str, int]) -> List[Tuple[str, int, str, str, float]]:
+        """Kembalikan (source, id, name, content, distance) top-k per sumber, terurut per sumber lalu jarak."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if self.distance == "cosine":
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        results: List[Tuple[str, int, str, str, float]] = []
+        for source, k in limits.items():
+            index = self._sources.get(source)
+            if index is None or not len(index.ids) or k <= 0:
+                continue
+            distances = self._distances(index, query)
+            k = min(k, len(distances))
+            top = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+            top_distances = distances[top]
+            if self.distance == "l2":
+                # Rumus ||x||^2 - 2x.q + ||q||^2 rawan pembatalan float32; hitung ulang eksak untuk k pemenang
+                top_distances = np.linalg.norm(index.matrix[top] - query, axis=1)
+            order = np.argsort(top_distances, kind="stable")
+            for position, distance in zip(top[order], top_distances[order]):
+                results.append((source, int(index.ids[position]), index.names[position],
+                                index.contents[position], float(distance)))
+        return results
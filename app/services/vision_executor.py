@@ -0,0 +1,129 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from fastapi import HTTPException
+from app.core.config import settings
+
+
+class VisionBusyError(HTTPException):
+    """Antrean pekerjaan model vision penuh (503); klien diminta mencoba lagi."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail=f"Layanan analisis gambar sedang sibuk. Silakan coba lagi dalam {retry_after} detik.",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.retry_after = retry_after
+
+
+class VisionTimeoutError(HTTPException):
+    """Pekerjaan model vision (termasuk waktu antre) melebihi batas waktu (504)."""
+
+    def __init__(self, timeout: float):
+        super().__init__(
+            status_code=504,
+            detail=f"Analisis gambar tidak selesai dalam {timeout:g} detik. Silakan coba lagi."
+        )
+
+
+class VisionExecutor:
+    """
+    Thread pool khusus untuk pekerjaan CPU model vision (decode dan praproses gambar, inference ONNX)
+    agar event loop tetap melayani request lain, termasuk stream /chat.
+
+    Paling banyak `workers` pekerjaan berjalan bersamaan; pekerjaan yang menunggu dibatasi `max_queue`
+    (0 = tanpa batas) dan sisanya langsung ditolak dengan 503. Batas waktu `timeout` (0 = tanpa batas)
+    dihitung sejak pekerjaan diantrekan. Saat timeout atau pemanggil dibatalkan, pekerjaan yang belum mulai
+    dibuang dari antrean, sedangkan pekerjaan yang sedang berjalan diberi tahu lewat `on_cancel`
+    (mis. `RunOptions.terminate` ONNX Runtime).
+    """
+
+    def __init__(self, workers: int, max_queue: int, timeout: float):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="vision")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        # Rata-rata bergerak durasi satu pekerjaan (detik), untuk Retry-After
+        self._avg_run_seconds = 0.1
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._avg_run_seconds * (self.queued + 1) / self.workers))
+
+    def _call(self, fn: Callable[..., Any], args: tuple) -> Any:
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        started = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * elapsed
+
+    async def run(self, fn: Callable[..., Any], *args: Any, on_cancel: Optional[Callable[[], None]] = None) -> Any:
+        """Jalankan `fn(*args)` di thread pool dan tunggu hasilnya."""
+        with self._lock:
+            if self.max_queue > 0 and self.queued >= self.max_queue:
+                self.rejected += 1
+                raise VisionBusyError(self.retry_after())
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        future = self._executor.submit(self._call, fn, args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout if self.timeout > 0 else None)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.cancel():
+                # Belum sempat dijalankan worker: keluarkan dari hitungan antrean
+                with self._lock:
+                    self.queued -= 1
+            elif on_cancel is not None:
+                on_cancel()
+            with self._lock:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                else:
+                    self.cancelled += 1
+            if isinstance(e, asyncio.TimeoutError):
+                raise VisionTimeoutError(self.timeout) from None
+            raise
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "timeout_seconds": self.timeout,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "avg_run_ms": round(self._avg_run_seconds * 1000, 1),
+        }
+
+
+vision_executor = VisionExecutor(
+    workers=settings.VISION_EXECUTOR_WORKERS,
+    max_queue=settings.VISION_EXECUTOR_MAX_QUEUE,
+    timeout=settings.VISION_TIMEOUT_SECONDS
+)
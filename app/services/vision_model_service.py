@@ -1,105 +1,153 @@
 import onnxruntime  
-from PIL import Image 
 import numpy as np  
-import io  
 import logging  
-from typing import Dict, Any, List, Optional 
+from typing import Dict, Any, Optional 
 import scipy.special  
+from fastapi import HTTPException
 from app.core.config import settings
+from app.core.onnx_session import IOBindingRunner, OnnxSessionConfig, create_session
+from app.services.micro_batcher import MicroBatcher
+from app.services.vision_executor import VisionExecutor, vision_executor
+from app.services.vision_preprocessing import DISEASE_NAMES_FROM_MODEL_OUTPUT, preprocess_image
+from app.services.vision_workers import VisionWorkerClient
 
 # Logger untuk pencatatan informasi dan error
 logger = logging.getLogger(__name__)
 
-# Daftar penyakit yang sesuai dengan urutan output model
-DISEASE_NAMES_FROM_MODEL_OUTPUT = [
-    "Atelectasis", "Cardiomegaly", "Effusion", "Infiltration", "Mass", "Nodule",
-    "Pneumonia", "Pneumothorax", "Consolidation", "Edema", "Emphysema",
-    "Fibrosis", "Pleural_Thickening", "Hernia"
-] 
-
-# Ukuran gambar input model
-MODEL_IMAGE_SIZE = 224
-
-
 class VisionModelService:
     """
     Kelas layanan untuk memproses gambar X-ray dan memprediksi kemungkinan penyakit menggunakan model ONNX.
     """
 
-    def __init__(self, model_path: str = settings.ONNX_MODEL_PATH):
+    def __init__(self, model_path: str = settings.vision_model_path, executor: VisionExecutor = vision_executor,
+                 backend: str = settings.VISION_BACKEND, session_config: Optional[OnnxSessionConfig] = None):
         """Inisialisasi layanan dengan path ke model."""
         self.model_path = model_path
+        self.session_config = session_config  # Opsi ONNX Runtime (bawaan: dari Settings, dibaca saat model dimuat)
+        self.load_info: Dict[str, Any] = {}  # Info pemuatan session (cache graph teroptimasi, durasi)
+        self.io_binding: Optional[IOBindingRunner] = None
+        self.executor = executor  # Thread pool untuk praproses dan inference (di luar event loop)
         self.session = None  # Session inference ONNX
         self.input_name: Optional[str] = None  # Nama input model
         self.output_name: Optional[str] = None  # Nama output model
+        self.dynamic_batch = False  # True bila dimensi batch input model tidak tetap
+        self.batcher: Optional[MicroBatcher] = None
+        self.worker_client: Optional[VisionWorkerClient] = None
+        if backend == "workers":
+            # Model dimuat oleh pool proses worker (python -m app.services.vision_workers), bukan di proses API
+            self.worker_client = VisionWorkerClient(
+                socket_path=settings.VISION_WORKER_SOCKET,
+                timeout=settings.VISION_TIMEOUT_SECONDS,
+                max_in_flight=settings.VISION_EXECUTOR_MAX_QUEUE
+            )
+            return
         self._load_model()  # Muat model saat inisialisasi
+        if settings.VISION_BATCH_ENABLED and self.session is not None:
+            if self.dynamic_batch:
+                self.batcher = MicroBatcher(
+                    "vision inference",
+                    # Tensor `[3, H, W]` dari request bersamaan digabung menjadi satu batch `[N, 3, H, W]`
+                    lambda tensors: self._infer_batch(np.stack(tensors)),
+                    max_batch_size=settings.VISION_BATCH_MAX_SIZE,
+                    max_wait_ms=settings.VISION_BATCH_MAX_WAIT_MS
+                )
+            else:
+                logger.warning("Vision model has a fixed batch dimension; micro-batching disabled.")
 
     def _load_model(self):
         """Memuat model ONNX ke dalam session inference."""
         try:
-            self.session = onnxruntime.InferenceSession(self.model_path, providers=['CPUExecutionProvider'])
+            self.session_config = self.session_config or OnnxSessionConfig.from_settings()
+            self.session, self.load_info = create_session(self.model_path, self.session_config)
             if not self.session.get_inputs() or not self.session.get_outputs():
                 logger.error("ONNX model inputs or outputs are empty.")
                 self.session = None
                 return
             self.input_name = self.session.get_inputs()[0].name
             self.output_name = self.session.get_outputs()[0].name
+            self.dynamic_batch = not isinstance(self.session.get_inputs()[0].shape[0], int)
             logger.info(f"Vision model loaded: {self.model_path}, Input: {self.input_name}, Output: {self.output_name}")
             model_output_shape = self.session.get_outputs()[0].shape
             if len(model_output_shape) < 2 or model_output_shape[-1] != len(DISEASE_NAMES_FROM_MODEL_OUTPUT):
                 logger.error(f"Model output shape mismatch: {model_output_shape[-1]} vs {len(DISEASE_NAMES_FROM_MODEL_OUTPUT)}")
+            elif settings.VISION_ORT_IO_BINDING:
+                self.io_binding = IOBindingRunner(self.session, self.input_name, self.output_name, model_output_shape[-1])
         except Exception as e:
             logger.error(f"Failed to load ONNX model from {self.model_path}: {e}")
             self.session = None
 
-    def _preprocess_image(self, image_data: bytes) -> Optional[np.ndarray]:
-        """Praproses gambar dari bytes ke format tensor float32 yang siap dipakai model."""
-        try:
-            image = Image.open(io.BytesIO(image_data)).convert('RGB')
-            image = image.resize((MODEL_IMAGE_SIZE, MODEL_IMAGE_SIZE), Image.LANCZOS)
-            image_np = np.array(image, dtype=np.float32)
+    def _run_session(self, batch: np.ndarray, run_options: onnxruntime.RunOptions) -> np.ndarray:
+        if self.io_binding is not None:
+            logits = self.io_binding.run(batch, run_options)
+        else:
+            logits = self.session.run([self.output_name], {self.input_name: batch}, run_options)[0]
+        return scipy.special.softmax(logits, axis=-1)
 
-            mean = np.array([0.485, 0.456, 0.406]) 
-            std = np.array([0.229, 0.224, 0.225])  
-            image_np = (image_np / 255.0 - mean) / std  # Normalisasi
+    async def _infer_batch(self, batch: np.ndarray) -> np.ndarray:
+        """Inference satu batch `[N, 3, H, W]`; mengembalikan probabilitas softmax per baris `[N, kelas]`."""
+        run_options = onnxruntime.RunOptions()
 
-            image_np = np.transpose(image_np, (2, 0, 1))  # Ubah format HWC ke CHW
-            image_np = np.expand_dims(image_np, axis=0)  # Tambahkan batch dimension
-            return image_np.astype(np.float32)
-        except Exception as e:
-            logger.error(f"Error during image preprocessing: {e}")
-            return None
+        def terminate():
+            # Hentikan session.run yang sedang berjalan saat timeout/dibatalkan
+            run_options.terminate = True
 
-    def _postprocess_output(self, model_output_onnx: List[np.ndarray]) -> Dict[str, float]:
-        """Postproses output model menjadi probabilitas kelas penyakit."""
-        logits = model_output_onnx[0][0]  # Ambil logit dari batch pertama
+        return await self.executor.run(self._run_session, batch, run_options, on_cancel=terminate)
 
-        if len(logits) != len(DISEASE_NAMES_FROM_MODEL_OUTPUT):
-            logger.error(f"Mismatch in output logits size: {len(logits)} vs {len(DISEASE_NAMES_FROM_MODEL_OUTPUT)}")
+    def _postprocess_output(self, probabilities_raw: np.ndarray) -> Dict[str, float]:
+        """Postproses probabilitas satu gambar menjadi persentase per kelas penyakit."""
+        if len(probabilities_raw) != len(DISEASE_NAMES_FROM_MODEL_OUTPUT):
+            logger.error(f"Mismatch in output logits size: {len(probabilities_raw)} vs {len(DISEASE_NAMES_FROM_MODEL_OUTPUT)}")
             return {}
 
-        probabilities_raw = scipy.special.softmax(logits)  # Softmax untuk probabilitas
         predictions: Dict[str, float] = {}
         for i, disease_name in enumerate(DISEASE_NAMES_FROM_MODEL_OUTPUT):
             prob_percent = round(float(probabilities_raw[i]) * 100, 2)
             predictions[disease_name] = prob_percent
         return predictions
 
+    def predict_local(self, image_data: bytes) -> Dict[str, float]:
+        """Prediksi sinkron di thread pemanggil; dipakai proses worker inference."""
+        processed_input = preprocess_image(image_data)
+        if processed_input is None:
+            return {}
+        return self._postprocess_output(self._run_session(processed_input, onnxruntime.RunOptions())[0])
+
     async def predict_disease_probabilities(self, image_data: bytes) -> Dict[str, float]:
         """Metode utama untuk prediksi penyakit berdasarkan gambar."""
+        if self.worker_client is not None:
+            try:
+                return await self.worker_client.predict(image_data)
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error(f"Error during vision worker inference: {e}")
+                return {}
+
         if not self.session or not self.input_name:
             logger.error("Vision model session/input name not available.")
             return {}
 
-        processed_input = self._preprocess_image(image_data)
+        processed_input = await self.executor.run(preprocess_image, image_data)
         if processed_input is None:
             return {}
 
         try:
-            model_output_onnx = self.session.run([self.output_name], {self.input_name: processed_input})
-            return self._postprocess_output(model_output_onnx)
+            if self.batcher is not None:
+                probabilities = await self.batcher.submit(processed_input[0])
+            else:
+                probabilities = (await self._infer_batch(processed_input))[0]
+            return self._postprocess_output(probabilities)
+        except HTTPException:
+            # Antrean penuh (503) atau timeout (504) diteruskan ke pemanggil
+            raise
         except Exception as e:
             logger.error(f"Error during vision model inference: {e}")
             return {}
 
-vision_model_service = VisionModelService()
\ No newline at end of file
+def __getattr__(name: str):
+    # Singleton dibuat saat pertama diimpor dari modul ini, bukan saat modul dimuat: proses worker inference dan
+    # skrip yang hanya memakai kelas VisionModelService tidak ikut memuat model bawaan
+    if name == "vision_model_service":
+        service = globals()["vision_model_service"] = VisionModelService()
+        return service
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
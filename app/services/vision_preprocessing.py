@@ -0,0 +1,36 @@
+import io
+import logging
+from typing import Optional
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Daftar penyakit yang sesuai dengan urutan output model
+DISEASE_NAMES_FROM_MODEL_OUTPUT = [
+    "Atelectasis", "Cardiomegaly", "Effusion", "Infiltration", "Mass", "Nodule",
+    "Pneumonia", "Pneumothorax", "Consolidation", "Edema", "Emphysema",
+    "Fibrosis", "Pleural_Thickening", "Hernia"
+]
+
+# Ukuran gambar input model
+MODEL_IMAGE_SIZE = 224
+
+
+def preprocess_image(image_data: bytes) -> Optional[np.ndarray]:
+    """Praproses gambar dari bytes ke format tensor float32 `[1, 3, H, W]` yang siap dipakai model."""
+    try:
+        image = Image.open(io.BytesIO(image_data)).convert('RGB')
+        image = image.resize((MODEL_IMAGE_SIZE, MODEL_IMAGE_SIZE), Image.LANCZOS)
+        image_np = np.array(image, dtype=np.float32)
+
+        mean = np.array([0.485, 0.456, 0.406])
+        std = np.array([0.229, 0.224, 0.225])
+        image_np = (image_np / 255.0 - mean) / std  # Normalisasi
+
+        image_np = np.transpose(image_np, (2, 0, 1))  # Ubah format HWC ke CHW
+        image_np = np.expand_dims(image_np, axis=0)  # Tambahkan batch dimension
+        return image_np.astype(np.float32)
+    except Exception as e:
+        logger.error(f"Error during image preprocessing: {e}")
+        return None
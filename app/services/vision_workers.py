@@ -0,0 +1,242 @@
+"""
+Pool proses worker inference vision (VISION_BACKEND=workers).
+
+Satu proses supervisor membuka unix socket VISION_WORKER_SOCKET lalu menjalankan VISION_WORKER_PROCESSES
+proses worker (pre-fork). Setiap worker memuat model ONNX sekali dan bergiliran `accept()` koneksi dari
+socket yang sama, sehingga worker yang menganggur yang mengambil request berikutnya. Proses API (berapa pun
+jumlah worker uvicorn-nya) hanya mengirim bytes gambar mentah dan menerima probabilitas; decode, praproses
+dan inference tidak lagi berjalan di proses API maupun memakan memori model di sana. Worker yang mati
+(crash, OOM, kill) diganti oleh supervisor.
+
+Protokol per koneksi: satu request `[uint32 panjang][bytes gambar]`, satu respons `[uint32 panjang][JSON]`
+berisi probabilitas per penyakit (`{}` bila gambar tidak bisa diproses) atau `{"error": "..."}`.
+
+    python -m app.services.vision_workers
+"""
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import socket
+import struct
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.vision_executor import VisionBusyError, VisionTimeoutError
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!I")
+# Worker yang mati lebih cepat dari ini setelah start dianggap crash loop: penggantian ditunda
+_MIN_WORKER_UPTIME_SECONDS = 5.0
+_MAX_RESTART_DELAY_SECONDS = 30.0
+
+
+def _recv_exactly(conn: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = conn.recv(min(size - len(buffer), 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed mid-frame")
+        buffer += chunk
+    return bytes(buffer)
+
+
+def _serve(listener: socket.socket, model_path: str):
+    """Loop satu proses worker: muat model sekali, lalu layani koneksi satu per satu."""
+    # Handler supervisor ikut diwarisi saat fork: worker berhenti langsung oleh SIGTERM, Ctrl+C ditangani supervisor
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from app.services.vision_model_service import VisionModelService
+
+    service = VisionModelService(model_path, backend="local")
+    if service.session is None:
+        raise SystemExit(3)
+    logger.info(f"Vision worker {os.getpid()} ready")
+
+    while True:
+        conn, _ = listener.accept()
+        with conn:
+            try:
+                (size,) = _HEADER.unpack(_recv_exactly(conn, _HEADER.size))
+                image_data = _recv_exactly(conn, size)
+            except (OSError, struct.error) as e:
+                logger.warning(f"Vision worker {os.getpid()} dropped malformed request: {e}")
+                continue
+            try:
+                result: Dict[str, Any] = service.predict_local(image_data)
+            except Exception as e:
+                logger.error(f"Vision worker {os.getpid()} inference failed: {e}")
+                result = {"error": str(e)}
+            payload = json.dumps(result).encode()
+            try:
+                conn.sendall(_HEADER.pack(len(payload)) + payload)
+            except OSError:
+                # Klien sudah menyerah (timeout/dibatalkan)
+                pass
+
+
+class VisionWorkerPool:
+    """Supervisor proses worker: membuka socket, menjalankan worker, dan mengganti worker yang mati."""
+
+    def __init__(self, socket_path: str, processes: int, model_path: str = settings.vision_model_path):
+        self.socket_path = socket_path
+        self.processes = max(1, processes)
+        self.model_path = model_path
+        # fork: worker mewarisi socket listener; supervisor sendiri tidak pernah memuat onnxruntime
+        self._context = multiprocessing.get_context("fork")
+        self._listener: Optional[socket.socket] = None
+        self._workers: List[multiprocessing.Process] = []
+        self._started_at: Dict[int, float] = {}
+        self._stopping = False
+        self.restarts = 0
+
+    def _bind(self) -> socket.socket:
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                raise SystemExit(f"Vision worker pool already listening on {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.socket_path)
+            finally:
+                probe.close()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen(128)
+        return listener
+
+    def _spawn(self) -> multiprocessing.Process:
+        process = self._context.Process(target=_serve, args=(self._listener, self.model_path),
+                                        name="vision-worker", daemon=True)
+        process.start()
+        self._started_at[process.pid] = time.monotonic()
+        return process
+
+    def _stop(self, *_):
+        self._stopping = True
+
+    def run(self):
+        self._listener = self._bind()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        self._workers = [self._spawn() for _ in range(self.processes)]
+        logger.info(f"Vision worker pool listening on {self.socket_path} with {self.processes} workers")
+        restart_delay = 1.0
+        try:
+            while not self._stopping:
+                multiprocessing.connection.wait([w.sentinel for w in self._workers], timeout=1.0)
+                for i, worker in enumerate(self._workers):
+                    if worker.is_alive() or self._stopping:
+                        continue
+                    uptime = time.monotonic() - self._started_at.pop(worker.pid, 0.0)
+                    logger.warning(f"Vision worker {worker.pid} exited with code {worker.exitcode} after {uptime:.1f}s; restarting")
+                    if uptime < _MIN_WORKER_UPTIME_SECONDS:
+                        time.sleep(restart_delay)
+                        restart_delay = min(restart_delay * 2, _MAX_RESTART_DELAY_SECONDS)
+                    else:
+                        restart_delay = 1.0
+                    self._workers[i] = self._spawn()
+                    self.restarts += 1
+        finally:
+            for worker in self._workers:
+                worker.terminate()
+            for worker in self._workers:
+                worker.join(timeout=5)
+            self._listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            logger.info("Vision worker pool stopped")
+
+
+class VisionWorkerClient:
+    """
+    Klien pool worker di proses API. Setiap prediksi memakai satu koneksi unix socket. Hanya gagal
+    koneksi (pool belum siap atau sedang restart) yang dicoba sekali lagi; request yang gambarnya sudah
+    terkirim lalu terputus karena worker mati tidak dikirim ulang, karena gambar yang membuat ONNX
+    Runtime crash akan mematikan worker berikutnya juga. Request yang sedang menunggu dibatasi
+    `max_in_flight` (0 = tanpa batas; penuh = 503). Batas waktu `timeout` (0 = tanpa batas) mencakup
+    percobaan ulang (lewat = 504).
+    """
+
+    def __init__(self, socket_path: str, timeout: float, max_in_flight: int):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.max_in_flight_seen = 0
+        self.completed = 0
+        self.retries = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+        # Rata-rata bergerak durasi satu prediksi (detik), untuk Retry-After
+        self._avg_seconds = 0.1
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            return await asyncio.open_unix_connection(self.socket_path)
+        except (ConnectionRefusedError, FileNotFoundError) as e:
+            # Socket belum ada atau supervisor sedang restart; gambar belum terkirim sehingga aman dicoba lagi
+            logger.warning(f"Vision worker pool unavailable ({type(e).__name__}: {e}); retrying once")
+            self.retries += 1
+            await asyncio.sleep(0.05)
+            return await asyncio.open_unix_connection(self.socket_path)
+
+    async def _request(self, image_data: bytes) -> Dict[str, Any]:
+        reader, writer = await self._connect()
+        try:
+            writer.write(_HEADER.pack(len(image_data)) + image_data)
+            await writer.drain()
+            (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+            return json.loads(await reader.readexactly(size))
+        finally:
+            writer.close()
+
+    async def predict(self, image_data: bytes) -> Dict[str, float]:
+        if self.max_in_flight > 0 and self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            raise VisionBusyError(max(1, math.ceil(self._avg_seconds * (self.in_flight + 1))))
+        self.in_flight += 1
+        self.max_in_flight_seen = max(self.max_in_flight_seen, self.in_flight)
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self._request(image_data), self.timeout if self.timeout > 0 else None)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise VisionTimeoutError(self.timeout) from None
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.monotonic() - started)
+        if "error" in result:
+            self.errors += 1
+            raise RuntimeError(f"Vision worker error: {result['error']}")
+        self.completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "socket": self.socket_path,
+            "timeout_seconds": self.timeout,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "max_in_flight_seen": self.max_in_flight_seen,
+            "completed": self.completed,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "avg_ms": round(self._avg_seconds * 1000, 1),
+        }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s")
+    VisionWorkerPool(settings.VISION_WORKER_SOCKET, settings.VISION_WORKER_PROCESSES).run()
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.core.ollama_http import ollama_client
+from app.services.embedding_service import embedding_service
+from app.services.llm_service import llm_service
+from app.services.generation_profiles import generation_profiles
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupError(Exception):
+    """Kesalahan konfigurasi yang tidak akan hilang dengan mencoba ulang (misalnya dimensi embedding berbeda)."""
+
+
+class WarmupService:
+    """
+    Memuat model embedding dan LLM ke memori Ollama saat startup dengan satu request kecil, agar request
+    pertama pengguna tidak menanggung waktu load model. Selama belum selesai, /health/ready menjawab 503.
+
+    Kegagalan koneksi (Ollama belum siap) dicoba ulang setiap WARMUP_RETRY_SECONDS; dimensi embedding
+    yang tidak sama dengan settings.EMBEDDING_DIM menghentikan warm-up dan instance tetap tidak siap.
+    """
+
+    def __init__(self):
+        self.status = "pending" if settings.WARMUP_ENABLED else "disabled"
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "disabled")
+
+    async def _warm_embedding(self):
+        started = time.perf_counter()
+        embedding = (await embedding_service.embed_documents(["warm-up"]))[0]
+        if len(embedding) != settings.EMBEDDING_DIM:
+            raise WarmupError(f"Embedding model {settings.EMBEDDING_MODEL_NAME} returned {len(embedding)} dimensions, "
+                              f"expected EMBEDDING_DIM={settings.EMBEDDING_DIM}.")
+        self.models[settings.EMBEDDING_MODEL_NAME] = {"kind": "embedding", "dimension": len(embedding),
+                                                      "load_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    async def _warm_llm(self):
+        # Satu token per model profil generate (termasuk degraded); num_ctx disamakan dengan profil agar
+        # request pertama tidak memicu Ollama memuat ulang model dengan ukuran konteks lain
+        profiles = {}
+        for lane in generation_profiles.profiles:
+            for profile in generation_profiles.for_lane(lane):
+                profiles.setdefault(profile.model, profile)
+        for model, profile in profiles.items():
+            started = time.perf_counter()
+            options = {**profile.options, "num_predict": 1}
+            if llm_service.llm is None:
+                await ollama_client.generate(model, "OK", options=options)
+            else:
+                await llm_service.llm.ainvoke("OK", model=model, options=options)
+            self.models[model] = {"kind": "llm", "profile": profile.name, "load_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    async def run(self):
+        if not settings.WARMUP_ENABLED:
+            return
+        self.status = "warming"
+        while True:
+            self.attempts += 1
+            try:
+                await self._warm_embedding()
+                await self._warm_llm()
+                break
+            except WarmupError as e:
+                self.status, self.error = "failed", str(e)
+                logger.error(f"Model warm-up failed: {e}")
+                return
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                logger.warning(f"Model warm-up attempt {self.attempts} failed ({self.error}); retrying in {settings.WARMUP_RETRY_SECONDS}s")
+                await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
+        self.status, self.error = "ready", None
+        self.finished_at = time.time()
+        logger.info(f"Model warm-up finished after {self.attempts} attempt(s): {self.models}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "error": self.error,
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+            "models": self.models,
+        }
+
+warmup_service = WarmupService()
@@ -0,0 +1,237 @@
+"""
+Benchmark latensi p50/p99 di bawah beban campuran (chat RAG + list diagnosis) untuk dua jalur database:
+
+  sync   handler `async def` dengan Session sinkron (psycopg2) seperti sebelumnya; setiap query
+         memblokir event loop sehingga semua request lain ikut tertahan.
+  async  endpoint asli /chat dan /diagnoses yang memakai AsyncSession (asyncpg).
+
+Kedua jalur menjalankan SQL retrieval dan query list diagnosis yang sama; Ollama diganti stub lokal.
+--db-latency-ms menyisipkan proxy TCP yang menunda setiap paket satu arah, mensimulasikan database di host lain.
+
+    python -m scripts.seed_catalog --reset
+    python -m scripts.bench_async_db --chat-clients 16 --list-clients 4 --requests-per-client 8 --db-latency-ms 2
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy.engine import make_url
+
+from scripts.stub_ollama import StubOllamaServer
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return (statistics.median(latencies) * 1000,
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000)
+
+
+class LatencyProxy:
+    """Proxy TCP -> PostgreSQL (TCP atau unix socket) yang menunda setiap chunk sebesar `latency_ms` per arah."""
+
+    def __init__(self, database_url: str, latency_ms: float):
+        url = make_url(database_url)
+        self.upstream_socket = url.query.get("host") if url.query.get("host", "").startswith("/") else None
+        self.upstream = (url.host or "localhost", url.port or 5432)
+        self.port = url.port or 5432
+        self.latency = latency_ms / 1000
+        self.url = url
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+
+    def _upstream_path(self):
+        return f"{self.upstream_socket}/.s.PGSQL.{self.port}"
+
+    async def _pipe(self, reader, writer):
+        try:
+            while data := await reader.read(65536):
+                await asyncio.sleep(self.latency)
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, client_reader, client_writer):
+        if self.upstream_socket:
+            upstream_reader, upstream_writer = await asyncio.open_unix_connection(self._upstream_path())
+        else:
+            upstream_reader, upstream_writer = await asyncio.open_connection(*self.upstream)
+        await asyncio.gather(self._pipe(client_reader, upstream_writer), self._pipe(upstream_reader, client_writer))
+
+    def start(self) -> str:
+        ready = threading.Event()
+
+        async def serve():
+            self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+            ready.set()
+
+        threading.Thread(target=lambda: (self.loop.run_until_complete(serve()), self.loop.run_forever()), daemon=True).start()
+        ready.wait()
+        port = self.server.sockets[0].getsockname()[1]
+        query = {key: value for key, value in self.url.query.items() if key != "host"}
+        return self.url.set(host="127.0.0.1", port=port, query=query).render_as_string(hide_password=False)
+
+
+def seed_diagnoses(count: int) -> int:
+    """Pastikan ada minimal `count` diagnosis (dengan dokter rujukan) agar endpoint list punya data."""
+    from sqlalchemy import select, func
+    from app.core.database import SessionLocal
+    from app.models.user import User, RoleEnum
+    from app.models.medical_image import MedicalImage
+    from app.models.diagnosis import Diagnosis
+    from app.models.diagnosis_doctor import DiagnosisDoctor
+    from app.models.doctor import Doctor
+    from app.models.poli import Poli
+    from app.models.disease import Disease
+
+    db = SessionLocal()
+    try:
+        existing = db.scalar(select(func.count(Diagnosis.id)))
+        user = db.query(User).first()
+        if user is None:
+            user = User(name="bench", email="bench@detakmedis.local", hashed_password="-", role=list(RoleEnum)[0])
+            db.add(user)
+            db.commit()
+        doctor_ids = [row.id for row in db.query(Doctor.id).limit(5).all()]
+        poli_id = db.scalar(select(Poli.id).limit(1))
+        disease_id = db.scalar(select(Disease.id).limit(1))
+        for i in range(existing, count):
+            image = MedicalImage(patient_id=user.id, poli_id=poli_id, path=f"/tmp/bench-{i}.png", label="Cardiomegaly")
+            db.add(image)
+            db.flush()
+            db.add(Diagnosis(query=f"keluhan {i}", result="hasil " * 50, disease_id=disease_id, medical_image_id=image.id,
+                             doctor_links=[DiagnosisDoctor(doctor_id=doctor_id, rank=rank + 1, distance=0.1 * rank)
+                                           for rank, doctor_id in enumerate(doctor_ids)]))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def add_sync_routes(app):
+    """Handler pembanding: async def + Session sinkron, menjalankan SQL yang sama dengan jalur async."""
+    from fastapi import APIRouter, Depends
+    from sqlalchemy.orm import Session
+    from app.core.database import get_db
+    from app.models.diagnosis import Diagnosis
+    from app.schemas.chat import ChatRequest, ChatResponse, ContextDocument
+    from app.services.diagnosis_service import diagnosis_service
+    from app.services.embedding_service import embedding_service
+    from app.services.llm_service import llm_service
+    from app.services.retrieval_service import retrieval_service, retrieval_sql, render_content, to_vector_literal, SOURCE_ORDER
+
+    # psycopg2 memakai placeholder %(name)s, bukan $n
+    sync_sql = re.sub(r"\$(\d)", lambda match: f"%(p{match.group(1)})s", retrieval_sql())
+    router = APIRouter(prefix="/bench/sync")
+
+    @router.post("/chat", response_model=ChatResponse)
+    async def sync_chat(request: ChatRequest, db: Session = Depends(get_db)):
+        query_embedding = await embedding_service.get_embedding(request.query)
+        limits = retrieval_service.source_limits()
+        rows = db.connection().exec_driver_sql(sync_sql, {
+            "p1": to_vector_literal(query_embedding), "p2": limits["poli"], "p3": limits["disease"], "p4": limits["doctor"]
+        }).all()
+        db.commit()
+        rows = sorted(rows, key=lambda row: (SOURCE_ORDER[row.source], row.distance))
+        docs = [ContextDocument(source=row.source, content=render_content(row.source, row.fields),
+                                metadata={"id": row.id, "name": row.fields["name"], "distance": float(row.distance)})
+                for row in rows]
+        context_str = "\n\n".join([f"Sumber: {doc.source}\nKonten: {doc.content}" for doc in docs])
+        answer = await llm_service.generate_response(question=request.query, context=context_str)
+        return ChatResponse(answer=answer, retrieved_contexts=docs)
+
+    @router.get("/diagnoses")
+    async def sync_list(limit: int = 100, db: Session = Depends(get_db)):
+        diagnoses = db.execute(diagnosis_service._diagnosis_query().order_by(Diagnosis.id).limit(limit)).unique().scalars().all()
+        return [diagnosis_service._to_response(diagnosis) for diagnosis in diagnoses]
+
+    app.include_router(router)
+
+
+async def run_mode(client, mode: str, args, counter):
+    chat_path, list_path = ("/chat/", "/diagnoses/") if mode == "async" else ("/bench/sync/chat", "/bench/sync/diagnoses")
+    latencies = defaultdict(list)
+
+    async def chat_client(client_id: int):
+        for _ in range(args.requests_per_client):
+            query = f"keluhan {mode} {next(counter)}: sesak napas dan nyeri dada"
+            started = time.perf_counter()
+            response = await client.post(chat_path, json={"query": query})
+            response.raise_for_status()
+            latencies["chat"].append(time.perf_counter() - started)
+
+    async def list_client(client_id: int):
+        for _ in range(args.requests_per_client * 4):
+            started = time.perf_counter()
+            response = await client.get(list_path, params={"limit": args.list_limit})
+            response.raise_for_status()
+            latencies["list"].append(time.perf_counter() - started)
+
+    # Pemanasan (tidak diukur): isi connection pool; asyncpg juga menginspeksi tipe vector/json sekali per koneksi
+    await asyncio.gather(*(client.post(chat_path, json={"query": f"pemanasan {mode} {next(counter)}"}) for _ in range(args.chat_clients)),
+                         *(client.get(list_path, params={"limit": args.list_limit}) for _ in range(args.list_clients)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(chat_client(c) for c in range(args.chat_clients)),
+                         *(list_client(c) for c in range(args.list_clients)))
+    elapsed = time.perf_counter() - started
+    total = sum(len(values) for values in latencies.values())
+    for kind in ("chat", "list"):
+        if not latencies[kind]:
+            continue
+        p50, p99 = summarize(latencies[kind])
+        print(f"{mode:>6} {kind:>5} {len(latencies[kind]):>6} {p50:>10.1f} {p99:>10.1f} {total / elapsed:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chat-clients", type=int, default=16)
+    parser.add_argument("--list-clients", type=int, default=4)
+    parser.add_argument("--requests-per-client", type=int, default=8)
+    parser.add_argument("--list-limit", type=int, default=10)
+    parser.add_argument("--diagnoses", type=int, default=200)
+    parser.add_argument("--generate-ms", type=float, default=200.0, help="latensi generate stub Ollama")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="latensi satu arah ke database (0 = langsung)")
+    args = parser.parse_args()
+
+    if args.db_latency_ms > 0:
+        os.environ["DATABASE_URL"] = LatencyProxy(os.environ["DATABASE_URL"], args.db_latency_ms).start()
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+
+    server = StubOllamaServer(generate_base_ms=args.generate_ms, tokens=1, token_ms=0, parallel=256).start()
+    os.environ["OLLAMA_BASE_URL"] = server.base_url
+    os.environ.setdefault("LLM_MODEL_NAME", "stub-llm")
+    # Setiap query unik dan cache dimatikan agar setiap request benar-benar menyentuh database
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ["RETRIEVAL_CACHE_ENABLED"] = "false"
+
+    import httpx
+    from app.main import app
+
+    # Log INFO per request (RAGService mencetak konteks) ikut membebani event loop yang diukur
+    logging.disable(logging.INFO)
+    seed_diagnoses(args.diagnoses)
+    add_sync_routes(app)
+    counter = itertools.count()
+
+    async def run_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            print(f"{'mode':>6} {'kind':>5} {'reqs':>6} {'p50 ms':>10} {'p99 ms':>10} {'req/s':>8}")
+            for mode in ("sync", "async"):
+                await run_mode(client, mode, args, counter)
+
+    asyncio.run(run_all())
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark throughput EmbeddingService dengan dan tanpa micro-batching terhadap stub Ollama lokal.
+
+    python -m scripts.bench_embedding_batching --requests-per-caller 20
+
+Setiap pemanggil mengirim teks unik sehingga cache embedding tidak berpengaruh.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from scripts.stub_ollama import StubOllamaServer
+
+
+async def run_callers(embed, concurrency: int, requests_per_caller: int):
+    latencies = []
+
+    async def caller(caller_id: int):
+        for i in range(requests_per_caller):
+            started = time.perf_counter()
+            await embed(f"keluhan pasien {caller_id}-{i}: sesak napas dan nyeri dada")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(c) for c in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--requests-per-caller", type=int, default=20)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    server = StubOllamaServer().start()
+    os.environ["OLLAMA_BASE_URL"] = server.base_url
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("LLM_MODEL_NAME", "stub-llm")
+    os.environ["EMBEDDING_BATCH_ENABLED"] = "true"
+    os.environ["EMBEDDING_BATCH_MAX_SIZE"] = str(args.max_batch_size)
+    os.environ["EMBEDDING_BATCH_MAX_WAIT_MS"] = str(args.max_wait_ms)
+
+    from app.services.embedding_service import EmbeddingService
+
+    service = EmbeddingService()
+    async def unbatched(text):
+        return (await service.embed_documents([text]))[0]
+
+    batcher = service.batcher
+
+    async def run_all():
+        # Klien async Ollama terikat ke satu event loop, jadi semua skenario dijalankan di loop yang sama
+        print(f"{'callers':>8} {'mode':>10} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+        for concurrency in args.concurrency:
+            for mode, embed in (("unbatched", unbatched), ("batched", batcher.submit)):
+                result = await run_callers(embed, concurrency, args.requests_per_caller)
+                print(f"{concurrency:>8} {mode:>10} {result['throughput']:>10.1f} {result['p50_ms']:>10.1f} {result['p99_ms']:>10.1f}")
+
+    asyncio.run(run_all())
+    print(f"batches run: {batcher.batches_run}, avg batch size: {batcher.stats()['avg_batch_size']}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark latensi chat selama lonjakan generate diagnosis, dengan dan tanpa penjadwal LLM.
+
+Sejumlah `--diagnoses` generate AIDOC dikirim sekaligus, lalu `--chats` request chat datang setiap
+`--chat-interval-ms`. Stub Ollama hanya melayani `--parallel` generate bersamaan (seperti OLLAMA_NUM_PARALLEL).
+
+  unbounded  semua generate langsung dikirim ke Ollama dan mengantre di sana (FIFO).
+  scheduled  LLMScheduler dengan max_concurrency = --parallel: chat mendahului antrean diagnosis,
+             antrean diagnosis dibatasi --diagnosis-queue (sisanya ditolak 429).
+
+    python -m scripts.bench_llm_scheduler --diagnoses 40 --chats 20 --parallel 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from scripts.stub_ollama import StubOllamaServer
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_mode(mode: str, args, llm_service, aidoc_service, llm_scheduler, LLMBusyError):
+    llm_scheduler.max_concurrency = args.parallel if mode == "scheduled" else 0
+    llm_scheduler._lanes["diagnosis"].max_queue = args.diagnosis_queue
+    results = {"chat": [], "diagnosis": [], "rejected": 0}
+
+    async def timed(kind: str, service, i: int):
+        started = time.perf_counter()
+        try:
+            # Prompt unik agar single-flight tidak menggabungkan request
+            await service.generate_response(question=f"{mode} {kind} {i}", context="konteks")
+            results[kind].append(time.perf_counter() - started)
+        except LLMBusyError:
+            results["rejected"] += 1
+
+    async def chats():
+        tasks = []
+        for i in range(args.chats):
+            tasks.append(asyncio.create_task(timed("chat", llm_service, i)))
+            await asyncio.sleep(args.chat_interval_ms / 1000)
+        await asyncio.gather(*tasks)
+
+    started = time.perf_counter()
+    diagnoses = [timed("diagnosis", aidoc_service, i) for i in range(args.diagnoses)]
+    await asyncio.gather(*diagnoses, chats())
+    elapsed = time.perf_counter() - started
+
+    chat, diagnosis = results["chat"], results["diagnosis"]
+    print(f"{mode:>10} {statistics.median(chat) * 1000:>12.0f} {percentile(chat, 0.99) * 1000:>12.0f} "
+          f"{(statistics.median(diagnosis) * 1000) if diagnosis else 0:>12.0f} {len(diagnosis):>6} {results['rejected']:>8} {elapsed:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--diagnoses", type=int, default=40)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--chat-interval-ms", type=float, default=250.0)
+    parser.add_argument("--parallel", type=int, default=2, help="slot paralel stub Ollama")
+    parser.add_argument("--diagnosis-queue", type=int, default=16)
+    parser.add_argument("--generate-ms", type=float, default=300.0)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    server = StubOllamaServer(generate_base_ms=args.generate_ms, tokens=args.tokens, token_ms=args.token_ms,
+                              parallel=args.parallel).start()
+    os.environ["OLLAMA_BASE_URL"] = server.base_url
+    os.environ.setdefault("LLM_MODEL_NAME", "stub-llm")
+
+    from app.services.llm_service import llm_service
+    from app.services.aidoc_service import aidoc_service
+    from app.services.llm_scheduler import llm_scheduler, LLMBusyError
+
+    async def run_all():
+        print(f"{'mode':>10} {'chat p50 ms':>12} {'chat p99 ms':>12} {'diag p50 ms':>12} {'diag':>6} {'rejected':>8} {'total s':>8}")
+        for mode in ("unbounded", "scheduled"):
+            await run_mode(mode, args, llm_service, aidoc_service, llm_scheduler, LLMBusyError)
+        print(llm_scheduler.stats()["lanes"])
+
+    asyncio.run(run_all())
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark pembagian beban ke beberapa node Ollama (OLLAMA_BASE_URL berisi daftar URL), memakai stub lokal.
+
+  generate  `--requests` generate LLM bersamaan; setiap stub hanya melayani `--parallel` generate sekaligus.
+            Dibandingkan: satu node vs `--nodes` node (least-outstanding).
+  failover  `--nodes` node, node pertama dimatikan setelah aplikasi start: request yang gagal konek dicoba
+            di node lain, node dikeluarkan, lalu dimasukkan kembali oleh health check setelah hidup lagi.
+  embed     embedding berurutan ke dua node, satu di antaranya lambat (`--slow-embed-ms`), tanpa dan
+            dengan hedging (OLLAMA_EMBED_HEDGE_MS=`--hedge-ms`).
+
+Setiap skenario dijalankan di proses terpisah karena balancer dibuat saat modul di-import.
+
+    python -m scripts.bench_ollama_balancer --nodes 3 --requests 30
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from scripts.stub_ollama import StubOllamaServer
+
+SCENARIOS = [
+    ("generate", 1, 0),
+    ("generate", None, 0),
+    ("failover", None, 0),
+    ("embed", 2, 0),
+    ("embed", 2, None),
+]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_child(args):
+    if args.scenario == "embed":
+        stubs = [StubOllamaServer(embed_base_ms=args.slow_embed_ms if i == 0 else 15.0, parallel=args.parallel).start()
+                 for i in range(args.child_nodes)]
+    else:
+        stubs = [StubOllamaServer(generate_base_ms=args.generate_ms, tokens=args.tokens, token_ms=args.token_ms,
+                                  parallel=args.parallel).start() for _ in range(args.child_nodes)]
+    os.environ["OLLAMA_BASE_URL"] = ",".join(stub.base_url for stub in stubs)
+    os.environ.setdefault("LLM_MODEL_NAME", "stub-llm")
+    os.environ["LLM_MAX_CONCURRENCY"] = "0"
+    os.environ["OLLAMA_EMBED_HEDGE_MS"] = str(args.child_hedge_ms)
+
+    from app.core.ollama_http import ollama_balancer
+    from app.services.llm_service import llm_service
+    from app.services.embedding_service import embedding_service
+
+    logging.disable(logging.WARNING)
+    latencies = []
+    errors = 0
+
+    async def generate(i):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            await llm_service.generate_response(question=f"pertanyaan {i}", context="konteks")
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            errors += 1
+
+    async def run_all():
+        restored = None
+        started = time.perf_counter()
+        if args.scenario == "embed":
+            for i in range(args.requests):
+                t = time.perf_counter()
+                await embedding_service.embed_documents([f"teks {i}"])
+                latencies.append(time.perf_counter() - t)
+        else:
+            if args.scenario == "failover":
+                port = stubs[0].httpd.server_address[1]
+                stubs[0].stop()
+            await asyncio.gather(*(generate(i) for i in range(args.requests)))
+            if args.scenario == "failover":
+                # Node hidup lagi di port yang sama; satu putaran health check memasukkannya kembali
+                stubs[0] = StubOllamaServer(port=port).start()
+                await ollama_balancer.check_health()
+                restored = ollama_balancer.endpoints[0].healthy
+        elapsed = time.perf_counter() - started
+        return elapsed, restored
+
+    elapsed, restored = asyncio.run(run_all())
+    stats = ollama_balancer.stats() if ollama_balancer is not None else None
+    for stub in stubs:
+        stub.stop()
+    print(json.dumps({
+        "elapsed": elapsed,
+        "errors": errors,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "per_node": [stub.request_count for stub in stubs],
+        "retries": stats["retries"] if stats else 0,
+        "hedged": stats["hedged"] if stats else 0,
+        "hedge_wins": stats["hedge_wins"] if stats else 0,
+        "ejected_then_restored": restored,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--parallel", type=int, default=1, help="slot paralel per stub Ollama")
+    parser.add_argument("--generate-ms", type=float, default=100.0)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-ms", type=float, default=5.0)
+    parser.add_argument("--slow-embed-ms", type=float, default=250.0)
+    parser.add_argument("--hedge-ms", type=float, default=50.0)
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    parser.add_argument("--child-nodes", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-hedge-ms", type=float, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        run_child(args)
+        return
+
+    print(f"{'scenario':>9} {'nodes':>5} {'hedge ms':>8} {'total s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6} "
+          f"{'retries':>7} {'hedged':>6} {'wins':>5}  per-node requests")
+    for scenario, nodes, hedge_ms in SCENARIOS:
+        nodes = nodes or args.nodes
+        hedge_ms = args.hedge_ms if hedge_ms is None else hedge_ms
+        output = subprocess.run([sys.executable, "-m", "scripts.bench_ollama_balancer", *sys.argv[1:], "--scenario", scenario,
+                                 "--child-nodes", str(nodes), "--child-hedge-ms", str(hedge_ms)],
+                                capture_output=True, text=True, check=True).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        extra = f" (node 1 restored by health check: {r['ejected_then_restored']})" if scenario == "failover" else ""
+        print(f"{scenario:>9} {nodes:>5} {hedge_ms:>8.0f} {r['elapsed']:>8.2f} {r['p50_ms']:>8.0f} {r['p99_ms']:>8.0f} "
+              f"{r['errors']:>6} {r['retries']:>7} {r['hedged']:>6} {r['hedge_wins']:>5}  {r['per_node']}{extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark overhead klien Ollama: runnable LangChain vs klien HTTP tipis (OLLAMA_CLIENT=direct).
+
+Dua hal diukur per mode, masing-masing di proses terpisah karena klien dipilih saat service di-import:
+
+  import   waktu `import app.main` di proses Python baru (median dari `--import-runs` kali).
+  per-call latensi rata-rata / p50 satu panggilan berurutan ke stub Ollama yang menjawab seketika
+           (satu token, tanpa jeda), sehingga yang terukur hampir seluruhnya overhead sisi klien:
+           generate biasa (LLMService.generate_response), streaming (stream_response), dan embed.
+
+    python -m scripts.bench_ollama_client --calls 500 --import-runs 5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from scripts.stub_ollama import StubOllamaServer
+
+MODES = ("langchain", "direct")
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+
+
+def measure_import(env, runs: int) -> float:
+    durations = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env=env,
+                                capture_output=True, text=True, check=True).stdout
+        durations.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(durations)
+
+
+def run_child(args):
+    server = StubOllamaServer(generate_base_ms=0, tokens=args.tokens, token_ms=0, parallel=1).start()
+    os.environ["OLLAMA_BASE_URL"] = server.base_url
+    os.environ.setdefault("LLM_MODEL_NAME", "stub-llm")
+
+    from app.services.llm_service import llm_service
+    from app.services.embedding_service import embedding_service
+
+    logging.disable(logging.INFO)
+
+    async def generate(i):
+        await llm_service.generate_response(question=f"pertanyaan {i}", context="konteks singkat")
+
+    async def stream(i):
+        async for _ in llm_service.stream_response(question=f"pertanyaan {i}", context="konteks singkat"):
+            pass
+
+    async def embed(i):
+        await embedding_service.embed_documents([f"teks {i}"])
+
+    async def timed(call):
+        for i in range(args.warmup):
+            await call(-i - 1)
+        durations = []
+        for i in range(args.calls):
+            started = time.perf_counter()
+            await call(i)
+            durations.append(time.perf_counter() - started)
+        return {"mean_us": statistics.fmean(durations) * 1e6, "p50_us": statistics.median(durations) * 1e6}
+
+    async def run_all():
+        return {name: await timed(call) for name, call in (("generate", generate), ("stream", stream), ("embed", embed))}
+
+    result = asyncio.run(run_all())
+    server.stop()
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=1, help="token per jawaban stub")
+    parser.add_argument("--import-runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    print(f"{'mode':>10} {'import s':>9} {'generate us':>12} {'p50':>8} {'stream us':>10} {'p50':>8} {'embed us':>9} {'p50':>8}")
+    for mode in MODES:
+        env = {**os.environ, "OLLAMA_CLIENT": mode}
+        import_seconds = measure_import(env, args.import_runs)
+        output = subprocess.run([sys.executable, "-m", "scripts.bench_ollama_client", "--child", *sys.argv[1:]],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:>10} {import_seconds:>9.2f} "
+              f"{result['generate']['mean_us']:>12.0f} {result['generate']['p50_us']:>8.0f} "
+              f"{result['stream']['mean_us']:>10.0f} {result['stream']['p50_us']:>8.0f} "
+              f"{result['embed']['mean_us']:>9.0f} {result['embed']['p50_us']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark pemakaian ulang koneksi HTTP ke Ollama di bawah beban chat bersamaan.
+
+Beban dikirim dalam beberapa gelombang (`--waves`) berisi `--concurrency` request /chat bersamaan,
+dipisah jeda idle `--idle-seconds`, seperti trafik chat yang datang bergelombang. Stub Ollama
+menghitung koneksi TCP yang dibuka (`connection_count`) dan request yang diterima.
+
+  per-service  OLLAMA_HTTP_SHARED_POOL=false: klien bawaan LangChain, satu pool per service dengan
+               batas httpx bawaan (keep-alive 5 detik, tanpa batas koneksi bersama).
+  shared       satu transport httpx untuk embedding, LLM, dan AIDOC (OLLAMA_HTTP_* di .env).
+
+Setiap mode dijalankan di proses terpisah karena klien Ollama dibuat saat service di-import.
+
+    python -m scripts.seed_catalog --reset
+    python -m scripts.bench_ollama_pool --waves 3 --concurrency 32 --idle-seconds 6
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from scripts.stub_ollama import StubOllamaServer
+
+MODES = {"per-service": "false", "shared": "true"}
+
+
+def run_child(args):
+    server = StubOllamaServer(generate_base_ms=args.generate_ms, tokens=args.tokens, token_ms=args.token_ms,
+                              parallel=args.parallel).start()
+    os.environ["OLLAMA_BASE_URL"] = server.base_url
+    os.environ.setdefault("LLM_MODEL_NAME", "stub-llm")
+    # Setiap query unik dan cache dimatikan agar setiap request benar-benar memanggil Ollama
+    for flag in ("EMBEDDING_CACHE_ENABLED", "RETRIEVAL_CACHE_ENABLED", "ANSWER_CACHE_ENABLED"):
+        os.environ[flag] = "false"
+
+    import httpx
+    from app.main import app
+
+    logging.disable(logging.INFO)
+    counter = itertools.count()
+    latencies = []
+
+    async def chat(client):
+        started = time.perf_counter()
+        response = await client.post("/chat/", json={"query": f"keluhan {next(counter)}: sesak napas dan nyeri dada"})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+    async def run_all():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300) as client:
+            for wave in range(args.waves):
+                if wave:
+                    await asyncio.sleep(args.idle_seconds)
+                await asyncio.gather(*(chat(client) for _ in range(args.concurrency)))
+
+    asyncio.run(run_all())
+    server.stop()
+    latencies.sort()
+    print(json.dumps({
+        "requests": server.request_count,
+        "connections": server.connection_count,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--waves", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--idle-seconds", type=float, default=6.0)
+    parser.add_argument("--parallel", type=int, default=4, help="slot paralel stub Ollama")
+    parser.add_argument("--generate-ms", type=float, default=100.0)
+    parser.add_argument("--tokens", type=int, default=10)
+    parser.add_argument("--token-ms", type=float, default=2.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    print(f"{'mode':>12} {'ollama reqs':>12} {'connections':>12} {'reuse':>7} {'chat p50 ms':>12} {'chat p99 ms':>12}")
+    for mode, shared in MODES.items():
+        env = {**os.environ, "OLLAMA_HTTP_SHARED_POOL": shared}
+        output = subprocess.run([sys.executable, "-m", "scripts.bench_ollama_pool", "--child", *sys.argv[1:]],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        reuse = 1 - result["connections"] / result["requests"]
+        print(f"{mode:>12} {result['requests']:>12} {result['connections']:>12} {reuse:>7.1%} "
+              f"{result['p50_ms']:>12.1f} {result['p99_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Bandingkan latensi retrieval katalog: tiga query berurutan (cara lama), satu statement UNION ALL
+(RetrievalService.retrieve_documents lewat asyncpg), dan backend index NumPy di memori.
+
+    python -m scripts.seed_catalog --reset
+    python -m scripts.bench_retrieval --iterations 200
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.core.config import settings
+from app.core.database import SessionLocal, AsyncSessionLocal, async_engine
+from app.models.poli import Poli
+from app.models.disease import Disease
+from app.models.doctor import Doctor
+import app.models.user, app.models.medical_image, app.models.diagnosis, app.models.diagnosis_doctor
+from app.schemas.chat import ContextDocument
+from app.services.retrieval_service import retrieval_service, RetrievalService
+from app.services.vector_index import InMemoryVectorIndex
+from sqlalchemy import text
+
+
+def retrieve_sequential(db, query_embedding, top_k=settings.SIMILARITY_TOP_K):
+    """Implementasi lama: satu query ORDER BY l2_distance per tabel."""
+    contexts = []
+    for poli in (db.query(Poli.id, Poli.name, Poli.description, Poli.embedding.l2_distance(query_embedding).label("distance"))
+                 .filter(Poli.embedding.isnot(None))
+                 .order_by(Poli.embedding.l2_distance(query_embedding)).limit(1).all()):
+        contexts.append(ContextDocument(source="poli", content=f"Nama Poli: {poli.name}\nDeskripsi: {poli.description}",
+                                        metadata={"id": poli.id, "name": poli.name, "distance": float(poli.distance)}))
+    for disease in (db.query(Disease.id, Disease.name, Disease.description, Disease.symptoms, Disease.treatment,
+                             Disease.embedding.l2_distance(query_embedding).label("distance"))
+                    .filter(Disease.embedding.isnot(None))
+                    .order_by(Disease.embedding.l2_distance(query_embedding)).limit(1).all()):
+        contexts.append(ContextDocument(source="disease",
+                                        content=f"Penyakit: {disease.name}\nDeskripsi: {disease.description}\nGejala: {disease.symptoms}\nPengobatan: {disease.treatment}",
+                                        metadata={"id": disease.id, "name": disease.name, "distance": float(disease.distance)}))
+    for doctor in (db.query(Doctor.id, Doctor.name, Doctor.speciality, Doctor.profile, Doctor.location, Doctor.practice_schedule,
+                            Doctor.embedding.l2_distance(query_embedding).label("distance"))
+                   .filter(Doctor.embedding.isnot(None))
+                   .order_by(Doctor.embedding.l2_distance(query_embedding)).limit(top_k).all()):
+        contexts.append(ContextDocument(source="doctor",
+                                        content=f"Dokter: {doctor.name}\nSpesialis: {doctor.speciality}\nProfil: {doctor.profile}\nLokasi: {doctor.location}\nJam Kerja: {doctor.practice_schedule}",
+                                        metadata={"id": doctor.id, "name": doctor.name, "distance": float(doctor.distance)}))
+    return contexts
+
+
+def summarize(name, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:>12}: p50 {statistics.median(latencies) * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    queries = [[rng.uniform(-1, 1) for _ in range(settings.EMBEDDING_DIM)] for _ in range(args.iterations)]
+    # Query berulang saat verifikasi; cache hasil retrieval dimatikan agar yang diukur adalah query-nya
+    retrieval_service.cache = None
+
+    async def run(db, async_db):
+        # Pemanasan + verifikasi hasil identik
+        for query in queries[:5]:
+            old = retrieve_sequential(db, query)
+            new = await retrieval_service.retrieve_documents(async_db, query)
+            assert [(d.source, d.metadata["id"], d.content) for d in old] == [(d.source, d.metadata["id"], d.content) for d in new]
+
+        memory_service = RetrievalService()
+        memory_service.cache = None
+        memory_service.memory_index = InMemoryVectorIndex(distance=settings.VECTOR_DISTANCE)
+        memory_service.load_memory_index(db)
+
+        # Index memori menghitung jarak eksak, jadi dibandingkan dengan sequential scan tanpa index ANN
+        await async_db.execute(text("SET enable_indexscan = off"))
+        for query in queries[:5]:
+            exact = await retrieval_service.retrieve_documents(async_db, query)
+            in_memory = await memory_service.retrieve_documents(async_db, query)
+            assert [(d.source, d.metadata["id"], d.content) for d in exact] == [(d.source, d.metadata["id"], d.content) for d in in_memory]
+        await async_db.rollback()
+        await async_db.execute(text("SET enable_indexscan = on"))
+
+        sequential, single, memory = [], [], []
+        for query in queries:
+            started = time.perf_counter()
+            retrieve_sequential(db, query)
+            sequential.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await retrieval_service.retrieve_documents(async_db, query)
+            single.append(time.perf_counter() - started)
+            await async_db.rollback()
+
+            started = time.perf_counter()
+            await memory_service.retrieve_documents(async_db, query)
+            memory.append(time.perf_counter() - started)
+
+        summarize("sequential", sequential)
+        summarize("single stmt", single)
+        summarize("in-memory", memory)
+
+    async def run_all():
+        db = SessionLocal()
+        try:
+            async with AsyncSessionLocal() as async_db:
+                await run(db, async_db)
+        finally:
+            db.close()
+            await async_engine.dispose()
+
+    asyncio.run(run_all())
+
+if __name__ == "__main__":
+    main()
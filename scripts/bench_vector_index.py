@@ -0,0 +1,97 @@
+"""
+Recall vs latensi index ANN (HNSW/IVFFlat) pada tabel doctors.
+
+    python -m scripts.seed_catalog --reset --doctor 100000
+    python -m scripts.bench_vector_index --index hnsw ivfflat --queries 200
+
+Ground truth dihitung dengan sequential scan (index dinonaktifkan). Query dibuat dari embedding
+dokter acak ditambah noise. Di akhir, index dikembalikan sesuai konfigurasi Settings.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.schema import distance_operator, sync_vector_indexes
+from app.services.retrieval_service import to_vector_literal
+
+SWEEPS = {
+    "hnsw": ("hnsw.ef_search", [10, 20, 40, 80, 160]),
+    "ivfflat": ("ivfflat.probes", [1, 5, 10, 20, 40]),
+}
+
+
+def top_k_ids(conn, query, k, op):
+    return [row[0] for row in conn.execute(
+        text(f"SELECT id FROM doctors WHERE embedding IS NOT NULL ORDER BY embedding {op} CAST(:q AS vector) LIMIT :k"),
+        {"q": query, "k": k}
+    )]
+
+
+def sample_queries(conn, n, noise, rng):
+    rows = conn.execute(text("SELECT embedding::text FROM doctors TABLESAMPLE SYSTEM (5) LIMIT :n"), {"n": n}).scalars().all()
+    queries = []
+    for row in rows:
+        vector = [float(value) for value in row.strip("[]").split(",")]
+        queries.append(to_vector_literal([value + rng.uniform(-noise, noise) for value in vector]))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", nargs="+", choices=list(SWEEPS), default=["hnsw", "ivfflat"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=settings.SIMILARITY_TOP_K)
+    parser.add_argument("--noise", type=float, default=0.3)
+    parser.add_argument("--maintenance-work-mem", default="2GB")
+    args = parser.parse_args()
+
+    op = distance_operator()
+    rng = random.Random(7)
+    with engine.connect() as conn:
+        total = conn.execute(text("SELECT count(*) FROM doctors")).scalar()
+        queries = sample_queries(conn, args.queries, args.noise, rng)
+
+        conn.execute(text("SET enable_indexscan = off"))
+        exact, latencies = [], []
+        for query in queries:
+            started = time.perf_counter()
+            exact.append(set(top_k_ids(conn, query, args.k, op)))
+            latencies.append(time.perf_counter() - started)
+        conn.execute(text("SET enable_indexscan = on"))
+        conn.commit()
+        print(f"doctors: {total}, queries: {len(queries)}, k: {args.k}, distance: {settings.VECTOR_DISTANCE}")
+        print(f"{'index':>8} {'param':>20} {'recall':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        print(f"{'exact':>8} {'seq scan':>20} {1.0:>8.3f} {statistics.median(latencies) * 1000:>8.2f} "
+              f"{sorted(latencies)[int(len(latencies) * 0.99) - 1] * 1000:>8.2f}")
+
+        for index_type in args.index:
+            conn.execute(text(f"SET maintenance_work_mem = '{args.maintenance_work_mem}'"))
+            started = time.perf_counter()
+            sync_vector_indexes(conn, index_type=index_type)
+            conn.commit()
+            print(f"{index_type:>8} built in {time.perf_counter() - started:.1f}s")
+
+            param, values = SWEEPS[index_type]
+            for value in values:
+                conn.execute(text(f"SET {param} = {value}"))
+                hits, latencies = 0, []
+                for query, truth in zip(queries, exact):
+                    started = time.perf_counter()
+                    found = top_k_ids(conn, query, args.k, op)
+                    latencies.append(time.perf_counter() - started)
+                    hits += len(truth.intersection(found))
+                recall = hits / (len(queries) * args.k)
+                print(f"{index_type:>8} {param + '=' + str(value):>20} {recall:>8.3f} {statistics.median(latencies) * 1000:>8.2f} "
+                      f"{sorted(latencies)[int(len(latencies) * 0.99) - 1] * 1000:>8.2f}")
+
+        sync_vector_indexes(conn)
+        conn.commit()
+
+
+if __name__ == "__main__":
+    main()
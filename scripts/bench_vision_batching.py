@@ -0,0 +1,123 @@
+"""
+Benchmark micro-batching inference vision (VisionModelService) di CPU: tanpa batching vs dengan batching
+(VISION_BATCH_MAX_SIZE=`--max-batch`, VISION_BATCH_MAX_WAIT_MS=`--max-wait-ms`) pada beberapa tingkat konkurensi.
+
+Setiap tingkat konkurensi menjalankan `--requests` prediksi lewat `predict_disease_probabilities` (praproses
+gambar + inference + postproses) dengan sejumlah pemanggil bersamaan. Kolom `loop lag` adalah keterlambatan
+terbesar sebuah timer 5 ms di event loop selama benchmark: ukuran seberapa lama request lain (mis. stream /chat)
+ikut tertahan. Bila `--model` tidak diisi dan model asli
+(ONNX_MODEL_PATH) tidak ada, dipakai model sintetis dari scripts.synthetic_vision_model.
+
+    python -m scripts.bench_vision_batching --concurrency 1,4,8,16 --requests 160
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from scripts.synthetic_vision_model import write_model
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def make_images(count: int, size: int = 512):
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (size, size), dtype=np.uint8), mode="L").save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+async def run_level(service, images, concurrency: int, requests: int):
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def caller():
+        for i in remaining:
+            started = time.perf_counter()
+            result = await service.predict_disease_probabilities(images[i % len(images)])
+            if not result:
+                raise RuntimeError("prediction failed")
+            latencies.append(time.perf_counter() - started)
+
+    max_lag = 0.0
+    expected = time.perf_counter() + 0.005
+
+    async def ticker():
+        nonlocal max_lag, expected
+        while True:
+            expected = time.perf_counter() + 0.005
+            await asyncio.sleep(0.005)
+            max_lag = max(max_lag, time.perf_counter() - expected)
+
+    ticker_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    # Timer yang belum sempat berjalan sama sekali (loop tertahan sampai akhir) juga dihitung
+    max_lag = max(max_lag, time.perf_counter() - expected)
+    ticker_task.cancel()
+    return requests / elapsed, latencies, max_lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="path model ONNX (bawaan: ONNX_MODEL_PATH, atau model sintetis)")
+    parser.add_argument("--width", type=int, default=256, help="lebar model sintetis")
+    parser.add_argument("--depth", type=int, default=4, help="jumlah blok model sintetis")
+    parser.add_argument("--concurrency", default="1,2,4,8,16")
+    parser.add_argument("--requests", type=int, default=160)
+    parser.add_argument("--max-batch", type=int, default=settings.VISION_BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.VISION_BATCH_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    model_path = args.model or settings.ONNX_MODEL_PATH
+    if not args.model and not os.path.exists(model_path):
+        model_path = write_model(os.path.join(tempfile.gettempdir(), "detakmedis_synthetic_vision.onnx"),
+                                 args.width, args.depth)
+        print(f"using synthetic model {model_path} (width={args.width}, depth={args.depth})")
+
+    settings.VISION_BATCH_ENABLED = True
+    settings.VISION_BATCH_MAX_SIZE = args.max_batch
+    settings.VISION_BATCH_MAX_WAIT_MS = args.max_wait_ms
+    logging.disable(logging.ERROR)
+    from app.services.vision_model_service import VisionModelService
+    logging.disable(logging.NOTSET)
+
+    service = VisionModelService(model_path)
+    if service.session is None:
+        raise SystemExit(f"failed to load {model_path}")
+    if service.batcher is None:
+        raise SystemExit("model has a fixed batch dimension; micro-batching not possible")
+    batcher = service.batcher
+    images = make_images(16)
+    asyncio.run(run_level(service, images, 4, 8))  # pemanasan
+
+    print(f"CPU cores: {os.cpu_count()}, max batch {args.max_batch}, max wait {args.max_wait_ms:g} ms")
+    print(f"{'concurrency':>11} {'mode':>9} {'img/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'avg batch':>9} {'loop lag ms':>11}")
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        for mode in ("unbatched", "batched"):
+            service.batcher = batcher if mode == "batched" else None
+            batches_before, images_before = batcher.batches_run, batcher.items_run
+            throughput, latencies, max_lag = asyncio.run(run_level(service, images, concurrency, args.requests))
+            batches = batcher.batches_run - batches_before
+            avg_batch = (batcher.items_run - images_before) / batches if batches else 1.0
+            print(f"{concurrency:>11} {mode:>9} {throughput:>7.1f} {statistics.median(latencies) * 1000:>8.1f} "
+                  f"{percentile(latencies, 0.99) * 1000:>8.1f} {avg_batch:>9.2f} {max_lag * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
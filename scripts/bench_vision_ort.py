@@ -0,0 +1,128 @@
+"""
+Benchmark konfigurasi session ONNX Runtime model vision di host ini.
+
+  startup  waktu membuat session tanpa cache graph teroptimasi vs memuat file cache (VISION_ORT_CACHE_DIR),
+           masing-masing di proses Python baru.
+  sweep    untuk setiap jumlah thread intra-op (`--threads`, bawaan 1, 2, 4, ... sampai jumlah core) dan
+           execution mode: latensi p50 satu gambar dengan `session.run` biasa dan dengan IO binding, serta
+           throughput dengan `--callers` thread pemanggil bersamaan (seperti VISION_EXECUTOR_WORKERS).
+
+Bila `--model` tidak diisi dan model asli tidak ada, dipakai model sintetis dari scripts.synthetic_vision_model.
+
+    python -m scripts.bench_vision_ort --threads 1,2,4 --callers 2 --runs 50
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import onnxruntime
+
+from scripts.synthetic_vision_model import write_model
+
+LOAD_SNIPPET = """
+import json, sys
+from app.core.onnx_session import OnnxSessionConfig, create_session
+session, info = create_session(sys.argv[1], OnnxSessionConfig(cache_dir=sys.argv[2] or None))
+print(json.dumps(info))
+"""
+
+
+def measure_startup(model_path: str, runs: int):
+    cache_dir = tempfile.mkdtemp(prefix="detakmedis-ort-cache-")
+    results = {}
+    try:
+        for name, directory in (("no cache", ""), ("cache miss", cache_dir), ("cache hit", cache_dir)):
+            durations = []
+            for _ in range(runs if name != "cache miss" else 1):
+                output = subprocess.run([sys.executable, "-c", LOAD_SNIPPET, model_path, directory],
+                                        capture_output=True, text=True, check=True).stdout
+                durations.append(json.loads(output.strip().splitlines()[-1])["load_seconds"])
+            results[name] = statistics.median(durations)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def thread_counts(cores: int):
+    counts, n = [], 1
+    while n < cores:
+        counts.append(n)
+        n *= 2
+    return counts + [cores]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="path model ONNX (bawaan: ONNX_MODEL_PATH, atau model sintetis)")
+    parser.add_argument("--width", type=int, default=256, help="lebar model sintetis")
+    parser.add_argument("--depth", type=int, default=4, help="jumlah blok model sintetis")
+    parser.add_argument("--threads", help="daftar jumlah thread intra-op, mis. 1,2,4")
+    parser.add_argument("--modes", default="sequential,parallel")
+    parser.add_argument("--callers", type=int, default=2, help="thread pemanggil bersamaan untuk throughput")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--startup-runs", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    from app.core.config import settings
+    from app.core.onnx_session import OnnxSessionConfig
+    from app.services.vision_model_service import VisionModelService
+    from app.services.vision_preprocessing import MODEL_IMAGE_SIZE
+
+    model_path = args.model or settings.ONNX_MODEL_PATH
+    if not args.model and not os.path.exists(model_path):
+        model_path = write_model(os.path.join(tempfile.gettempdir(), "detakmedis_synthetic_vision.onnx"),
+                                 args.width, args.depth)
+        print(f"using synthetic model {model_path} (width={args.width}, depth={args.depth})")
+    cores = os.cpu_count() or 1
+    threads = [int(t) for t in args.threads.split(",")] if args.threads else thread_counts(cores)
+
+    startup = measure_startup(model_path, args.startup_runs)
+    print(f"\nstartup (session creation in a fresh process, median of {args.startup_runs})")
+    for name, seconds in startup.items():
+        print(f"  {name:>10}: {seconds * 1000:8.1f} ms")
+
+    image = np.random.default_rng(0).standard_normal((1, 3, MODEL_IMAGE_SIZE, MODEL_IMAGE_SIZE)).astype(np.float32)
+    print(f"\nthread sweep on {cores} CPU cores, {args.runs} runs, {args.callers} concurrent callers")
+    print(f"{'intra':>5} {'mode':>10} {'run p50 ms':>10} {'iobind p50 ms':>13} {'img/s':>7}")
+    for mode in args.modes.split(","):
+        for intra in threads:
+            config = OnnxSessionConfig(intra_op_threads=intra, execution_mode=mode, cache_dir=None)
+            service = VisionModelService(model_path, backend="local", session_config=config)
+            binding = service.io_binding
+
+            def infer(_=None):
+                return service._run_session(image, onnxruntime.RunOptions())
+
+            def p50():
+                for _ in range(3):
+                    infer()
+                durations = []
+                for _ in range(args.runs):
+                    started = time.perf_counter()
+                    infer()
+                    durations.append(time.perf_counter() - started)
+                return statistics.median(durations) * 1000
+
+            service.io_binding = None
+            run_p50 = p50()
+            service.io_binding = binding
+            binding_p50 = p50()
+            with ThreadPoolExecutor(args.callers) as pool:
+                started = time.perf_counter()
+                list(pool.map(infer, range(args.runs)))
+                throughput = args.runs / (time.perf_counter() - started)
+            print(f"{intra:>5} {mode:>10} {run_p50:>10.2f} {binding_p50:>13.2f} {throughput:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Benchmark backend inference vision: di proses API (VISION_BACKEND=local, thread pool) vs pool proses worker
+(VISION_BACKEND=workers, `python -m app.services.vision_workers`).
+
+Setiap mode dijalankan di proses "API" terpisah yang mengirim `--requests` prediksi dengan `--uploads` pemanggil
+bersamaan, sambil menjalankan request ringan tiap 10 ms (encode JSON kecil, seperti handler biasa). Dilaporkan:
+throughput dan p99 upload, p50/p99 keterlambatan request ringan (dampak ke request lain di proses API), RSS proses
+API (memori yang dihemat per worker uvicorn) dan total RSS worker inference. Dengan `--kill-worker`, satu worker di-kill
+di tengah benchmark mode workers untuk memeriksa restart: request yang sedang diproses worker itu gagal (tidak dikirim
+ulang) dan request berikutnya dilayani worker pengganti. Bila `--model` tidak diisi dan model
+asli tidak ada, dipakai model sintetis dari scripts.synthetic_vision_model.
+
+    python -m scripts.bench_vision_workers --uploads 8 --requests 160 --processes 2
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from scripts.synthetic_vision_model import write_model
+
+MODES = ("local", "workers")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def rss_mb(pid="self") -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def child_pids(parent: int):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == parent:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return pids
+
+
+def make_images(count: int, size: int = 1024):
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (size, size), dtype=np.uint8), mode="L").save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+def run_child(args):
+    logging.disable(logging.WARNING)
+    from app.services.vision_model_service import vision_model_service as service
+
+    api_rss = rss_mb()
+    images = make_images(16)
+    upload_latencies, light_latencies = [], []
+    errors = 0
+    killed = None
+
+    async def uploads():
+        nonlocal errors, killed
+        remaining = iter(range(args.requests))
+
+        async def caller():
+            nonlocal errors, killed
+            for i in remaining:
+                if args.kill_worker and args.server_pid and i == args.requests // 2 and killed is None:
+                    killed = child_pids(args.server_pid)[0]
+                    os.kill(killed, signal.SIGKILL)
+                started = time.perf_counter()
+                if await service.predict_disease_probabilities(images[i % len(images)]):
+                    upload_latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(caller() for _ in range(args.uploads)))
+        return time.perf_counter() - started
+
+    async def light_requests(stop: asyncio.Event):
+        payload = {"answer": "x" * 2000, "sources": list(range(50))}
+        while not stop.is_set():
+            due = time.perf_counter() + 0.01
+            await asyncio.sleep(0.01)
+            json.dumps(payload)
+            light_latencies.append(time.perf_counter() - due)
+
+    async def run_all():
+        await service.predict_disease_probabilities(images[0])  # pemanasan
+        stop = asyncio.Event()
+        light = asyncio.create_task(light_requests(stop))
+        elapsed = await uploads()
+        stop.set()
+        await light
+        return elapsed
+
+    elapsed = asyncio.run(run_all())
+    workers = child_pids(args.server_pid) if args.server_pid else []
+    deadline = time.monotonic() + 10
+    while killed is not None and len(workers) < args.processes and time.monotonic() < deadline:
+        # Worker yang mati tak lama setelah start diganti dengan jeda (crash-loop backoff supervisor)
+        time.sleep(0.2)
+        workers = child_pids(args.server_pid)
+    client = service.worker_client
+    print(json.dumps({
+        "throughput": args.requests / elapsed,
+        "upload_p99_ms": percentile(upload_latencies, 0.99) * 1000,
+        "light_p50_ms": statistics.median(light_latencies) * 1000,
+        "light_p99_ms": percentile(light_latencies, 0.99) * 1000,
+        "api_rss_mb": api_rss,
+        "worker_rss_mb": sum(rss_mb(pid) for pid in workers),
+        "errors": errors,
+        "retries": client.retries if client is not None else 0,
+        "restarted": killed is not None and killed not in workers and len(workers) == args.processes,
+    }))
+
+
+def start_pool(env, socket_path: str) -> subprocess.Popen:
+    server = subprocess.Popen([sys.executable, "-m", "app.services.vision_workers"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(socket_path)
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit("vision worker pool did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="path model ONNX (bawaan: ONNX_MODEL_PATH, atau model sintetis)")
+    parser.add_argument("--width", type=int, default=256, help="lebar model sintetis")
+    parser.add_argument("--depth", type=int, default=4, help="jumlah blok model sintetis")
+    parser.add_argument("--uploads", type=int, default=8, help="upload bersamaan")
+    parser.add_argument("--requests", type=int, default=160)
+    parser.add_argument("--processes", type=int, default=2, help="VISION_WORKER_PROCESSES / VISION_EXECUTOR_WORKERS")
+    parser.add_argument("--kill-worker", action="store_true", help="kill satu worker di tengah benchmark")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--server-pid", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    from app.core.config import settings
+    model_path = args.model or settings.ONNX_MODEL_PATH
+    if not args.model and not os.path.exists(model_path):
+        model_path = write_model(os.path.join(tempfile.gettempdir(), "detakmedis_synthetic_vision.onnx"),
+                                 args.width, args.depth)
+        print(f"using synthetic model {model_path} (width={args.width}, depth={args.depth})")
+    socket_path = os.path.join(tempfile.gettempdir(), f"detakmedis-vision-bench-{os.getpid()}.sock")
+
+    print(f"CPU cores: {os.cpu_count()}, {args.uploads} concurrent uploads, {args.processes} workers")
+    print(f"{'mode':>8} {'img/s':>7} {'upload p99':>10} {'light p50':>9} {'light p99':>9} {'API RSS MB':>10} "
+          f"{'worker RSS MB':>13} {'errors':>6} {'retries':>7}")
+    for mode in MODES:
+        env = {**os.environ, "ONNX_MODEL_PATH": model_path, "VISION_BACKEND": mode, "VISION_BATCH_ENABLED": "false",
+               "VISION_EXECUTOR_WORKERS": str(args.processes), "VISION_EXECUTOR_MAX_QUEUE": "0",
+               "VISION_WORKER_SOCKET": socket_path, "VISION_WORKER_PROCESSES": str(args.processes)}
+        server = start_pool(env, socket_path) if mode == "workers" else None
+        try:
+            command = [sys.executable, "-m", "scripts.bench_vision_workers", *sys.argv[1:], "--child", mode]
+            if server is not None:
+                command += ["--server-pid", str(server.pid)]
+            output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+        r = json.loads(output.strip().splitlines()[-1])
+        extra = f"  (killed worker replaced: {r['restarted']})" if mode == "workers" and args.kill_worker else ""
+        print(f"{mode:>8} {r['throughput']:>7.1f} {r['upload_p99_ms']:>10.1f} {r['light_p50_ms']:>9.2f} "
+              f"{r['light_p99_ms']:>9.2f} {r['api_rss_mb']:>10.0f} {r['worker_rss_mb']:>13.0f} {r['errors']:>6} "
+              f"{r['retries']:>7}{extra}")
+
+
+if __name__ == "__main__":
+    main()
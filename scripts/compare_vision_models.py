@@ -0,0 +1,159 @@
+"""
+Membandingkan model vision kandidat (mis. varian INT8 dari scripts.quantize_vision_model) dengan model referensi
+FP32 pada folder gambar lokal, sebelum mengaktifkan VISION_MODEL_VARIANT=int8.
+
+  akurasi  kesepakatan label top-1 dan drift probabilitas per kelas (poin persen, seperti output API):
+           rata-rata |selisih|, selisih maksimum dan rata-rata selisih bertanda (bias) per penyakit.
+  latensi  p50/p99 inference satu gambar (`session.run` + softmax, tanpa praproses) dengan
+           `--threads` thread intra-op.
+  memori   ukuran file model, waktu muat, kenaikan RSS setelah model dimuat dan dipakai, serta RSS puncak proses.
+
+Setiap model dijalankan di proses Python terpisah agar angka memorinya tidak saling tercampur. Gambar
+diproses persis seperti di VisionModelService.
+
+    python -m scripts.compare_vision_models --images ./sample_xrays
+    python -m scripts.compare_vision_models --images ./sample_xrays --candidate ./scripts/vit_adapter_model.int8.onnx --threads 1
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from scripts.quantize_vision_model import list_images
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def memory_mb(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_child(args):
+    import logging
+    import onnxruntime
+    from app.core.onnx_session import OnnxSessionConfig
+    from app.services.vision_model_service import VisionModelService
+    from app.services.vision_preprocessing import preprocess_image
+
+    logging.disable(logging.WARNING)
+    paths, tensors = [], []
+    for path in list_images(args.images, args.limit):
+        with open(path, "rb") as f:
+            tensor = preprocess_image(f.read())
+        if tensor is not None:
+            paths.append(os.path.relpath(path, args.images))
+            tensors.append(tensor)
+    rss_before = memory_mb("VmRSS")
+
+    config = OnnxSessionConfig(intra_op_threads=args.threads, cache_dir=None)
+    service = VisionModelService(args.child, backend="local", session_config=config)
+    if service.session is None:
+        raise SystemExit(f"failed to load {args.child}")
+    run_options = onnxruntime.RunOptions()
+    for tensor in tensors[:3]:  # pemanasan
+        service._run_session(tensor, run_options)
+
+    probabilities, latencies = [], []
+    for tensor in tensors:
+        started = time.perf_counter()
+        probabilities.append(service._run_session(tensor, run_options)[0])
+        latencies.append(time.perf_counter() - started)
+
+    np.save(args.output, np.stack(probabilities))
+    print(json.dumps({
+        "paths": paths,
+        "load_ms": service.load_info["load_seconds"] * 1000,
+        "p50_ms": float(np.median(latencies)) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "rss_delta_mb": memory_mb("VmRSS") - rss_before,
+        "peak_rss_mb": memory_mb("VmHWM"),
+    }))
+
+
+def measure(model_path: str, args, output: str) -> dict:
+    command = [sys.executable, "-m", "scripts.compare_vision_models", "--images", args.images,
+               "--threads", str(args.threads), "--child", model_path, "--output", output]
+    if args.limit:
+        command += ["--limit", str(args.limit)]
+    stdout = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    result = json.loads(stdout.strip().splitlines()[-1])
+    result["size_mb"] = os.path.getsize(model_path) / 1e6
+    result["probabilities"] = np.load(output) * 100
+    return result
+
+
+def main():
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="folder gambar X-ray (rekursif)")
+    parser.add_argument("--reference", default=settings.ONNX_MODEL_PATH, help="model referensi (bawaan: ONNX_MODEL_PATH)")
+    parser.add_argument("--candidate", default=settings.ONNX_INT8_MODEL_PATH, help="model kandidat (bawaan: ONNX_INT8_MODEL_PATH)")
+    parser.add_argument("--limit", type=int, help="jumlah gambar maksimum")
+    parser.add_argument("--threads", type=int, default=settings.VISION_ORT_INTRA_OP_THREADS,
+                        help="thread intra-op (bawaan: VISION_ORT_INTRA_OP_THREADS)")
+    parser.add_argument("--disagreements", type=int, default=5, help="jumlah contoh label top-1 berbeda yang ditampilkan")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    from app.services.vision_preprocessing import DISEASE_NAMES_FROM_MODEL_OUTPUT
+
+    paths = list_images(args.images, args.limit)
+    if not paths:
+        raise SystemExit(f"No images found in {args.images}")
+    with tempfile.TemporaryDirectory() as workdir:
+        reference = measure(args.reference, args, os.path.join(workdir, "reference.npy"))
+        candidate = measure(args.candidate, args, os.path.join(workdir, "candidate.npy"))
+
+    ref_probs, cand_probs = reference["probabilities"], candidate["probabilities"]
+    if ref_probs.shape != cand_probs.shape:
+        raise SystemExit(f"Output shape mismatch: {ref_probs.shape} vs {cand_probs.shape}")
+    count = len(ref_probs)
+    print(f"{count} images from {args.images} ({len(paths) - count} unreadable), intra-op threads: {args.threads or 'default'}\n")
+
+    print(f"{'model':>9} {'file MB':>8} {'load ms':>8} {'RSS +MB':>8} {'peak RSS MB':>11} {'p50 ms':>7} {'p99 ms':>7}")
+    for name, r in (("reference", reference), ("candidate", candidate)):
+        print(f"{name:>9} {r['size_mb']:>8.1f} {r['load_ms']:>8.0f} {r['rss_delta_mb']:>8.0f} {r['peak_rss_mb']:>11.0f} "
+              f"{r['p50_ms']:>7.2f} {r['p99_ms']:>7.2f}")
+    print(f"{'speedup':>9} {'':>8} {'':>8} {'':>8} {'':>11} {reference['p50_ms'] / candidate['p50_ms']:>6.2f}x "
+          f"{reference['p99_ms'] / candidate['p99_ms']:>6.2f}x")
+
+    ref_top1, cand_top1 = ref_probs.argmax(axis=1), cand_probs.argmax(axis=1)
+    agree = int((ref_top1 == cand_top1).sum())
+    print(f"\ntop-1 agreement: {agree}/{count} ({agree / count * 100:.1f}%)")
+
+    diff = cand_probs - ref_probs
+    print("\nprobability drift, percentage points (candidate - reference)")
+    print(f"{'class':>18} {'mean |d|':>9} {'max |d|':>8} {'mean d':>8}")
+    for i, name in enumerate(DISEASE_NAMES_FROM_MODEL_OUTPUT[:diff.shape[1]]):
+        column = diff[:, i]
+        print(f"{name:>18} {np.abs(column).mean():>9.3f} {np.abs(column).max():>8.3f} {column.mean():>+8.3f}")
+    print(f"{'all':>18} {np.abs(diff).mean():>9.3f} {np.abs(diff).max():>8.3f} {diff.mean():>+8.3f}")
+
+    disagreements = np.flatnonzero(ref_top1 != cand_top1)[:args.disagreements]
+    if len(disagreements):
+        print("\ntop-1 disagreements (reference -> candidate)")
+    for i in disagreements:
+        print(f"  {reference['paths'][i]}: {DISEASE_NAMES_FROM_MODEL_OUTPUT[ref_top1[i]]} {ref_probs[i, ref_top1[i]]:.2f}% -> "
+              f"{DISEASE_NAMES_FROM_MODEL_OUTPUT[cand_top1[i]]} {cand_probs[i, cand_top1[i]]:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
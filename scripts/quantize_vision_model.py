@@ -0,0 +1,124 @@
+"""
+Membuat varian INT8 model vision (dipakai bila VISION_MODEL_VARIANT=int8) dengan ONNX Runtime quantization.
+
+  dynamic  bobot operator `--op-types` (bawaan MatMul dan Gemm, hampir seluruh komputasi ViT) disimpan INT8,
+           aktivasi dikuantisasi saat inference. Tidak perlu data kalibrasi.
+  static   bobot dan aktivasi INT8 (format QDQ, termasuk Conv patch embedding); rentang aktivasi dikalibrasi
+           dari gambar di `--calibration-dir` yang diproses persis seperti di VisionModelService.
+
+Model dipraproses lebih dulu (shape inference + optimasi) sesuai anjuran ONNX Runtime. Membutuhkan paket `onnx`
+(`pip install onnx`), yang tidak termasuk requirements aplikasi. Bandingkan hasilnya dengan
+`python -m scripts.compare_vision_models --images <folder>` sebelum mengaktifkan varian INT8.
+
+    python -m scripts.quantize_vision_model --mode dynamic
+    python -m scripts.quantize_vision_model --mode static --calibration-dir ./calibration_xrays --calibration-size 200
+"""
+import argparse
+import logging
+import os
+import tempfile
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vision_preprocessing import preprocess_image
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+logger = logging.getLogger(__name__)
+
+
+def list_images(folder: str, limit: Optional[int] = None) -> List[str]:
+    """Semua file gambar di `folder` (rekursif, urut nama), paling banyak `limit`."""
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(folder)
+        for name in names
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return paths[:limit] if limit else paths
+
+
+def preprocessed_tensors(paths: List[str]) -> Iterator[np.ndarray]:
+    """Tensor `[1, 3, 224, 224]` per gambar dengan praproses produksi; gambar yang gagal dibaca dilewati."""
+    for path in paths:
+        with open(path, "rb") as f:
+            tensor = preprocess_image(f.read())
+        if tensor is not None:
+            yield tensor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.ONNX_MODEL_PATH, help="model FP32 (bawaan: ONNX_MODEL_PATH)")
+    parser.add_argument("--output", default=settings.ONNX_INT8_MODEL_PATH, help="model INT8 (bawaan: ONNX_INT8_MODEL_PATH)")
+    parser.add_argument("--mode", choices=("dynamic", "static"), default="dynamic")
+    parser.add_argument("--op-types", default="MatMul,Gemm", help="operator yang dikuantisasi pada mode dynamic")
+    parser.add_argument("--per-channel", action="store_true", help="skala kuantisasi bobot per channel")
+    parser.add_argument("--calibration-dir", help="folder gambar kalibrasi (wajib untuk mode static)")
+    parser.add_argument("--calibration-size", type=int, default=100)
+    parser.add_argument("--calibration-method", choices=("minmax", "entropy", "percentile"), default="minmax")
+    parser.add_argument("--skip-preprocess", action="store_true", help="lewati shape inference + optimasi sebelum kuantisasi")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    try:
+        from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+                                              quantize_dynamic, quantize_static)
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+    except ImportError as e:
+        raise SystemExit(f"ONNX Runtime quantization needs the `onnx` package (pip install onnx): {e}")
+
+    if args.mode == "static" and not args.calibration_dir:
+        parser.error("--calibration-dir is required for --mode static")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = args.model
+        if not args.skip_preprocess:
+            preprocessed = os.path.join(workdir, "preprocessed.onnx")
+            try:
+                try:
+                    quant_pre_process(args.model, preprocessed)
+                except ImportError:
+                    # Symbolic shape inference butuh sympy; shape model vision statis sehingga shape inference ONNX cukup
+                    quant_pre_process(args.model, preprocessed, skip_symbolic_shape=True)
+                source = preprocessed
+            except Exception as e:
+                logger.warning(f"Pre-processing failed ({e}); quantizing the original graph")
+
+        if args.mode == "dynamic":
+            quantize_dynamic(source, args.output, op_types_to_quantize=args.op_types.split(","),
+                             per_channel=args.per_channel, weight_type=QuantType.QInt8)
+        else:
+            import onnxruntime
+
+            paths = list_images(args.calibration_dir, args.calibration_size)
+            if not paths:
+                raise SystemExit(f"No images found in {args.calibration_dir}")
+            input_name = onnxruntime.InferenceSession(source, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+            class ImageCalibrationReader(CalibrationDataReader):
+                def __init__(self):
+                    self._tensors = preprocessed_tensors(paths)
+
+                def get_next(self):
+                    tensor = next(self._tensors, None)
+                    return None if tensor is None else {input_name: tensor}
+
+            logger.info(f"Calibrating on {len(paths)} images from {args.calibration_dir} ({args.calibration_method})")
+            quantize_static(
+                source, args.output, ImageCalibrationReader(),
+                quant_format=QuantFormat.QDQ, per_channel=args.per_channel,
+                activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                calibrate_method={"minmax": CalibrationMethod.MinMax, "entropy": CalibrationMethod.Entropy,
+                                  "percentile": CalibrationMethod.Percentile}[args.calibration_method]
+            )
+
+    print(f"{args.mode} INT8 model written to {args.output}: "
+          f"{os.path.getsize(args.model) / 1e6:.1f} MB -> {os.path.getsize(args.output) / 1e6:.1f} MB")
+    print("compare before enabling VISION_MODEL_VARIANT=int8: python -m scripts.compare_vision_models --images <folder>")
+
+
+if __name__ == "__main__":
+    main()
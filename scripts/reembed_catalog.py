@@ -0,0 +1,44 @@
+"""
+Re-embed tabel katalog (poli, disease, doctor) dalam batch dengan EMBEDDING_MODEL_NAME saat ini.
+
+    python -m scripts.reembed_catalog --tables poli disease doctor --batch-size 64
+    python -m scripts.reembed_catalog --only-missing
+
+Job bisa dihentikan kapan saja; menjalankannya lagi akan melanjutkan baris yang belum diperbarui.
+"""
+import argparse
+import asyncio
+import logging
+
+from app.core.database import SessionLocal, engine, Base
+import app.models.user, app.models.medical_image, app.models.diagnosis, app.models.diagnosis_doctor
+from app.core.schema import upgrade_schema
+from app.services.reembed_service import reembed_service, CATALOG_SOURCES
+
+
+async def run(tables, batch_size: int, only_missing: bool):
+    db = SessionLocal()
+    try:
+        for source in tables:
+            result = await reembed_service.reembed_table(db, source, batch_size=batch_size, only_missing=only_missing)
+            print(f"{result['source']:>8}: {result['processed']}/{result['total']} rows in "
+                  f"{result['seconds']}s ({result['rows_per_sec']} rows/sec)")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", nargs="+", choices=list(CATALOG_SOURCES), default=list(CATALOG_SOURCES))
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--only-missing", action="store_true", help="Hanya isi baris dengan embedding NULL.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    asyncio.run(run(args.tables, args.batch_size, args.only_missing))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Stub server Ollama lokal untuk benchmark dan pengujian tanpa GPU/model sungguhan.
+
+Mendukung /api/embed, /api/embeddings, /api/generate (streaming maupun tidak) dan /api/tags.
+Latensi disimulasikan: biaya tetap per request ditambah biaya per teks/token, dan jumlah
+request yang diproses bersamaan dibatasi `parallel` (seperti OLLAMA_NUM_PARALLEL).
+
+Jalankan mandiri:
+    python -m scripts.stub_ollama --port 11435
+"""
+import argparse
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    return [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+class _Server(ThreadingHTTPServer):
+    # Backlog listen bawaan (5) terlalu kecil untuk benchmark dengan puluhan koneksi bersamaan
+    request_queue_size = 256
+
+
+class StubOllamaServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, dim: int = 768,
+                 embed_base_ms: float = 15.0, embed_per_item_ms: float = 0.5,
+                 generate_base_ms: float = 50.0, token_ms: float = 10.0, tokens: int = 40,
+                 parallel: int = 1, fail: bool = False, think_tokens: int = 0,
+                 paragraph_tokens: int = 0):
+        self.dim = dim
+        self.embed_base_ms = embed_base_ms
+        self.embed_per_item_ms = embed_per_item_ms
+        self.generate_base_ms = generate_base_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        # >0: jawaban diawali blok <think> dan awalan "Jawaban Asisten DetakMedis:" seperti model reasoning
+        self.think_tokens = think_tokens
+        # >0: setiap `paragraph_tokens` kata, jawaban dipecah ke paragraf baru berformat markdown
+        self.paragraph_tokens = paragraph_tokens
+        self.fail = fail
+        self.slots = threading.Semaphore(max(1, parallel))
+        self.request_count = 0
+        self.connection_count = 0
+        self._count_lock = threading.Lock()
+        self.httpd = _Server((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubOllamaServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _count(self, attribute: str):
+        with self._count_lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                stub._count("connection_count")
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_json(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": []})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                stub._count("request_count")
+                payload = self._read_json()
+                if stub.fail:
+                    self._send_json({"error": "stub failure"}, status=500)
+                    return
+                if self.path in ("/api/embed", "/api/embeddings"):
+                    self._handle_embed(payload)
+                elif self.path == "/api/generate":
+                    self._handle_generate(payload)
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def _handle_embed(self, payload):
+                texts = payload.get("input", payload.get("prompt", ""))
+                if isinstance(texts, str):
+                    texts = [texts]
+                with stub.slots:
+                    time.sleep((stub.embed_base_ms + stub.embed_per_item_ms * len(texts)) / 1000.0)
+                embeddings = [fake_embedding(text, stub.dim) for text in texts]
+                if self.path == "/api/embeddings":
+                    self._send_json({"embedding": embeddings[0] if embeddings else []})
+                else:
+                    self._send_json({"model": payload.get("model"), "embeddings": embeddings})
+
+            def _handle_generate(self, payload):
+                words = [(" " if i else "") + f"kata{i}" for i in range(stub.tokens)]
+                if stub.paragraph_tokens:
+                    for i in range(stub.paragraph_tokens, stub.tokens, stub.paragraph_tokens):
+                        words[i] = f"\n\n**Bagian {i // stub.paragraph_tokens}**\n* kata{i}"
+                if stub.think_tokens:
+                    # Tag dipecah menjadi beberapa token, seperti tokenisasi model sungguhan
+                    words = (["<", "think", ">"] + [f" pikir{i}" for i in range(stub.think_tokens)] + ["</", "think", ">", "\n\n",
+                             "Jawaban", " Asisten", " DetakMedis", ":", " "] + words)
+                model = payload.get("model")
+                if not payload.get("stream", True):
+                    with stub.slots:
+                        time.sleep((stub.generate_base_ms + stub.token_ms * len(words)) / 1000.0)
+                    self._send_json({"model": model, "response": "".join(words), "done": True,
+                                     "prompt_eval_count": len(payload.get("prompt", "")) // 4,
+                                     "eval_count": len(words)})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def write_chunk(obj):
+                    data = (json.dumps(obj) + "\n").encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+
+                with stub.slots:
+                    time.sleep(stub.generate_base_ms / 1000.0)
+                    for word in words:
+                        time.sleep(stub.token_ms / 1000.0)
+                        write_chunk({"model": model, "response": word, "done": False})
+                    write_chunk({"model": model, "response": "", "done": True,
+                                 "prompt_eval_count": len(payload.get("prompt", "")) // 4,
+                                 "eval_count": len(words)})
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub server Ollama untuk benchmark lokal.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--parallel", type=int, default=1)
+    parser.add_argument("--embed-base-ms", type=float, default=15.0)
+    parser.add_argument("--embed-per-item-ms", type=float, default=0.5)
+    parser.add_argument("--token-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    server = StubOllamaServer(host=args.host, port=args.port, parallel=args.parallel,
+                              embed_base_ms=args.embed_base_ms, embed_per_item_ms=args.embed_per_item_ms,
+                              token_ms=args.token_ms)
+    print(f"Stub Ollama listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,140 @@
+"""
+Model ONNX sintetis berbentuk ViT kecil untuk benchmark inference vision tanpa model asli
+(scripts/vit_adapter_model.onnx tidak ikut di repo).
+
+Input `[batch, 3, 224, 224]` (batch dinamis), output logit `[batch, 14]`: patch embedding Conv 16x16,
+`--depth` blok MLP residual selebar `--width` atas 196 token, rata-rata token, lalu head linear. Bobot acak
+dengan seed tetap. File ditulis langsung sebagai protobuf ModelProto sehingga tidak memerlukan paket `onnx`.
+
+    python -m scripts.synthetic_vision_model /tmp/vision_bench.onnx --width 256 --depth 4
+"""
+import argparse
+import os
+from typing import List, Sequence
+import numpy as np
+
+NUM_CLASSES = 14
+IMAGE_SIZE = 224
+PATCH_SIZE = 16
+OPSET = 13
+
+# TensorProto.DataType dan AttributeProto.AttributeType
+FLOAT, INT64 = 1, 7
+ATTR_INT, ATTR_INTS = 2, 7
+
+
+def _varint(value: int) -> bytes:
+    value &= (1 << 64) - 1
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _int(field: int, value: int) -> bytes:
+    return _varint(field << 3) + _varint(value)
+
+
+def _bytes(field: int, payload: bytes) -> bytes:
+    return _varint(field << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _str(field: int, value: str) -> bytes:
+    return _bytes(field, value.encode())
+
+
+def _tensor(name: str, array: np.ndarray) -> bytes:
+    data_type = INT64 if array.dtype == np.int64 else FLOAT
+    dims = b"".join(_int(1, d) for d in array.shape)
+    return dims + _int(2, data_type) + _str(8, name) + _bytes(9, np.ascontiguousarray(array).tobytes())
+
+
+def _attr_int(name: str, value: int) -> bytes:
+    return _str(1, name) + _int(3, value) + _int(20, ATTR_INT)
+
+
+def _attr_ints(name: str, values: Sequence[int]) -> bytes:
+    return _str(1, name) + b"".join(_int(8, v) for v in values) + _int(20, ATTR_INTS)
+
+
+def _node(op_type: str, inputs: List[str], outputs: List[str], *attributes: bytes) -> bytes:
+    return (b"".join(_str(1, i) for i in inputs) + b"".join(_str(2, o) for o in outputs)
+            + _str(3, outputs[0]) + _str(4, op_type) + b"".join(_bytes(5, a) for a in attributes))
+
+
+def _value_info(name: str, dims: Sequence) -> bytes:
+    shape = b"".join(_bytes(1, _str(2, d) if isinstance(d, str) else _int(1, d)) for d in dims)
+    tensor_type = _int(1, FLOAT) + _bytes(2, shape)
+    return _str(1, name) + _bytes(2, _bytes(1, tensor_type))
+
+
+def build_model(width: int = 256, depth: int = 4, seed: int = 0) -> bytes:
+    """Serialisasi ModelProto model sintetis."""
+    rng = np.random.default_rng(seed)
+
+    def weight(*shape):
+        return (rng.standard_normal(shape) * 0.02).astype(np.float32)
+
+    initializers = {
+        "patch_w": weight(width, 3, PATCH_SIZE, PATCH_SIZE),
+        "patch_b": weight(width),
+        "token_shape": np.array([0, width, -1], dtype=np.int64),
+        "head_w": weight(width, NUM_CLASSES),
+        "head_b": weight(NUM_CLASSES),
+    }
+    nodes = [
+        _node("Conv", ["input", "patch_w", "patch_b"], ["patches"],
+              _attr_ints("kernel_shape", [PATCH_SIZE, PATCH_SIZE]), _attr_ints("strides", [PATCH_SIZE, PATCH_SIZE])),
+        _node("Reshape", ["patches", "token_shape"], ["tokens_cn"]),
+        _node("Transpose", ["tokens_cn"], ["h0"], _attr_ints("perm", [0, 2, 1])),
+    ]
+    for i in range(depth):
+        for name, shape in ((f"b{i}_w1", (width, 4 * width)), (f"b{i}_b1", (4 * width,)),
+                            (f"b{i}_w2", (4 * width, width)), (f"b{i}_b2", (width,))):
+            initializers[name] = weight(*shape)
+        nodes += [
+            _node("MatMul", [f"h{i}", f"b{i}_w1"], [f"b{i}_mm1"]),
+            _node("Add", [f"b{i}_mm1", f"b{i}_b1"], [f"b{i}_fc1"]),
+            _node("Relu", [f"b{i}_fc1"], [f"b{i}_act"]),
+            _node("MatMul", [f"b{i}_act", f"b{i}_w2"], [f"b{i}_mm2"]),
+            _node("Add", [f"b{i}_mm2", f"b{i}_b2"], [f"b{i}_fc2"]),
+            _node("Add", [f"h{i}", f"b{i}_fc2"], [f"h{i + 1}"]),
+        ]
+    nodes += [
+        _node("ReduceMean", [f"h{depth}"], ["pooled"], _attr_ints("axes", [1]), _attr_int("keepdims", 0)),
+        _node("MatMul", ["pooled", "head_w"], ["head_mm"]),
+        _node("Add", ["head_mm", "head_b"], ["logits"]),
+    ]
+
+    graph = (b"".join(_bytes(1, n) for n in nodes) + _str(2, "synthetic_vit")
+             + b"".join(_bytes(5, _tensor(name, array)) for name, array in initializers.items())
+             + _bytes(11, _value_info("input", ["batch", 3, IMAGE_SIZE, IMAGE_SIZE]))
+             + _bytes(12, _value_info("logits", ["batch", NUM_CLASSES])))
+    return _int(1, 8) + _str(2, "detakmedis-bench") + _bytes(7, graph) + _bytes(8, _str(1, "") + _int(2, OPSET))
+
+
+def write_model(path: str, width: int = 256, depth: int = 4, seed: int = 0) -> str:
+    with open(path, "wb") as f:
+        f.write(build_model(width, depth, seed))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--width", type=int, default=256)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_model(args.path, args.width, args.depth, args.seed)
+    size_mb = os.path.getsize(args.path) / 1e6
+    print(f"{args.path}: width={args.width} depth={args.depth} ({size_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from app.services.aidoc_service import aidoc_service
+from app.services.llm_service import llm_service
+from app.services.stream_sanitizer import ParagraphStreamCleaner, StreamSanitizer
+
+CHUNKINGS_PER_SAMPLE = 200
+
+# Contoh output model yang mewakili kasus-kasus yang dibersihkan oleh kedua pembersih batch
+SAMPLES = [
+    "Jawaban Asisten DetakMedis: Nyeri dada bisa disebabkan banyak hal.",
+    "<think>\nPasien mengeluh sesak napas, cek konteks dokumen.\n</think>\n\nJawaban Asisten DetakMedis:   Sesak napas perlu diperiksa.\n\nSilakan ke Poli Jantung.",
+    "<THINK>analisis</Think>   jawaban asisten detakmedis:\nHalo!  Ada yang bisa dibantu ?",
+    "Jawaban Dokter Virtual DetakMedis: Berdasarkan gejala Anda , kemungkinan **Kardiomegali**.\\n\\nSaran:\\n* Istirahat cukup\\n* Kurangi garam\\n*\\nMinum obat sesuai resep .",
+    "Kemungkinan diagnosis:\n\n* **Pneumonia** : infeksi paru.\n*   *Efusi pleura* ,cairan di rongga pleura.\n\n\n\nDisarankan foto rontgen dada untuk memastikan.\nPemeriksaan X-ray juga membantu.\nDokter rujukan: dr. Sari (Poli Paru).",
+    "<think>langkah 1</think>Teks sesudah think.<think>langkah 2</think>\n  Paragraf kedua.\n\n\n   Paragraf ketiga ; selesai !",
+    "Jawaban: <think> tidak pernah ditutup sampai akhir",
+    "  \n\n  Jawaban Asisten DetakMedis\n\nTanpa titik dua, awalan tidak dibuang.  \n\n",
+    "Baris satu\\nBaris dua dengan backslash \\\\ biasa\\n\\n\\nPemeriksaan radiologi tidak diperlukan\\nBaris terakhir.",
+    "*\n\nBullet kosong di awal.\n\n*",
+    "<think></think>",
+    "",
+]
+
+
+def _random_chunks(text: str, rng: random.Random):
+    """Potong teks di posisi acak (termasuk chunk kosong dan per karakter), seperti token stream Ollama."""
+    chunks, position = [], 0
+    while position < len(text):
+        size = rng.choice((0, 1, 1, 2, 3, 5, 8, 13))
+        chunks.append(text[position:position + size])
+        position += size
+    return chunks
+
+
+def _chunkings(text: str):
+    rng = random.Random(text)
+    yield [text]
+    yield list(text)
+    for _ in range(CHUNKINGS_PER_SAMPLE):
+        yield _random_chunks(text, rng)
+
+
+def _sanitize(chunks):
+    sanitizer = StreamSanitizer()
+    return "".join(sanitizer.feed(chunk) for chunk in chunks) + sanitizer.flush()
+
+
+def _clean_paragraphs(chunks):
+    cleaner = ParagraphStreamCleaner()
+    paragraphs = []
+    for chunk in chunks:
+        paragraphs.extend(cleaner.feed(chunk))
+    paragraphs.extend(cleaner.flush())
+    # Digabung seperti diagnosis streaming menyimpan jawabannya
+    return "\n\n".join(paragraphs)
+
+
+@pytest.mark.parametrize("raw", SAMPLES)
+def test_stream_sanitizer_matches_batch_cleaner(raw):
+    expected = llm_service._clean_llm_output(raw)
+    for chunks in _chunkings(raw):
+        assert _sanitize(chunks) == expected, chunks
+
+
+@pytest.mark.parametrize("raw", SAMPLES)
+def test_paragraph_cleaner_matches_batch_formatter(raw):
+    expected = aidoc_service._format_output(aidoc_service._clean_llm_output(raw))
+    for chunks in _chunkings(raw):
+        assert _clean_paragraphs(chunks) == expected, chunks
+
+
+def test_paragraphs_are_emitted_before_flush():
+    cleaner = ParagraphStreamCleaner()
+    # Paragraf baru final setelah baris pertama paragraf berikutnya lengkap
+    assert cleaner.feed("Kemungkinan diagnosis\n\nPneumonia") == []
+    assert cleaner.feed(" ringan\n\nSaran istirahat\n") == ["Kemungkinan diagnosis", "Pneumonia ringan"]
+    assert cleaner.flush() == ["Saran istirahat"]